@@ -0,0 +1,201 @@
+"""
+End-to-end representation learning and reward learning.
+
+"""
+
+from __future__ import division
+
+import copy
+
+import numpy as np
+
+from sirl.algorithms.birl import GaussianRewardPrior, GTBIRLOptim
+from sirl.models.base import TrajQualityLoss
+
+from sirl.domains.generators import make_demonstrations
+
+from .common import puddle_cg, social_cg, SEED
+from .common import crowd_world, cluttered_puddle_world, metropolis_world
+from .common import PUDDLE_WEIGHTS, METROPOLIS_WEIGHTS
+
+
+_BUILDERS = {'puddle': puddle_cg, 'metropolis': social_cg}
+_WEIGHTS = {'puddle': PUDDLE_WEIGHTS, 'metropolis': METROPOLIS_WEIGHTS}
+
+
+class ControllerGraphRun(object):
+    """ Controller graph build from a fresh initial state graph """
+
+    params = [['puddle', 'metropolis'], [30, 60]]
+    param_names = ['scene', 'max_samples']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup(self, scene, max_samples):
+        self.cg = _BUILDERS[scene](max_samples)
+
+    def time_run(self, scene, max_samples):
+        self.cg.run()
+
+    def peakmem_run(self, scene, max_samples):
+        self.cg.run()
+
+
+class SeedInitialization(object):
+    """ Initial state graph from many seed states, connected pairwise or to
+    their neighbors """
+
+    params = [['random', 'knn', 'radius'], [25, 100]]
+    param_names = ['init_type', 'n_seeds']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup(self, init_type, n_seeds):
+        rng = np.random.RandomState(SEED)
+        self.samples = [tuple(s) for s in rng.uniform(0, 1, (n_seeds, 2))]
+
+    def time_initialize(self, init_type, n_seeds):
+        puddle_cg(n_seeds, samples=self.samples, init_type=init_type,
+                  radius=0.15)
+
+
+class LazyEdges(object):
+    """ Eager and lazy edge evaluation with a dense connection radius """
+
+    params = [['eager', 'lazy'], [1.8, 3.0]]
+    param_names = ['edge_eval', 'radius']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup(self, edge_eval, radius):
+        self.cg = social_cg(60, edge_eval=edge_eval, radius=radius)
+
+    def time_run(self, edge_eval, radius):
+        self.cg.run()
+
+    def track_controller_calls(self, edge_eval, radius):
+        self.cg.run()
+        return self.cg.stats['counters']['controller']
+
+
+class SamplingStrategies(object):
+    """ Policy value against the number of samples for the action samplers
+    """
+
+    params = [['puddle', 'metropolis'],
+              ['uniform', 'goal', 'informed', 'coverage'], [30, 90]]
+    param_names = ['scene', 'sampler', 'max_samples']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup(self, scene, sampler, max_samples):
+        self.cg = _BUILDERS[scene](max_samples, sampler=sampler)
+
+    def time_run(self, scene, sampler, max_samples):
+        self.cg.run()
+
+    def track_policy_value(self, scene, sampler, max_samples):
+        self.cg.run()
+        G = self.cg.graph
+        return float(np.mean([G.gna(s, 'V')
+                              for s in G.filter_nodes_by_type('start')]))
+
+
+class DemoGuidedSampling(object):
+    """ Metropolis graphs grown from synthetic demonstrations, with uniform
+    and demonstration density guided sampling """
+
+    params = [['uniform', 'demo'], [80, 120]]
+    param_names = ['sampler', 'max_samples']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup(self, sampler, max_samples):
+        demos = make_demonstrations(metropolis_world(), seed=SEED)
+        self.cg = social_cg(max_samples, demos=demos, sampler=sampler)
+
+    def time_run(self, sampler, max_samples):
+        self.cg.run()
+
+    def track_policy_value(self, sampler, max_samples):
+        self.cg.run()
+        G = self.cg.graph
+        return float(np.mean([G.gna(s, 'V')
+                              for s in G.filter_nodes_by_type('start')]))
+
+    def track_edges(self, sampler, max_samples):
+        self.cg.run()
+        return len(self.cg.graph.all_edges)
+
+
+class RewardLearning(object):
+    """ Trajectory quality and GTBIRL on a learned controller graph """
+
+    params = ['puddle', 'metropolis']
+    param_names = ['scene']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup_cache(self):
+        return dict((scene, build(40).run())
+                    for scene, build in _BUILDERS.items())
+
+    def setup(self, graphs, scene):
+        self.cg = copy.deepcopy(graphs[scene])
+        self.demos = copy.deepcopy(self.cg.policies)
+        self.reward = _WEIGHTS[scene]
+        # - policy rollouts from every node of the graph
+        self.starts = self.cg.graph.nodes
+        self.trajs = self.cg.policy_rollouts(self.starts)
+
+    def time_policy_rollouts(self, graphs, scene):
+        self.cg.policy_rollouts(self.starts)
+
+    def time_trajectory_quality(self, graphs, scene):
+        self.cg.trajectory_quality(self.reward, self.trajs)
+
+    def time_gtbirl_solve(self, graphs, scene):
+        np.random.seed(SEED)
+        dim = self.cg.mdp.reward.dim
+        irl = GTBIRLOptim(self.demos, self.cg, GaussianRewardPrior(dim),
+                          loss=TrajQualityLoss(p=2), beta=0.9, max_iter=5)
+        irl.solve()
+
+
+class ScaledControllerGraph(object):
+    """ Controller graph builds in generated scenes
+
+    Social navigation graphs are initialized from synthetic demonstrations,
+    and then grown by 10 states.
+
+    """
+
+    params = [['crowd', 'puddles'], [50, 200]]
+    param_names = ['scene', 'n_obstacles']
+    number = 1
+    repeat = (1, 3, 60.0)
+    timeout = 300
+
+    def setup(self, scene, n_obstacles):
+        if scene == 'crowd':
+            world = crowd_world(n_obstacles)
+            demos = make_demonstrations(world, seed=SEED)
+            n_init = sum(len(d) for d in demos)
+            self.build = lambda: social_cg(n_init + 10, world=world,
+                                           demos=demos)
+        else:
+            world = cluttered_puddle_world(n_obstacles)
+            self.build = lambda: puddle_cg(30, world=world)
+        self.cg = self.build()
+
+    def time_initialize(self, scene, n_obstacles):
+        self.build()
+
+    def time_run(self, scene, n_obstacles):
+        self.cg.run()
@@ -0,0 +1,146 @@
+"""
+Local controllers and reward functions of the bundled domains.
+
+Every benchmark processes the same fixed batch of random state pairs, or of
+the local trajectories between them.
+
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from sirl.domains.navigation.local_controllers import LinearLocalController
+from sirl.domains.navigation.local_controllers import POSQLocalController
+from sirl.domains.navigation.reward_functions import SimpleBehaviors
+from sirl.domains.navigation.reward_functions import FlowBehaviors
+from sirl.domains.puddle_world.puddle_world import PuddleRewardOriented
+
+from .common import metropolis_world, puddle_world, SEED
+from .common import crowd_world, cluttered_puddle_world
+from .common import PUDDLE_WEIGHTS, METROPOLIS_WEIGHTS
+
+
+N_PAIRS = 20
+
+
+def _state_pairs(low, high, max_dist):
+    """ Random pairs of states at most ``max_dist`` apart """
+    rng = np.random.RandomState(SEED)
+    sources = rng.uniform(low, high, size=(N_PAIRS, 2))
+    angles = rng.uniform(-np.pi, np.pi, size=N_PAIRS)
+    dists = rng.uniform(0.2 * max_dist, max_dist, size=N_PAIRS)
+    targets = sources + dists[:, np.newaxis] * \
+        np.column_stack((np.cos(angles), np.sin(angles)))
+    return list(zip(sources, np.clip(targets, low, high)))
+
+
+def _navigation_reward(world, reward):
+    if reward == 'flow':
+        return FlowBehaviors(world, np.array([-1.0, -0.5, -0.8, -0.1]),
+                             discount=0.95)
+    return SimpleBehaviors(world, METROPOLIS_WEIGHTS, scaled=False,
+                           behavior='polite',
+                           anisotropic=(reward == 'simple_anisotropic'),
+                           thresh_p=0.45, thresh_r=0.2)
+
+
+class NavigationControllers(object):
+    """ Social navigation local controllers """
+
+    params = ['linear', 'posq']
+    param_names = ['controller']
+
+    def setup(self, controller):
+        world = metropolis_world()
+        if controller == 'linear':
+            self.controller = LinearLocalController(world, resolution=0.1)
+        else:
+            self.controller = POSQLocalController(world, base=0.4,
+                                                  resolution=0.1)
+        self.pairs = _state_pairs(0, 10, 1.8)
+
+    def time_trajectory(self, controller):
+        for source, target in self.pairs:
+            self.controller.trajectory(source, target, 1.0)
+
+
+class PuddleController(object):
+    """ Puddle world local controller """
+
+    def setup(self):
+        _, _, self.controller = puddle_world()
+        self.pairs = _state_pairs(0, 1, 0.15)
+
+    def time_trajectory(self):
+        for source, target in self.pairs:
+            self.controller.trajectory(source, target)
+
+
+class NavigationRewards(object):
+    """ Social navigation rewards of local trajectories in metropolis """
+
+    params = ['simple', 'simple_anisotropic', 'flow']
+    param_names = ['reward']
+
+    def setup(self, reward):
+        world = metropolis_world()
+        self.reward = _navigation_reward(world, reward)
+        controller = LinearLocalController(world, resolution=0.1)
+        self.trajs = [controller.trajectory(s, t, 1.0)
+                      for s, t in _state_pairs(0, 10, 1.8)]
+
+    def time_reward(self, reward):
+        for traj in self.trajs:
+            self.reward(traj[0], traj)
+
+
+class PuddleReward(object):
+    """ Puddle world rewards of local trajectories """
+
+    def setup(self):
+        world, _, controller = puddle_world()
+        self.reward = PuddleRewardOriented(world, weights=PUDDLE_WEIGHTS)
+        self.trajs = [controller.trajectory(s, t)
+                      for s, t in _state_pairs(0, 1, 0.15)]
+
+    def time_reward(self):
+        for traj in self.trajs:
+            self.reward(traj[0], traj)
+
+
+class CrowdRewards(object):
+    """ Social navigation rewards of local trajectories in generated crowds
+    """
+
+    params = [['simple', 'flow'], [100, 1000, 10000]]
+    param_names = ['reward', 'n_persons']
+    timeout = 120
+
+    def setup(self, reward, n_persons):
+        world = crowd_world(n_persons)
+        self.reward = _navigation_reward(world, reward)
+        controller = LinearLocalController(world, resolution=0.1)
+        self.trajs = [controller.trajectory(s, t, 1.0)
+                      for s, t in _state_pairs(0, 10, 1.8)[:5]]
+
+    def time_reward(self, reward, n_persons):
+        for traj in self.trajs:
+            self.reward(traj[0], traj)
+
+
+class ClutteredPuddleReward(object):
+    """ Puddle world rewards of local trajectories in generated worlds """
+
+    params = [10, 100]
+    param_names = ['n_puddles']
+
+    def setup(self, n_puddles):
+        world, _, controller = puddle_world(cluttered_puddle_world(n_puddles))
+        self.reward = PuddleRewardOriented(world, weights=PUDDLE_WEIGHTS)
+        self.trajs = [controller.trajectory(s, t)
+                      for s, t in _state_pairs(0, 1, 0.15)]
+
+    def time_reward(self, n_puddles):
+        for traj in self.trajs:
+            self.reward(traj[0], traj)
@@ -0,0 +1,70 @@
+"""
+MDP solvers and the Gaussian process value prediction.
+
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from sirl.algorithms.mdp_solvers import graph_policy_iteration
+from sirl.algorithms.mdp_solvers import batch_policy_iteration
+from sirl.algorithms.function_approximation import gp_predict, gp_covariance
+
+from .common import random_state_graph, SEED
+
+
+class PolicyIteration(object):
+    """ Policy iteration from scratch on random graphs """
+
+    params = [100, 500, 2000]
+    param_names = ['n_nodes']
+    number = 1
+    timeout = 120
+
+    def setup(self, n_nodes):
+        self.g = random_state_graph(n_nodes)
+        for n in self.g.nodes:
+            self.g.sna(n, 'V', 0.0)
+            self.g.sna(n, 'pi', 0)
+
+    def time_graph_policy_iteration(self, n_nodes):
+        graph_policy_iteration(self.g, gamma=0.95)
+
+
+class BatchPolicyIteration(object):
+    """ Policy iteration for a block of reward weight vectors at once """
+
+    params = ([500, 2000], [1, 16])
+    param_names = ['n_nodes', 'n_rewards']
+    number = 1
+    timeout = 120
+
+    def setup(self, n_nodes, n_rewards):
+        self.g = random_state_graph(n_nodes)
+        self.g.edge_arrays()
+        rng = np.random.RandomState(SEED)
+        self.rewards = rng.uniform(-1, 1, size=(n_rewards, 3))
+
+    def time_batch_policy_iteration(self, n_nodes, n_rewards):
+        batch_policy_iteration(self.g, self.rewards, gamma=0.95)
+
+
+class GPPredict(object):
+    """ Gaussian process value prediction of a node from its neighbors """
+
+    params = [10, 50, 200]
+    param_names = ['n_train']
+
+    def setup(self, n_train):
+        rng = np.random.RandomState(SEED)
+        self.train = rng.uniform(0, 1, size=(n_train, 2))
+        self.labels = rng.uniform(-1, 0, size=n_train)
+        self.target = rng.uniform(0, 1, size=2)
+        self.gram = gp_covariance(self.train, self.train)
+
+    def time_gp_covariance(self, n_train):
+        gp_covariance(self.train, self.train)
+
+    def time_gp_predict(self, n_train):
+        gp_predict(self.target, self.train, self.gram, self.labels)
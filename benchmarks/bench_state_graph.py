@@ -0,0 +1,135 @@
+"""
+State graph attribute access and neighbor queries.
+
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from sirl.models.state_graph import EdgeArrays
+
+from .common import random_state_graph, SEED
+
+
+SIZES = [100, 1000, 10000]
+
+
+def _graphs():
+    """ Random state graphs of all the benchmarked sizes """
+    return dict((n, random_state_graph(n)) for n in SIZES)
+
+
+class StateGraphAccess(object):
+    """ Node and edge attribute access """
+
+    params = SIZES
+    param_names = ['n_nodes']
+    timeout = 120
+
+    def setup_cache(self):
+        return _graphs()
+
+    def setup(self, graphs, n_nodes):
+        self.g = graphs[n_nodes]
+        self.nodes = self.g.nodes
+        self.edges = self.g.all_edges
+
+    def time_gna(self, graphs, n_nodes):
+        gna = self.g.gna
+        for n in self.nodes:
+            gna(n, 'V')
+
+    def time_sna(self, graphs, n_nodes):
+        sna = self.g.sna
+        for n in self.nodes:
+            sna(n, 'V', 1.0)
+
+    def time_gea(self, graphs, n_nodes):
+        gea = self.g.gea
+        for u, v in self.edges:
+            gea(u, v, 'reward')
+
+    def time_sea(self, graphs, n_nodes):
+        sea = self.g.sea
+        for u, v in self.edges:
+            sea(u, v, 'reward', -1.0)
+
+    def time_get_node_attr_array(self, graphs, n_nodes):
+        self.g.get_node_attr_array('V')
+
+    def time_set_node_attr_array(self, graphs, n_nodes):
+        self.g.set_node_attr_array('V', np.ones(n_nodes))
+
+    def time_get_edge_attr_array(self, graphs, n_nodes):
+        self.g.get_edge_attr_array('reward', self.edges)
+
+    def time_out_edges(self, graphs, n_nodes):
+        out_edges = self.g.out_edges
+        for n in self.nodes:
+            out_edges(n)
+
+    def time_edge_arrays(self, graphs, n_nodes):
+        EdgeArrays(self.g.G, 0)
+
+    def time_filter_nodes_by_type(self, graphs, n_nodes):
+        self.g.filter_nodes_by_type('start')
+
+
+class StateGraphNeighbors(object):
+    """ Spatial neighbor queries, for a batch of query nodes """
+
+    params = SIZES
+    param_names = ['n_nodes']
+    timeout = 120
+
+    def setup_cache(self):
+        return _graphs()
+
+    def setup(self, graphs, n_nodes):
+        self.g = graphs[n_nodes]
+        rng = np.random.RandomState(SEED)
+        self.queries = [int(n) for n in rng.choice(n_nodes, size=10)]
+        self.poses = rng.uniform(0, 1, size=(10, 2))
+
+    def time_find_neighbors_range(self, graphs, n_nodes):
+        for n in self.queries:
+            self.g.find_neighbors_range(n, 0.1)
+
+    def time_find_neighbors_k(self, graphs, n_nodes):
+        for n in self.queries:
+            self.g.find_neighbors_k(n, 8)
+
+    def time_find_neighbors_from_pose(self, graphs, n_nodes):
+        for loc in self.poses:
+            self.g.find_neighbors_from_pose(loc, 0.1)
+
+
+class StateGraphQueries(object):
+    """ Sparse matrix export and graph queries on the edge arrays """
+
+    params = SIZES
+    param_names = ['n_nodes']
+    timeout = 120
+
+    def setup_cache(self):
+        return _graphs()
+
+    def setup(self, graphs, n_nodes):
+        self.g = graphs[n_nodes]
+        self.g.edge_arrays()
+
+    def time_sparse_matrix(self, graphs, n_nodes):
+        self.g.sparse_matrix('duration')
+
+    def time_search_path(self, graphs, n_nodes):
+        self.g.search_path(0, 1, weight='duration')
+
+    def time_cost_to_go(self, graphs, n_nodes):
+        self.g.cost_to_go([1])
+
+    def time_reachable(self, graphs, n_nodes):
+        self.g.reachable([0])
+
+    def time_strongly_connected_components(self, graphs, n_nodes):
+        self.g.strongly_connected_components()
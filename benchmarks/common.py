@@ -0,0 +1,142 @@
+"""
+Shared fixtures of the benchmarks: worlds, tasks and graphs, built with fixed
+random seeds so that timings are comparable across commits.
+
+"""
+
+from __future__ import division
+
+import os
+import json
+
+import numpy as np
+
+from sirl.domains.puddle_world.puddle_world import PuddleWorldMDP
+from sirl.domains.puddle_world.puddle_world import PuddleWorldEnvironment
+from sirl.domains.puddle_world.puddle_world import PuddleWorldControler
+from sirl.domains.puddle_world.puddle_world import PuddleRewardOriented
+from sirl.domains.navigation.social_navigation import SocialNavMDP
+from sirl.domains.navigation.social_navigation import SocialNavEnvironment
+from sirl.domains.navigation.local_controllers import LinearLocalController
+from sirl.domains.navigation.reward_functions import SimpleBehaviors
+from sirl.domains.generators import make_social_world, make_puddle_world
+from sirl.algorithms.controller_graph import ControllerGraph, CGParameters
+from sirl.models.state_graph import StateGraph
+
+
+SEED = 42
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, 'examples')
+
+METROPOLIS_STARTS = ((0.5, 0.5), (4, 0.1), (2, 3), (8.5, 5.2),
+                     (8.9, 0.1), (0.1, 8.5), (4, 3))
+METROPOLIS_GOAL = (5.5, 9)
+
+PUDDLE_WEIGHTS = (1.0, -0.0002, -0.001)
+METROPOLIS_WEIGHTS = (-1.0, -0.7, -0.85)
+
+
+def puddle_world(world=None):
+    """ Puddle world task, in the default world if none is given """
+    world = world or PuddleWorldEnvironment(start=[(0.3, 0.65)],
+                                            goal=(0.97, 0.97))
+    reward = PuddleRewardOriented(world, weights=PUDDLE_WEIGHTS)
+    mdp = PuddleWorldMDP(discount=0.95, reward=reward, world=world)
+    return world, mdp, PuddleWorldControler(world)
+
+
+def metropolis_world():
+    """ Social navigation world of the bundled ``metropolis.json`` scene """
+    with open(os.path.join(EXAMPLES, 'social_navigation',
+                           'metropolis.json'), 'r') as f:
+        scene = json.load(f)
+    persons = dict((int(k), v) for k, v in scene['persons'].items())
+    return SocialNavEnvironment(0, 0, 10, 10, persons, scene['relations'],
+                                METROPOLIS_GOAL, METROPOLIS_STARTS)
+
+
+def social_task(world=None):
+    """ Polite social navigation task, in metropolis if no world is given """
+    world = world or metropolis_world()
+    reward = SimpleBehaviors(world, METROPOLIS_WEIGHTS, scaled=False,
+                             behavior='polite', anisotropic=False,
+                             thresh_p=0.45, thresh_r=0.2)
+    mdp = SocialNavMDP(discount=0.95, reward=reward, world=world)
+    return world, mdp, LinearLocalController(world, resolution=0.1)
+
+
+def crowd_world(n_persons):
+    """ Generated social navigation world with ``n_persons`` persons """
+    return make_social_world(n_persons, seed=SEED)
+
+
+def cluttered_puddle_world(n_puddles):
+    """ Generated puddle world with ``n_puddles`` puddles """
+    return make_puddle_world(n_puddles, seed=SEED)
+
+
+def puddle_cg(max_samples, seed=SEED, world=None, samples=None, **params):
+    """ Puddle world controller graph, initialized but not run
+
+    The graph is initialized from the ``samples`` states if given, and from a
+    single fixed state otherwise.
+
+    """
+    np.random.seed(seed)
+    _, mdp, controller = puddle_world(world)
+    p = CGParameters()
+    p.load(os.path.join(EXAMPLES, 'pw_cg_params.json'))
+    p = p.derive(max_samples=max_samples, **params)
+    cg = ControllerGraph(mdp=mdp, local_controller=controller, params=p)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)] if samples is None
+                              else samples)
+    return cg
+
+
+def social_cg(max_samples, seed=SEED, world=None, demos=None, **params):
+    """ Social navigation controller graph, initialized but not run
+
+    The graph is initialized from the expert ``demos`` if given, and from two
+    fixed states otherwise.
+
+    """
+    np.random.seed(seed)
+    _, mdp, controller = social_task(world)
+    p = CGParameters()
+    p.load(os.path.join(EXAMPLES, 'social_navigation', 'cg_params.json'))
+    init_type = 'random' if demos is None else 'trajectory'
+    p = p.derive(max_samples=max_samples, init_type=init_type, **params)
+    cg = ControllerGraph(mdp=mdp, local_controller=controller, params=p)
+    cg.initialize_state_graph(samples=[(5, 5), (1, 3)] if demos is None
+                              else demos, extra_state_attr=True)
+    return cg
+
+
+def random_state_graph(n_nodes, degree=8, reward_dim=3, traj_len=10,
+                       seed=SEED):
+    """ Random state graph with uniform 2D node positions
+
+    Every node is connected to ``degree`` random other nodes, with random
+    rewards and features, node 0 is the start and node 1 the goal.
+
+    """
+    rng = np.random.RandomState(seed)
+    g = StateGraph(state_dim=2)
+    pos = rng.uniform(0, 1, size=(n_nodes, 2))
+    for i in range(n_nodes):
+        ntype = {0: 'start', 1: 'goal'}.get(i, 'simple')
+        g.add_node(nid=i, data=pos[i], cost=0.0, priority=1.0, Q=[], V=0.0,
+                   pi=0, ntype=ntype)
+
+    traj = np.zeros((traj_len, 2))
+    for i in range(n_nodes):
+        if i == 1:
+            continue
+        for j in rng.choice(n_nodes, size=min(degree, n_nodes - 1),
+                            replace=False):
+            if i != j:
+                g.add_edge(i, int(j), duration=rng.uniform(0.1, 1.0),
+                           reward=-rng.uniform(0, 1),
+                           phi=rng.uniform(0, 1, size=reward_dim), traj=traj)
+    return g
@@ -0,0 +1,56 @@
+from __future__ import division, absolute_import, print_function
+
+import argparse
+
+import numpy as np
+
+from sirl.domains.puddle_world.puddle_world import PuddleWorldMDP
+from sirl.domains.puddle_world.puddle_world import PuddleWorldEnvironment
+from sirl.domains.puddle_world.puddle_world import PuddleWorldControler
+from sirl.domains.puddle_world.puddle_world import PuddleRewardOriented
+
+from sirl.algorithms.controller_graph import ControllerGraph, CGParameters
+from sirl.algorithms.sweep import ParameterSweep, sweep_grid
+
+
+def build_puddle_world(params):
+    """ Controller graph of the puddle world, ready to run """
+    world = PuddleWorldEnvironment(start=[(0.3, 0.65)], goal=(0.97, 0.97))
+    controller = PuddleWorldControler(world)
+    reward = PuddleRewardOriented(world, weights=(1.0, -0.0002, -0.001))
+    mdp = PuddleWorldMDP(discount=0.95, reward=reward, world=world)
+
+    cg = ControllerGraph(mdp=mdp, local_controller=controller, params=params)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)])
+    return cg
+
+
+def sweep_representation_learning(results, n_jobs, n_seeds):
+    base = CGParameters()
+    base.load('pw_cg_params.json')
+
+    params = sweep_grid(base,
+                        radius=[0.1, 0.15, 0.2],
+                        n_new=[3, 10],
+                        exp_thresh=[0.2, 0.32])
+
+    sweep = ParameterSweep(build_puddle_world, results, n_jobs=n_jobs)
+    res = sweep.run(params, seeds=range(n_seeds))
+
+    for i in np.argsort(-res['policy_value']):
+        print('{}  nodes: {:5.0f}  time: {:6.2f}s  value: {:8.3f}'
+              .format(res['key'][i], res['n_nodes'][i], res['run_time'][i],
+                      res['policy_value'][i]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--results", type=str, default='sweep_pw.npz',
+                        help="Results file (runs already in it are skipped)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of worker processes")
+    parser.add_argument("-s", "--seeds", type=int, default=3,
+                        help="Number of random seeds per setting")
+
+    args = parser.parse_args()
+    sweep_representation_learning(args.results, args.jobs, args.seeds)
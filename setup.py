@@ -12,7 +12,11 @@ setup(name="sirl",
       install_requires=["networkx"],
       packages=['sirl',
                 'sirl.algorithms',
+                'sirl.algorithms.birl',
                 'sirl.domains',
+                'sirl.domains.navigation',
+                'sirl.domains.puddle_world',
+                'sirl.models',
                 'sirl.utils',
                 'sirl.tests',
                 'sirl.tests.test_algorithms',
@@ -25,7 +29,6 @@ setup(name="sirl",
       author_email="sudo@makokal.com",
       url="http://sample-irl.github.io",
       license="New BSD",
-      use_2to3=True,
       classifiers=['Intended Audience :: Science/Research',
                    'Intended Audience :: Developers',
                    'License :: OSI Approved',
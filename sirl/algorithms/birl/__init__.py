@@ -4,17 +4,20 @@ from .base import GaussianRewardPrior
 from .base import LaplacianRewardPrior
 from .base import DirectionalRewardPrior
 
-# from .iterative_birl import STBIRLLinearProg
+from .iterative_birl import STBIRLLinearProg
 from .iterative_birl import GTBIRLOptim
 from .iterative_birl import GTBIRLPolicyWalk
 
+from .maxent import MaxEntIRL
+
 
 __all__ = [
     'UniformRewardPrior',
     'GaussianRewardPrior',
     'LaplacianRewardPrior',
     'DirectionalRewardPrior',
-    # 'STBIRLLinearProg',
+    'STBIRLLinearProg',
     'GTBIRLOptim',
     'GTBIRLPolicyWalk',
+    'MaxEntIRL',
 ]
@@ -140,6 +140,131 @@ class PolicyWalkProposal(Proposal):
         return new_loc
 
 
+########################################################################
+# Trajectory feature caches
+# ######################################################################
+
+
+class TrajectoryFeatureStore(object):
+    r""" Cache of discounted trajectory feature expectations
+
+    Each trajectory (a sequence of node ids on a graph representation) is
+    assigned its discounted feature expectation :math:`\mu` and goal term
+    :math:`c` once, when it is added, see
+    :meth:`ControllerGraph.trajectory_features`. The quality of a stored
+    trajectory under any reward ``r`` is then :math:`r^T \mu + c`. Identical
+    node sequences are stored once, with a multiplicity count.
+
+    Parameters
+    -----------
+    rep : A representation object
+        Representation providing ``trajectory_features``
+    follow_policy : bool, optional (default=True)
+        Take the features along the policy of the graph when a trajectory is
+        added (for generated trajectories), or along the edges between its
+        consecutive nodes (for expert demonstrations), which does not depend
+        on the policy
+
+    Attributes
+    -----------
+    _index : dict
+        Mapping from node sequence (as a tuple) to row in the cache
+    _sets : list of array-like
+        Rows of the trajectories of every added set, in order of addition
+
+    """
+
+    def __init__(self, rep, follow_policy=True):
+        self._rep = rep
+        self.follow_policy = follow_policy
+        self.clear()
+
+    def clear(self):
+        """ Remove all trajectories """
+        self._index = dict()
+        self._sets = []
+        self._features = None
+        self._offsets = np.zeros(0)
+        self._counts = np.zeros(0)
+        self._size = 0
+
+    def add(self, trajs):
+        """ Add a set of trajectories, returning the index of the set """
+        rows = []
+        new_trajs = []
+        for traj in trajs:
+            key = tuple(traj)
+            if key not in self._index:
+                self._index[key] = self._size + len(new_trajs)
+                new_trajs.append(traj)
+            rows.append(self._index[key])
+
+        if new_trajs:
+            features, offsets = self._rep.trajectory_features(
+                new_trajs, follow_policy=self.follow_policy)
+            self._append(features, offsets)
+
+        rows = np.array(rows, dtype=int)
+        np.add.at(self._counts, rows, 1)
+        self._sets.append(rows)
+        return len(self._sets) - 1
+
+    def quality(self, reward):
+        """ Quality of every unique trajectory in the cache """
+        reward = np.asarray(reward)
+        if self._size == 0:
+            return np.zeros(0)
+        return self.features.dot(reward) + self.offsets
+
+    def set_quality(self, reward, index):
+        """ Quality of the trajectories of a single added set """
+        features, offsets = self.set_features(index)
+        return features.dot(np.asarray(reward)) + offsets
+
+    def set_features(self, index):
+        """ Feature expectations and goal terms of a single added set """
+        rows = self._sets[index]
+        return self.features[rows], self.offsets[rows]
+
+    @property
+    def features(self):
+        """ Feature expectations of the unique trajectories """
+        return self._features[:self._size]
+
+    @property
+    def offsets(self):
+        """ Reward independent quality terms of the unique trajectories """
+        return self._offsets[:self._size]
+
+    @property
+    def counts(self):
+        """ Number of times each unique trajectory has been added """
+        return self._counts[:self._size]
+
+    def __len__(self):
+        return len(self._sets)
+
+    def _append(self, features, offsets):
+        """ Append rows, growing the buffers geometrically """
+        n = features.shape[0]
+        if self._features is None:
+            capacity = max(2 * n, 16)
+            self._features = np.zeros((capacity, features.shape[1]))
+            self._offsets = np.zeros(capacity)
+            self._counts = np.zeros(capacity)
+        elif self._size + n > self._features.shape[0]:
+            capacity = max(2 * self._features.shape[0], self._size + n)
+            extra = capacity - self._features.shape[0]
+            self._features = np.vstack(
+                (self._features, np.zeros((extra, features.shape[1]))))
+            self._offsets = np.concatenate((self._offsets, np.zeros(extra)))
+            self._counts = np.concatenate((self._counts, np.zeros(extra)))
+
+        self._features[self._size:self._size + n] = features
+        self._offsets[self._size:self._size + n] = offsets
+        self._size += n
+
+
 ########################################################################
 # BIRL (Bayesian IRL) base interface
 ########################################################################
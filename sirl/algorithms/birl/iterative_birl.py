@@ -14,18 +14,23 @@ from abc import ABCMeta, abstractmethod
 from copy import deepcopy
 
 import scipy as sp
-from scipy.misc import logsumexp
+import scipy.sparse
+import scipy.optimize
+try:
+    from scipy.special import logsumexp
+except ImportError:
+    from scipy.misc import logsumexp
 
 import numpy as np
 from numpy.random import uniform
 
 from .base import BIRL
 from .base import PolicyWalkProposal
-from ..mdp_solvers import graph_policy_iteration
+from .base import TrajectoryFeatureStore
 
 
 __all__ = [
-    # 'STBIRLLinearProg',
+    'STBIRLLinearProg',
     'GTBIRLOptim',
     'GTBIRLPolicyWalk',
 ]
@@ -58,6 +63,12 @@ class SamplingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
         self._eps = eps
         self._rmax = reward_max
 
+        # trajectories generated by the accumulated policies, and the cached
+        # features of the policy and expert trajectories
+        self._policies = []
+        self._p_store = TrajectoryFeatureStore(rep)
+        self._e_store = TrajectoryFeatureStore(rep, follow_policy=False)
+
         self.data = dict()
         self.data['loss'] = []
 
@@ -66,7 +77,13 @@ class SamplingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
         """
         reward = self.initialize_reward()
 
+        # - expert features are taken along the edges of the demonstrations,
+        # they do not change with the policy
         self._policies = []
+        self._p_store.clear()
+        self._e_store.clear()
+        self._e_store.add(self._demos)
+
         self._iteration = 1
         while self._iteration < self._max_iter + 1:
             v_e = self._expert_policy_value(reward)
@@ -74,6 +91,7 @@ class SamplingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
             reward_loss = np.linalg.norm(v_e - v_r, ord=2)
 
             self._policies.append(pi_r)
+            self._p_store.add(pi_r)
             self.data['loss'].append(reward_loss)
 
             # - find the next best reward
@@ -83,7 +101,7 @@ class SamplingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
             if reward_loss < self._eps:
                 break
 
-            self.info('Iteration: {}'.format(self._iteration))
+            self.info('Iteration: %d', self._iteration)
 
             self._iteration += 1
 
@@ -104,8 +122,7 @@ class SamplingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
         return reward
 
     def _expert_policy_value(self, reward):
-        expert_value = self._rep.trajectory_quality(reward, self._demos)
-        expert_value = np.array(expert_value)
+        expert_value = self._e_store.set_quality(reward, 0)
         return expert_value
 
     def _test_policy_value(self, reward):
@@ -115,36 +132,107 @@ class SamplingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
         the expert. Values can be estimated via Monte Carlo or exactly via
         Bellman equations
 
+        Returns the values of the starting states of the demonstrations
+        and the trajectories generated from them by the policy of ``reward``
+
         """
         starts = [demo[0] for demo in self._demos]
 
         # estimate value of current policy (wrt to the starting states)
-        self._rep = self._rep.update_rewards(reward)
-        graph_policy_iteration(self._rep.graph,
-                               self._rep.mdp.gamma)
-        value_function = self._rep.graph.get_signal('V')
-        policy = self._rep.graph.get_signal('pi')
-        v_pi = np.array([value_function[s] for s in starts])
+        self._compute_policy(reward)
+        v_pi = np.array([self._rep.graph.gna(s, 'V') for s in starts])
+        trajs = self._rep.policy_rollouts(starts)
 
-        return v_pi, policy
+        return v_pi, trajs
 
 
 class STBIRLLinearProg(SamplingTrajectoryBIRL):
 
-    """ LP based STBIRL """
+    r""" LP based STBIRL
+
+    Linear programming formulation of IRL with sampled trajectories, see Ng
+    and Russel (Algs for infinite spaces). Given the feature expectations
+    :math:`\mu_E` of the demonstrations and :math:`\mu_k` of the policies
+    found so far, the next reward weights solve
+
+    .. math::
+        \max_w \sum_k p(w^T (\mu_E - \mu_k) + c_E - c_k)
+        \quad s.t. \quad |w_i| \leq r_{max}
+
+    where :math:`p(x) = x` if :math:`x \geq 0` and :math:`2x` otherwise, and
+    :math:`c` are the reward independent goal terms of the qualities. The
+    piecewise linear objective is written as an LP using one auxiliary
+    variable per policy and solved with the HiGHS backend of
+    ``scipy.optimize.linprog``.
+
+    Parameters
+    ----------
+    demos : array-like
+        Expert demonstrations as set of M trajectories of state action pairs.
+        Trajectories can be of different lengths.
+    rep : A representation object
+        The underlying representation of the MDP for the task, can be a
+        :class:`ControllerGraph`, or any derivative of the representation
+        interface :class:`MDPRepresentation`
+    prior : :class:``RewardPrior`` or derivative object
+        Reward prior callable object
+    loss : A callable object, derivative of :class:`RewardLoss`
+        Reward loss callable, for evaluating progress in reward search
+    reward_max : float, optional (default=1.0)
+        Maximum value of the reward signal (for a single dimension)
+    eps : float, optional (default=0.2)
+        Value difference between expert and current policy for termination
+    max_iter : int, optional (default=10)
+        Number of iterations of the algorithm
+
+    """
 
     def __init__(self, demos, rep, prior, loss, reward_max=1.0,
                  beta=0.7, eps=0.2, max_iter=10):
         super(STBIRLLinearProg, self).__init__(demos, rep, prior, loss,
                                                reward_max, beta,
                                                eps, max_iter)
-
-        raise NotImplementedError('Implementation not complete')
+        self._reward = None
 
     def find_next_reward(self):
         """ Compute a new reward based on accumulated policies """
-        # Solve LP problem
-        return None
+        rdim = self._rep.mdp.reward.dim
+        n_pol = len(self._policies)
+
+        # - value differences (expert - policy k), linear in w
+        mu_e, c_e = self._mean_features(self._e_store, 0)
+        D = np.zeros((n_pol, rdim))
+        dc = np.zeros(n_pol)
+        for k in range(n_pol):
+            mu_k, c_k = self._mean_features(self._p_store, k)
+            D[k] = mu_e - mu_k
+            dc[k] = c_e - c_k
+
+        # - variables [w, t], maximize sum(t) with t_k <= p(D_k w + dc_k)
+        eye = sp.sparse.identity(n_pol, format='csr')
+        D = sp.sparse.csr_matrix(D)
+        A_ub = sp.sparse.vstack([sp.sparse.hstack([-D, eye]),
+                                 sp.sparse.hstack([-2.0 * D, eye])],
+                                format='csr')
+        b_ub = np.concatenate((dc, 2.0 * dc))
+        c = np.concatenate((np.zeros(rdim), -np.ones(n_pol)))
+        bounds = [(-self._rmax, self._rmax)] * rdim + [(None, None)] * n_pol
+
+        res = sp.optimize.linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=bounds,
+                                  method='highs')
+        if res.status != 0:
+            warnings.warn('LP solver failed: {}'.format(res.message))
+            if self._reward is None:
+                self._reward = self.initialize_reward()
+            return self._reward
+
+        self._reward = res.x[:rdim]
+        return self._reward
+
+    def _mean_features(self, store, index):
+        """ Mean feature expectation and goal term of a trajectory set """
+        features, offsets = store.set_features(index)
+        return features.mean(axis=0), offsets.mean()
 
 
 ########################################################################
@@ -174,8 +262,11 @@ class GeneratingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
             warnings.warn('*max_iter* set to high value: {}'.format(max_iter))
         self._max_iter = max_iter
 
-        # generated trajectories
+        # generated trajectories, and the cached features of the generated
+        # and expert trajectories
         self._g_trajs = []
+        self._g_store = TrajectoryFeatureStore(rep)
+        self._e_store = TrajectoryFeatureStore(rep, follow_policy=False)
 
         self.data = dict()
         self.data['loss'] = []
@@ -192,9 +283,17 @@ class GeneratingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
         reward = self.initialize_reward()
         self._rewards = [reward]
 
+        # - expert features are taken along the edges of the demonstrations,
+        # they do not change with the policy
+        self._g_trajs = []
+        self._g_store.clear()
+        self._e_store.clear()
+        self._e_store.add(self._demos)
+
         # self._g_trajs.append(self._demos)  # initialize with demos???
         trajs = self._compute_policy(reward=reward)
         self._g_trajs.append(trajs)
+        self._g_store.add(trajs)
 
         self._iteration = 1
 
@@ -204,12 +303,13 @@ class GeneratingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
             # - generate trajectories using current reward
             trajs = self._compute_policy(reward)
             self._g_trajs.append(trajs)
+            self._g_store.add(trajs)
 
-            self.info('Iteration: {}'.format(self._iteration))
+            self.info('Iteration: %d', self._iteration)
 
             # - diagnosis data
-            QE = self._rep.trajectory_quality(reward, self._demos)
-            QPi = [self._rep.trajectory_quality(reward, self._g_trajs[i])
+            QE = self._e_store.set_quality(reward, 0)
+            QPi = [self._g_store.set_quality(reward, i)
                    for i in range(self._iteration)]
             qloss = self._loss(QE,  QPi)
 
@@ -218,7 +318,7 @@ class GeneratingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
             self.data['QPi'].append(QPi)
 
             if qloss < 0.5:
-                self.info('Terminating: Loss={}'.format(qloss))
+                self.info('Terminating: Loss=%s', qloss)
                 break
 
             self._rewards.append(reward)
@@ -237,6 +337,18 @@ class GeneratingTrajectoryBIRL(six.with_metaclass(ABCMeta, BIRL)):
         """ Initialize reward function based on sovler """
         raise NotImplementedError('Abstract')
 
+    def _log_likelihood(self, QE, QPi):
+        """ Negated log-sum-exp of the quality differences
+
+        Computed over all pairs of expert and generated trajectories, where
+        ``QE`` and ``QPi`` are the qualities of the unique trajectories in
+        the respective caches and duplicates enter via their counts.
+
+        """
+        z = self._beta * (QPi[np.newaxis, :] - QE[:, np.newaxis])
+        b = np.outer(self._e_store.counts, self._g_store.counts)
+        return -logsumexp(z, b=b)
+
 
 class GTBIRLOptim(GeneratingTrajectoryBIRL):
 
@@ -306,7 +418,7 @@ class GTBIRLOptim(GeneratingTrajectoryBIRL):
                                    jac=False,
                                    bounds=self._bounds)
 
-        self.debug('Solver result: {}'.format(res))
+        self.debug('Solver: %s, nit=%d, fun=%s', res.message, res.nit, res.fun)
         reward = res.x
 
         return reward
@@ -319,18 +431,12 @@ class GTBIRLOptim(GeneratingTrajectoryBIRL):
 
         """
         # - prepare the trajectory quality scores
-        QE = self._rep.trajectory_quality(r, self._demos)
-        QPi = [self._rep.trajectory_quality(r, self._g_trajs[i])
-               for i in range(self._iteration)]
+        QE = self._e_store.quality(r)
+        QPi = self._g_store.quality(r)
 
         # - the negative log likelihood
         # data term
-        z = []
-        for q_e in QE:
-            for QP_i in QPi:
-                for q_i in QP_i:
-                    z.append(self._beta * (q_i - q_e))
-        lk = -logsumexp(z)
+        lk = self._log_likelihood(QE, QPi)
 
         # prior term
         prior = np.sum(self._prior.log_p(r))
@@ -431,17 +537,15 @@ class GTBIRLPolicyWalk(GeneratingTrajectoryBIRL):
         r_mean = deepcopy(r)
         p_dist = PolicyWalkProposal(r.shape[0], self._delta, bounded=True)
 
-        QE = self._rep.trajectory_quality(r, self._demos)
-        QPi = [self._rep.trajectory_quality(r, self._g_trajs[i])
-               for i in range(self._iteration)]
+        QE = self._e_store.quality(r)
+        QPi = self._g_store.quality(r)
 
         burn_point = int(self._mcmc_iter * self._burn / 100)
 
         for step in range(1, self._mcmc_iter + 1):
             r_new = p_dist(loc=r_mean)
-            QE_new = self._rep.trajectory_quality(r_new, self._demos)
-            QPi_new = [self._rep.trajectory_quality(r_new, self._g_trajs[i])
-                       for i in range(self._iteration)]
+            QE_new = self._e_store.quality(r_new)
+            QPi_new = self._g_store.quality(r_new)
 
             mh_ratio = self._mh_ratio(r_mean, r_new, QE, QE_new, QPi, QPi_new)
             accept_probability = min(1, mh_ratio)
@@ -458,8 +562,7 @@ class GTBIRLPolicyWalk(GeneratingTrajectoryBIRL):
                 self.data['walk'].append(r_new)
 
             if step % 10 == 0:
-                print('It: %s, R: %s, R_mean: %s' % (step, r_new, r_mean))
-            # self.debug('It: %s, R: %s, R_mean: %s' % (step, r_new, r_mean))
+                self.debug('It: %s, R: %s, R_mean: %s', step, r_new, r_mean)
 
         self.data['iter_rewards'].append(r_mean)
         return r_mean
@@ -477,13 +580,16 @@ class GTBIRLPolicyWalk(GeneratingTrajectoryBIRL):
         r_new : array-like, shape (reward-dim)
             New reward sample from the MCMC walk
         QE : array-like
-            Quality of the expert trajectories based on reward ``r``
+            Quality of the unique expert trajectories based on reward ``r``
         QE_new : array-like
-            Quality of the expert trajectories based on reward ``r_new``
+            Quality of the unique expert trajectories based on reward
+            ``r_new``
         QPi : array-like
-            Quality of the generated trajectories based on reward ``r``
+            Quality of the unique generated trajectories based on reward
+            ``r``
         QPi_new : array-like
-            Quality of the generated trajectories based on reward ``r_new``
+            Quality of the unique generated trajectories based on reward
+            ``r_new``
 
         Returns
         --------
@@ -496,19 +602,8 @@ class GTBIRLPolicyWalk(GeneratingTrajectoryBIRL):
         p = np.sum(self._prior.log_p(r))
 
         # - log-likelihoods
-        z = []
-        for q_e in QE:
-            for QP_i in QPi:
-                for q_i in QP_i:
-                    z.append(self._beta * (q_i - q_e))
-        lk = -logsumexp(z)
-
-        z_new = []
-        for q_e_new in QE_new:
-            for QP_i_new in QPi_new:
-                for q_i_new in QP_i_new:
-                    z_new.append(self._beta * (q_i_new - q_e_new))
-        lk_new = -logsumexp(z_new)
+        lk = self._log_likelihood(QE, QPi)
+        lk_new = self._log_likelihood(QE_new, QPi_new)
 
         mh_ratio = (lk_new + p_new) / (lk + p)
         return mh_ratio
@@ -0,0 +1,240 @@
+"""
+Maximum entropy IRL on the edges of a state graph representation.
+
+The soft (log-sum-exp) Bellman backups, the state visitation forward pass and
+the gradient are all computed on the flat edge arrays of the graph, so that
+the cost of a gradient step is linear in the number of edges.
+
+"""
+
+from __future__ import division
+
+import warnings
+
+import scipy as sp
+import scipy.optimize
+
+import numpy as np
+
+from .base import BIRL
+
+
+__all__ = [
+    'MaxEntIRL',
+]
+
+
+class MaxEntIRL(BIRL):
+
+    r""" Maximum entropy IRL on a graph representation
+
+    The reward weights :math:`w` are found by maximizing
+
+    .. math::
+        L(w) = w^T \mu_E - \frac{1}{M} \sum_{i} V_{soft}(s^i_0)
+        - \frac{\lambda}{2} \|w\|^2
+
+    where :math:`\mu_E` are the mean discounted feature counts of the expert
+    demonstrations and :math:`V_{soft}` the soft value function computed by
+    log-sum-exp Bellman backups over the graph edges,
+
+    .. math::
+        V(s) = \log \sum_{(s, s')} \exp(w^T \phi(s, s') + \gamma^d V(s'))
+
+    The gradient :math:`\mu_E - \mu_w - \lambda w` uses the expected
+    discounted feature counts :math:`\mu_w` of the soft policy, obtained by
+    a forward pass of the discounted state visitation from the starts of the
+    demonstrations.
+
+
+    Parameters
+    ----------
+    demos : array-like
+        Expert demonstrations as set of M trajectories of node ids
+    rep : A representation object
+        The underlying representation of the MDP for the task, a
+        :class:`ControllerGraph`
+    prior : :class:``RewardPrior`` or derivative object
+        Reward prior callable object (for diagnosis only)
+    loss : A callable object, derivative of :class:`RewardLoss`
+        Reward loss callable, for evaluating progress in reward search
+    beta : float, optional (default=0.9)
+        Expert optimality parameter
+    reward_max : float, optional (default=1.0)
+        Maximum value of the reward signal (for a single dimension)
+    bounds : tuple, optional (default=None)
+        Box bounds for each dimension of the reward weights, defaults to
+        ``(-reward_max, reward_max)``
+    l2 : float, optional (default=0.0)
+        Weight :math:`\lambda` of the L2 penalty on the reward weights
+    max_iter : int, optional (default=100)
+        Maximum number of L-BFGS iterations
+    eps : float, optional (default=1e-06)
+        Convergence threshold of the soft value iteration and the forward
+        visitation pass
+    sweeps_max : int, optional (default=1000)
+        Maximum number of sweeps of the soft value iteration and the forward
+        visitation pass
+
+
+    Attributes
+    -----------
+    _mu_e : array-like, shape (reward-dim,)
+        Mean discounted feature counts of the expert demonstrations
+    _p0 : array-like, shape (N,)
+        Empirical start state distribution of the demonstrations
+
+    """
+
+    def __init__(self, demos, rep, prior, loss, beta=0.9, reward_max=1.0,
+                 bounds=None, l2=0.0, max_iter=100, eps=1e-06,
+                 sweeps_max=1000):
+        super(MaxEntIRL, self).__init__(demos, rep, prior, loss, beta)
+        self._rmax = reward_max
+        self._bounds = bounds
+        if self._bounds is None:
+            self._bounds = tuple((-self._rmax, self._rmax)
+                                 for _ in range(self._rep.mdp.reward.dim))
+        self._l2 = l2
+        self._max_iter = max_iter
+        self._eps = eps
+        self._sweeps_max = sweeps_max
+
+        self.data = dict()
+        self.data['loss'] = []
+
+    def solve(self):
+        """ Find the reward weights maximizing the demonstrations likelihood
+        """
+        self._prepare()
+
+        res = sp.optimize.minimize(fun=self._objective,
+                                   x0=self.initialize_reward(),
+                                   method='L-BFGS-B',
+                                   jac=True,
+                                   bounds=self._bounds,
+                                   options={'maxiter': self._max_iter})
+        if not res.success:
+            warnings.warn('MaxEnt optimization: {}'.format(res.message))
+
+        reward = res.x
+        self._compute_policy(reward)
+        return reward
+
+    def initialize_reward(self):
+        """ Initialize the reward weights (objective is concave) """
+        return np.zeros(self._rep.mdp.reward.dim)
+
+    def soft_values(self, reward):
+        """ Soft value function and policy over the graph edges
+
+        Parameters
+        -----------
+        reward : array-like, shape (reward-dim,)
+            Reward weights
+
+        Returns
+        --------
+        V : array-like, shape (N,)
+            Soft values of the nodes, in the order of the edge arrays
+        pi : array-like, shape (E,)
+            Probability of taking each edge from its source node
+
+        """
+        ea = self._arrays
+        r = ea.phi.dot(reward)
+        has_out = ea.out_degree > 0
+        starts = ea.indptr[:-1][has_out]
+
+        # - nodes without out edges are absorbing with the goal reward
+        V = np.zeros(ea.n_nodes)
+        V[~has_out] = self._rep.params.goal_reward
+
+        m = np.zeros(ea.n_nodes)
+        for _ in range(self._sweeps_max):
+            Q = r + self._gammas * V[ea.target]
+            m[has_out] = np.maximum.reduceat(Q, starts)
+            z = np.add.reduceat(np.exp(Q - m[ea.source]), starts)
+            V_new = V.copy()
+            V_new[has_out] = m[has_out] + np.log(z)
+            delta = np.max(np.abs(V_new - V)) if V.size else 0.0
+            V = V_new
+            if delta < self._eps:
+                break
+
+        Q = r + self._gammas * V[ea.target]
+        pi = np.exp(Q - V[ea.source])
+        return V, pi
+
+    def feature_expectations(self, pi):
+        """ Expected discounted feature counts of a stochastic edge policy
+
+        Forward pass of the discounted state visitation, starting from the
+        start distribution of the demonstrations
+
+        """
+        ea = self._arrays
+        flow = pi * self._gammas
+        x = self._p0.copy()
+        for _ in range(self._sweeps_max):
+            x_new = self._p0 + np.bincount(ea.target,
+                                           weights=x[ea.source] * flow,
+                                           minlength=ea.n_nodes)
+            delta = np.max(np.abs(x_new - x)) if x.size else 0.0
+            x = x_new
+            if delta < self._eps:
+                break
+
+        return (x[ea.source] * pi).dot(ea.phi)
+
+    # -------------------------------------------------------------
+    # internals
+    # -------------------------------------------------------------
+
+    def _prepare(self):
+        """ Cache the edge arrays, expert features and start distribution """
+        self._rep.evaluate_lazy_edges()
+        self._arrays = self._rep.graph.edge_arrays()
+        ea = self._arrays
+        assert ea.phi is not None, 'Expecting fixed dimension edge features'
+
+        # - discount of each edge, as in the policy iteration backups
+        self._gammas = self._rep.mdp.gamma ** np.maximum(ea.duration, 1.0)
+
+        self._p0 = np.zeros(ea.n_nodes)
+        self._mu_e = np.zeros(ea.phi.shape[1])
+        for demo in self._demos:
+            self._p0[ea.index[demo[0]]] += 1.0
+            self._mu_e += self._demo_features(demo)
+        self._p0 /= len(self._demos)
+        self._mu_e /= len(self._demos)
+
+    def _demo_features(self, demo):
+        """ Discounted features along the edges of a demonstration
+
+        Accumulation stops at the first pair of consecutive nodes that are
+        not connected by an edge
+
+        """
+        ea = self._arrays
+        mu = np.zeros(ea.phi.shape[1])
+        discount = 1.0
+        for u, v in zip(demo[:-1], demo[1:]):
+            k = ea.edge_index.get((u, v))
+            if k is None:
+                break
+            mu += discount * ea.phi[k]
+            discount *= self._gammas[k]
+        return mu
+
+    def _objective(self, w):
+        """ Negative regularized log-likelihood and its gradient """
+        V, pi = self.soft_values(w)
+        mu_w = self.feature_expectations(pi)
+
+        lk = w.dot(self._mu_e) - self._p0.dot(V) - \
+            0.5 * self._l2 * w.dot(w)
+        grad = self._mu_e - mu_w - self._l2 * w
+
+        self.data['loss'].append(-lk)
+        return -lk, -grad
@@ -17,22 +17,35 @@ is done on-line my mixing exploration and exploitation guided by heuristics
 """
 from __future__ import division
 
-import logging
+import os
+import shutil
 import copy
 import json
+import hashlib
+import numbers
+
+import six
 
 import numpy as np
+import scipy.sparse as sp
 from numpy.random import uniform
+from scipy.sparse import csgraph
+from scipy.spatial import cKDTree
 
 from ..algorithms.mdp_solvers import graph_policy_iteration
+from ..algorithms.mdp_solvers import multi_goal_policy_iteration
 from ..algorithms.function_approximation import gp_predict, gp_covariance
+from ..algorithms.samplers import make_sampler
 
 from ..utils.common import wchoice, map_range
 from ..utils.common import Logger
+from ..utils.profiling import Profiler
+from ..utils.sampling import PrioritySampler
 
 from ..utils.geometry import trajectory_length
 
 from ..models.state_graph import StateGraph
+from ..models.trajectory_buffer import TrajectoryBuffer
 from ..models.base import MDPRepresentation
 
 
@@ -50,12 +63,22 @@ class ControllerGraph(MDPRepresentation, Logger):
         Local controller for the task
     params : `GraphMDPParams` object
         Algorithm parameters for the various steps
+    profiler : :class:`Profiler` object, optional (default=None)
+        Instrumentation of the run (phase times and call counts), a default
+        :class:`Profiler` is created if not given, see :attr:`stats`
+    sampler : :class:`ActionSampler` object, optional (default=None)
+        Strategy for the actions of the sampled states, the built-in sampler
+        named by the ``sampler`` parameter if not given
 
 
     Attributes
     -----------
+    _max_attempts : int
+        Maximum number of local controller runs for sampling a new state
     _controller : :class:`SocialNavLocalController` object
         Local controller for the task
+    _sampler : :class:`ActionSampler` object
+        Strategy for the actions of the sampled states
     _g : :class:`StateGraph` object
         The underlying state graph
     _best_trajs : list of tuples, [(x, y)]
@@ -63,6 +86,9 @@ class ControllerGraph(MDPRepresentation, Logger):
         a goal pose
     _params : :class:`GraphMDPParams` object
         Algorithm parameters for the various steps
+    _start_states : list
+        Start states of the demonstration trajectories (when initialized with
+        trajectories)
     _node_id : int
         State id (for keeping track when adding new states)
     _max_conc : float
@@ -73,146 +99,292 @@ class ControllerGraph(MDPRepresentation, Logger):
         Minimum exploration score for a state
 
     """
-    def __init__(self, mdp, local_controller, params):
+    _max_attempts = 100
+
+    def __init__(self, mdp, local_controller, params, profiler=None,
+                 sampler=None):
         super(ControllerGraph, self).__init__(mdp)
 
         self._controller = local_controller
         self._params = params
+        self._profiler = profiler
+        if self._profiler is None:
+            self._profiler = Profiler()
+        self._sampler = sampler
+        if self._sampler is None:
+            self._sampler = make_sampler(params)
 
         # setup the graph structure and internal variables
-        self._g = StateGraph(state_dim=mdp.state_dimension)
+        trajectories = None
+        if self._params.traj_store != 'edges':
+            trajectories = TrajectoryBuffer(mode=self._params.traj_store,
+                                            filename=self._params.traj_file)
+            trajectories.regenerate = self._edge_trajectory
+        self._g = StateGraph(state_dim=mdp.state_dimension,
+                             trajectories=trajectories)
         self._best_trajs = []
+        # - expansion samplers of S_best and S_other, the priorities are
+        # shifted as in ``wchoice`` to avoid issues with negative V(s)
+        self._s_best = PrioritySampler(shift=1000)
+        self._s_other = PrioritySampler(shift=1000)
+        self._start_states = []
         self._node_id = 0
         self._max_conc = 1.0
         self._max_es = 1.0
         self._min_es = 0.0
 
-        self.log_config(logging.DEBUG)
+        # terminal flags of the nodes, node data does not change
+        self._terminal = dict()
+
+        # edges holding optimistic bounds, evaluated once a policy takes them
+        self._lazy = set()
+
+        # waypoints of the expert demonstrations the graph was seeded with
+        self._demo_points = np.zeros((0, 2))
 
     def initialize_state_graph(self, samples, extra_state_attr=False):
         """ Initialize graph using set of initial samples
 
-        If random, samples are states
+        If random, knn or radius, samples are states
         If trajectory, samples are trajectories
 
         """
         self._g.clear()
-
-        if self._params.init_type == 'random':
+        self._terminal.clear()
+        self._lazy.clear()
+        self._s_best.clear()
+        self._s_other.clear()
+
+        demos = []
+        if self._params.init_type == 'trajectory':
+            demos = [np.asarray(t, dtype=float) for t in samples]
+        self._demo_points = np.reshape([p[:2] for d in demos for p in d],
+                                       (-1, 2))
+        self._sampler.fit(demos)
+
+        if self._params.init_type in ('random', 'knn', 'radius'):
             self._fixed_init(samples, extra_state_attr)
         elif self._params.init_type == 'trajectory':
             self._traj_init(samples, extra_state_attr)
 
         # - update graph attributes
         self._update_state_costs()
-        graph_policy_iteration(self._g, self._mdp.gamma)
+        self._policy_iteration()
         self._update_state_priorities()
         self.find_best_policies()
 
-    def run(self):
-        """ Run the adaptive state-graph procedure to solve the mdp """
-        p_b = self._params.p_best
-        cscale = self._params.conc_scale
-        while self._node_id < self._params.max_samples:
-            if self._node_id % 10 == 0:
-                self.info('Run: no.nodes = {}'.format(self._node_id))
+    def run(self, checkpoint=None, checkpoint_every=1000):
+        """ Run the adaptive state-graph procedure to solve the mdp
 
-            # - select state expansion set between S_best and S_other
-            S_best, S_other = self._generate_state_sets()
-            e_set = S_other
-            if uniform(0, 1) > p_b or len(S_other) == 0:
-                e_set = S_best
+        Parameters
+        -----------
+        checkpoint : str, optional (default=None)
+            Directory for checkpoints of the run, see :meth:`save_checkpoint`
+            and :meth:`resume`. No checkpoints are written if ``None``
+        checkpoint_every : int, optional (default=1000)
+            Number of added nodes between checkpoints. A last checkpoint is
+            written at the end of the run.
 
-            exp_queue = []
-            exp_probs = []
-            for _ in range(min(self._node_id, self._params.n_expand)):
-                # - select state to expand
-                picked = False
-                while not picked:
-                    xn = wchoice(e_set.keys(), e_set.values())
-                    if not self._mdp.terminal(self._g.gna(xn, 'data')):
-                        picked = True
-                        break
+        """
+        # - the optional cProfile and memory capture never outlive the run
+        self._profiler.start()
+        try:
+            self._run_loop(checkpoint, checkpoint_every)
+        finally:
+            self._profiler.stop()
 
-                # - expand graph from chosen state(s)m
-                for _ in range(self._params.n_new):
-                    new_state = self._sample_new_state_from(xn)
+        if checkpoint is not None:
+            self.save_checkpoint(checkpoint, checkpoint_every)
 
-                    # - compute exploration score of the new state
-                    conc, es, var_es = self._exploration_score(new_state)
-                    if conc > self._max_conc:
-                        self._max_conc = conc
-                    if es > self._max_es:
-                        self._max_es = es
-                    if es < self._min_es:
-                        self._min_es = es
-                    conc = conc / float(self._max_conc)
-                    es = map_range(es, self._min_es, self._max_es, 0.0, 1.0)
-                    if var_es > self._params.exp_thresh:
-                        exp_queue.append(new_state)
-                        exp_probs.append(es + cscale*conc)
+        return self
 
-            # - expand around exploration states (if any)
-            for _ in range(min(len(exp_queue), self._params.n_add)):
-                index = wchoice(np.arange(len(exp_queue)), exp_probs)
-                sn = exp_queue[index]
-
-                # add the selected node to the graph
-                nid = self._node_id
-                self._g.add_node(nid=nid, data=sn['data'],
-                                 cost=sn['cost'], pi=0, Q=[0], V=sn['V'],
-                                 ntype='simple', priority=exp_probs[index])
-                self._g.add_edge(source=sn['b_state'], target=nid,
-                                 reward=sn['f_reward'], phi=sn['f_phi'],
-                                 duration=sn['f_duration'], traj=sn['f_traj'])
-
-                # - compute the missing backwards phi and rewards
-                b_traj = self._controller.trajectory(sn['data'], sn['b_data'],
-                                                     self._params.speed)
-                b_r, b_phi = self._mdp.reward(sn['data'], b_traj)
-                b_d = trajectory_length(b_traj)
-                self._g.add_edge(source=nid, target=sn['b_state'], reward=b_r,
-                                 duration=b_d, phi=b_phi, traj=b_traj)
-
-                exp_queue = exp_queue[:index] + exp_queue[index+1:]
-                exp_probs = exp_probs[:index] + exp_probs[index+1:]
+    def save_checkpoint(self, path, checkpoint_every=1000):
+        """ Save the state of a run, for continuing it with :meth:`resume`
 
-                self._node_id += 1
-                self._improve_state(nid)
+        The checkpoint directory holds the graph (see
+        :meth:`StateGraph.save_graph`), the parameters, the run counters, the
+        best trajectories, the expansion sets and the state of the global
+        numpy random number generator, the edges not yet evaluated (see
+        the ``edge_eval`` parameter), the demonstration waypoints the
+        action sampler is fitted to, the start states and the profiler
+        statistics. An existing checkpoint at ``path`` is replaced once the
+        new one is completely written.
 
-            # - update state attributes, policies
-            self._update_state_costs()
-            graph_policy_iteration(self.graph, self.mdp.gamma)
-            self._update_state_priorities()
-            self.find_best_policies()
+        With a memory mapped trajectory buffer in a given file (the
+        ``traj_file`` parameter), the handles of the edge trajectories in the
+        buffer are saved too, and reused on resume rather than appending the
+        trajectories to the file again.
 
-        return self
+        """
+        tmp_path = path.rstrip(os.sep) + '.tmp'
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        self._g.save_graph(os.path.join(tmp_path, 'graph'))
+        self._params.save(os.path.join(tmp_path, 'params.json'))
+
+        rng_name, rng_keys, rng_pos, has_gauss, gauss = np.random.get_state()
+        np.save(os.path.join(tmp_path, 'rng_keys.npy'), rng_keys)
+        np.save(os.path.join(tmp_path, 'demo_points.npy'), self._demo_points)
+        traj_buffer = self._save_trajectory_handles(tmp_path)
+        state = {
+            'node_id': int(self._node_id),
+            'max_conc': float(self._max_conc),
+            'max_es': float(self._max_es),
+            'min_es': float(self._min_es),
+            'best_trajs': [[int(n) for n in t] for t in self._best_trajs],
+            # - the sampling order of the states, for identical draws
+            'state_sets': [[int(n) for n in self._s_best],
+                           [int(n) for n in self._s_other]],
+            'lazy_edges': sorted([int(u), int(v)] for u, v in self._lazy),
+            'checkpoint_every': int(checkpoint_every),
+            'rng': [rng_name, int(rng_pos), int(has_gauss), float(gauss)],
+            'start_states': [[float(v) for v in s]
+                             for s in self._start_states],
+            'profiler': self._profiler.stats,
+            'traj_buffer': traj_buffer,
+        }
+        with open(os.path.join(tmp_path, 'state.json'), 'w') as f:
+            json.dump(state, f, indent=4, sort_keys=True)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+        self.info('Checkpoint: no.nodes = %d, %s', self._node_id, path)
+
+    def resume(self, path):
+        """ Continue a run from a checkpoint written by :meth:`run`
+
+        The graph, parameters, run counters and random number generator state
+        are restored, and the run continues exactly where the checkpoint was
+        taken, writing further checkpoints to the same ``path``.
+
+        """
+        checkpoint_every = self._load_checkpoint(path)
+        return self.run(checkpoint=path, checkpoint_every=checkpoint_every)
 
     def find_best_policies(self):
-        """ Find the best trajectories from starts to goal state """
-        self._best_trajs = []
-        G = self._g
-        for start in G.filter_nodes_by_type(ntype='start'):
-            bt = [start]
-            t = 0
-            while t < self._params.max_traj_len and \
-                    not self._mdp.terminal(G.gna(start, 'data')):
-                action = G.out_edges(start)[G.gna(start, 'pi')]
-                next_node = action[1]
-                t += max(G.gea(start, next_node, 'duration'), 1.0)
-                start = next_node
-                if start not in bt:
-                    bt.append(start)
-            self._best_trajs.append(bt)
+        """ Find the best trajectories from starts to goal state
 
+        The states of the trajectories make up the expansion set
+        :math:`S_{best}`, all other states :math:`S_{other}`.
+
+        """
+        starts = self._g.filter_nodes_by_type(ntype='start')
+        self._best_trajs = self.policy_rollouts(starts)
+        self._update_state_sets()
         return self._best_trajs
 
+    def solve_goals(self, goals, goal_value=None):
+        """ Solve the graph towards each of a set of goal nodes at once
+
+        The built graph and its current edge rewards are shared by all the
+        goals, see :func:`multi_goal_policy_iteration`. The graph attributes
+        are not modified.
+
+        Parameters
+        -----------
+        goals : list
+            Node ids of the goals
+        goal_value : float, optional (default=None)
+            Value of the goal nodes, defaults to the ``goal_reward``
+            parameter
+
+        Returns
+        --------
+        table : :class:`GoalPolicyTable`
+            Lookup of the values and policies per goal, e.g.
+            ``table.policy_for(goal)``
+
+        """
+        if goal_value is None:
+            goal_value = self._params.goal_reward
+        return multi_goal_policy_iteration(self._g, goals, self._mdp.gamma,
+                                           goal_value=goal_value)
+
+    def policy_rollouts(self, starts):
+        """ Follow the current policy from a set of start nodes
+
+        All starts are followed in lockstep on the flat edge arrays of the
+        graph, using a successor vector ``next_node[pi]`` of the policy
+        actions. A rollout ends at a terminal node, a node without out
+        edges, when the accumulated duration reaches ``max_traj_len`` or
+        when it revisits a node (the policy is then cycling and would not
+        add new nodes).
+
+        Parameters
+        -----------
+        starts : list
+            Node ids to start the rollouts from
+
+        Returns
+        --------
+        trajs : list of lists
+            Node ids visited from each start, without repetitions
+
+        """
+        if len(starts) == 0:
+            return []
+
+        G = self._g
+        ea = G.edge_arrays()
+        nodes = ea.nodes.tolist()
+
+        # - successor and duration of the policy action of every node
+        has_out = ea.out_degree > 0
+        next_node = np.zeros(ea.n_nodes, dtype=int)
+        step = np.zeros(ea.n_nodes)
+        if ea.n_edges > 0:
+            pi = G.get_node_attr_array('pi', nodes)
+            action = ea.indptr[:-1][has_out] + pi[has_out]
+            next_node[has_out] = ea.target[action]
+            step[has_out] = np.maximum(ea.duration[action], 1.0)
+        stop = ~has_out | self._terminal_mask(nodes)
+
+        max_len = self._params.max_traj_len
+        n_starts = len(starts)
+        rows = np.arange(n_starts)
+        current = np.array([ea.index[s] for s in starts], dtype=int)
+        t = np.zeros(n_starts)
+        visited = np.zeros((n_starts, ea.n_nodes), dtype=bool)
+        visited[rows, current] = True
+
+        trajs = [[nodes[c]] for c in current]
+        active = ~stop[current] & (t < max_len)
+        while active.any():
+            idx = rows[active]
+            t[idx] += step[current[idx]]
+            current[idx] = next_node[current[idx]]
+            new = ~visited[idx, current[idx]]
+            visited[idx, current[idx]] = True
+            for i in idx[new]:
+                trajs[i].append(nodes[current[i]])
+            active[idx] = new & ~stop[current[idx]] & (t[idx] < max_len)
+
+        return trajs
+
+    def evaluate_lazy_edges(self):
+        """ Evaluate all the edges not yet evaluated
+
+        The optimistic bounds of the lazy edges (``edge_eval='lazy'``) only
+        hold for the reward of the run. Under other reward weights, as in
+        IRL, the features of every edge are needed, so :meth:`update_rewards`
+        and :meth:`trajectory_features` evaluate the remaining lazy edges
+        first.
+
+        """
+        for source, target in sorted(self._lazy):
+            self._evaluate_edge(source, target)
+        return self
+
     def update_rewards(self, new_reward):
         """ Update the reward for all edges in the graph """
         new_reward = np.asarray(new_reward)
         assert new_reward.size == self.mdp.reward.dim,\
             'weight vector and feature vector dimensions do not match'
 
+        self.evaluate_lazy_edges()
         gea = self.graph.gea
         sea = self.graph.sea
 
@@ -230,25 +402,61 @@ class ControllerGraph(MDPRepresentation, Logger):
         specified reward function, on the MDP representation
 
         """
+        features, offsets = self.trajectory_features(trajs)
+        q_trajs = features.dot(np.asarray(reward)) + offsets
+        return list(q_trajs)
+
+    def trajectory_features(self, trajs, follow_policy=True):
+        r""" Compute the discounted feature expectations of trajectories
+
+        Since the reward is linear in the features, the quality of a
+        trajectory under any reward ``r`` is :math:`r^T \mu + c`, where
+        :math:`\mu` is the discounted sum of the features of the policy
+        actions along the trajectory and :math:`c` the discounted goal reward
+        collected at states without outgoing edges.
+
+        Parameters
+        -----------
+        trajs : list
+            Trajectories as sequences of node ids
+        follow_policy : bool, optional (default=True)
+            Take the actions of the current policy at every node. Otherwise
+            the actions are the edges between consecutive nodes, as for
+            expert demonstrations, and the accumulation stops at the first
+            pair of consecutive nodes not connected by an edge.
+
+        Returns
+        --------
+        features : array-like, shape (n_trajs, reward-dim)
+            Discounted feature expectations :math:`\mu` of each trajectory
+        offsets : array-like, shape (n_trajs,)
+            Reward independent part :math:`c` of each trajectory quality
+
+        """
+        self.evaluate_lazy_edges()
         G = self.graph
         gr = self._params.goal_reward
         gamma = self._mdp.gamma
 
-        q_trajs = []
-        for traj in trajs:
+        features = np.zeros((len(trajs), self._mdp.reward.dim))
+        offsets = np.zeros(len(trajs))
+        for i, traj in enumerate(trajs):
             duration = 0
-            q_traj = 0
-            for n in traj:
+            for k, n in enumerate(traj):
                 actions = G.out_edges(n)
-                if actions:  # if no edges, use goal reward???
+                if not actions:  # if no edges, use goal reward???
+                    offsets[i] += (gamma ** duration) * gr
+                    continue
+                if follow_policy:
                     e = actions[G.gna(n, 'pi')]
-                    r = np.dot(reward, G.gea(e[0], e[1], 'phi'))
-                    q_traj += (gamma ** duration) * r
-                    duration += G.gea(e[0], e[1], 'duration')
+                elif k + 1 < len(traj) and G.edge_exists(n, traj[k + 1]):
+                    e = (n, traj[k + 1])
                 else:
-                    q_traj += (gamma ** duration) * gr
-            q_trajs.append(q_traj)
-        return q_trajs
+                    break
+                phi = G.gea(e[0], e[1], 'phi')
+                features[i] += (gamma ** duration) * phi
+                duration += G.gea(e[0], e[1], 'duration')
+        return features, offsets
 
     # -------------------------------------------------------------
     # properties
@@ -262,6 +470,24 @@ class ControllerGraph(MDPRepresentation, Logger):
     def policies(self):
         return self._best_trajs
 
+    @property
+    def stats(self):
+        """ Phase times and call counts of the runs, see :class:`Profiler`
+        """
+        return self._profiler.stats
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @property
+    def sampler(self):
+        return self._sampler
+
+    @property
+    def params(self):
+        return self._params
+
     @property
     def mdp(self):
         return self._mdp
@@ -274,8 +500,113 @@ class ControllerGraph(MDPRepresentation, Logger):
     # internals
     # -------------------------------------------------------------
 
+    def _run_loop(self, checkpoint, checkpoint_every):
+        """ Expand the state graph until ``max_samples`` states, see
+        :meth:`run` """
+        p_b = self._params.p_best
+        cscale = self._params.conc_scale
+        prof = self._profiler
+        last_checkpoint = self._node_id
+        while self._node_id < self._params.max_samples:
+            if self._node_id % 10 == 0:
+                self.info('Run: no.nodes = %d', self._node_id)
+
+            with prof.phase('sampler'):
+                self._sampler.update(self)
+
+            # - select state expansion set between S_best and S_other
+            with prof.phase('select'):
+                e_set = self._s_other
+                if uniform(0, 1) > p_b or len(self._s_other) == 0:
+                    e_set = self._s_best
+
+            exp_queue = []
+            exp_probs = []
+            for _ in range(min(self._node_id, self._params.n_expand)):
+                # - select state to expand
+                picked = False
+                while not picked:
+                    xn = e_set.sample()
+                    xn_data = self._g.gna(xn, 'data')
+                    if not self._mdp.terminal(xn_data) and \
+                            self._sampler.accept(xn_data):
+                        picked = True
+                        break
+
+                # - expand graph from chosen state(s)m
+                for _ in range(self._params.n_new):
+                    with prof.phase('sample'):
+                        new_state = self._sample_new_state_from(xn)
+                    if new_state is None:
+                        continue
+
+                    # - compute exploration score of the new state
+                    with prof.phase('explore'):
+                        conc, es, var_es = self._exploration_score(new_state)
+                    if conc > self._max_conc:
+                        self._max_conc = conc
+                    if es > self._max_es:
+                        self._max_es = es
+                    if es < self._min_es:
+                        self._min_es = es
+                    conc = conc / float(self._max_conc)
+                    es = map_range(es, self._min_es, self._max_es, 0.0, 1.0)
+                    if var_es > self._params.exp_thresh:
+                        exp_queue.append(new_state)
+                        exp_probs.append(es + cscale*conc)
+
+            # - expand around exploration states (if any)
+            for _ in range(min(len(exp_queue), self._params.n_add)):
+                with prof.phase('add'):
+                    index = wchoice(np.arange(len(exp_queue)), exp_probs)
+                    sn = exp_queue[index]
+
+                    # add the selected node to the graph
+                    nid = self._node_id
+                    self._g.add_node(nid=nid, data=sn['data'],
+                                     cost=sn['cost'], pi=0, Q=[0],
+                                     V=sn['V'], ntype='simple',
+                                     priority=exp_probs[index])
+                    self._s_other.update(nid, exp_probs[index])
+                    self._g.add_edge(source=sn['b_state'], target=nid,
+                                     reward=sn['f_reward'], phi=sn['f_phi'],
+                                     duration=sn['f_duration'],
+                                     traj=sn['f_traj'])
+
+                    # - add the missing backwards edge
+                    self._connect_states(nid, sn['b_state'])
+
+                    exp_queue = exp_queue[:index] + exp_queue[index+1:]
+                    exp_probs = exp_probs[:index] + exp_probs[index+1:]
+
+                    self._node_id += 1
+                    self._improve_state(nid)
+
+            # - update state attributes, policies
+            with prof.phase('costs'):
+                self._update_state_costs()
+            with prof.phase('policy_iteration'):
+                self._policy_iteration()
+            with prof.phase('priorities'):
+                self._update_state_priorities()
+            with prof.phase('best_policies'):
+                self.find_best_policies()
+            prof.record(nodes=self._node_id, edges=len(self._g.all_edges))
+
+            if checkpoint is not None and \
+                    self._node_id - last_checkpoint >= checkpoint_every:
+                with prof.phase('checkpoint'):
+                    self.save_checkpoint(checkpoint, checkpoint_every)
+                last_checkpoint = self._node_id
+
     def _fixed_init(self, samples, extra_state_attr=False):
-        """ Initialize from random samples """
+        """ Initialize from random samples
+
+        The start, goal and sample states are connected pairwise
+        (``init_type='random'``), or to their nearest neighbors only, see
+        :meth:`_connect_neighbors`.
+
+        """
         GR = self._params.goal_reward
         CLIMIT = self._params.max_cost
 
@@ -309,18 +640,97 @@ class ControllerGraph(MDPRepresentation, Logger):
                              priority=1, V=GR, pi=0, Q=[], ntype='simple')
             self._node_id += 1
 
+        if self._params.init_type != 'random':
+            self._connect_neighbors()
+            return
+
         # - add edges between each pair
         for n in self._g.nodes:
             for m in self._g.nodes:
                 if n == m or self._mdp.terminal(self._g.gna(n, 'data')):
                     continue
-                ndata, mdata = self._g.gna(n, 'data'), self._g.gna(m, 'data')
-                traj = self._controller.trajectory(ndata, mdata,
-                                                   self._params.speed)
-                d = trajectory_length(traj)
-                r, phi = self._mdp.reward(ndata, traj)
-                self._g.add_edge(source=n, target=m, reward=r,
-                                 duration=d, phi=phi, traj=traj)
+                self._connect_states(n, m)
+
+    def _connect_neighbors(self):
+        """ Connect the states to their spatial neighbors
+
+        Pairs of states are candidates when one is among the ``n_neighbors``
+        nearest neighbors of the other (``init_type='knn'``), or when they
+        are within ``radius`` (``init_type='radius'``). Candidate pairs are
+        connected in both directions, nearest first, as long as neither
+        state has ``max_edges`` out edges.
+
+        If the connected pairs leave the states in several components, they
+        are joined (regardless of ``max_edges``) along the minimum spanning
+        tree of the components over the candidate pairs, then over the
+        nearest states of the other components, so that a terminal state is
+        reachable from every start.
+
+        """
+        G = self._g
+        nodes = list(G.nodes)
+        n = len(nodes)
+        if n < 2:
+            return
+        pos = G.get_node_attr_array('data', nodes)[:, :2]
+        tree = cKDTree(pos)
+
+        if self._params.init_type == 'knn':
+            k = min(self._params.n_neighbors, n - 1) + 1
+            _, near = tree.query(pos, k=k)
+            candidates = set((min(i, j), max(i, j))
+                             for i in range(n) for j in near[i] if i != j)
+        else:
+            candidates = tree.query_pairs(self._params.radius)
+        candidates = sorted(candidates, key=lambda p: (
+            np.hypot(*(pos[p[0]] - pos[p[1]])), p))
+
+        # - terminal states have no out edges, and no edge limit
+        terminal = self._terminal_mask(nodes)
+        degree = np.zeros(n, dtype=int)
+        max_edges = self._params.max_edges
+        pairs = []
+        for i, j in candidates:
+            if all(terminal[a] or degree[a] < max_edges for a in (i, j)):
+                pairs.append((i, j))
+                degree[[i, j]] += 1
+
+        # - join the components along the candidate pairs
+        n_components, labels = _components(pairs, n)
+        if n_components > 1 and candidates:
+            i, j = np.array(candidates).T
+            d = np.hypot(*(pos[i] - pos[j]).T)
+            pairs.extend(_component_tree(labels, n_components, i, j, d))
+            n_components, labels = _components(pairs, n)
+
+        # - then along the shortest pair out of each component (Boruvka),
+        # among the k nearest neighbors of the states
+        k = 2
+        while n_components > 1:
+            k = min(2 * k, n)
+            distances, near = tree.query(pos, k=k)
+            other = labels[near] != labels[:, None]
+            found = other.any(axis=1)
+            first = other.argmax(axis=1)
+            nearest = np.where(found, distances[np.arange(n), first], np.inf)
+
+            # - the pair is the shortest out of the component only if no
+            # state of the component without one may have a shorter one
+            unseen = np.full(n_components, np.inf)
+            np.minimum.at(unseen, labels[~found], distances[~found, -1])
+            order = np.lexsort((nearest, labels))
+            heads = order[np.r_[True, labels[order][1:] !=
+                                labels[order][:-1]]]
+            i = heads[found[heads] & (nearest[heads] <= unseen[labels[heads]])]
+            pairs.extend(_component_tree(labels, n_components, i,
+                                         near[i, first[i]], nearest[i]))
+            n_components, labels = _components(pairs, n)
+        self._profiler.count('init_pairs', len(pairs))
+
+        for i, j in pairs:
+            for a, b in ((i, j), (j, i)):
+                if not terminal[a]:
+                    self._connect_states(nodes[a], nodes[b])
 
     def _traj_init(self, trajs, extra_state_attr=False):
         """ Initialize from a set of expert trajectories
@@ -341,7 +751,7 @@ class ControllerGraph(MDPRepresentation, Logger):
         g = copy.copy(self._node_id)
         self._node_id += 1
 
-        self._params.start_states = []
+        self._start_states = []
         vmax = self._params.speed
         for traj in trajs:
             # - add start
@@ -351,7 +761,7 @@ class ControllerGraph(MDPRepresentation, Logger):
             else:
                 smp = start
 
-            self._params.start_states.append(start)
+            self._start_states.append(start)
             self._g.add_node(nid=self._node_id, data=smp, cost=0,
                              priority=1, V=GR, pi=0, Q=[], ntype='start')
             n = copy.copy(self._node_id)
@@ -370,6 +780,8 @@ class ControllerGraph(MDPRepresentation, Logger):
                 traj = self._controller.trajectory(ndata, mdata, vmax)
                 d = trajectory_length(traj)
                 r, phi = self._mdp.reward(ndata, traj)
+                self._profiler.count('controller')
+                self._profiler.count('reward')
                 self._g.add_edge(source=n, target=m, reward=r,
                                  duration=d, phi=phi, traj=traj)
                 n = copy.copy(self._node_id)
@@ -379,9 +791,20 @@ class ControllerGraph(MDPRepresentation, Logger):
             traj = self._controller.trajectory(fdata, tdata, vmax)
             d = trajectory_length(traj)
             r, phi = self._mdp.reward(fdata, traj)
+            self._profiler.count('controller')
+            self._profiler.count('reward')
             self._g.add_edge(source=m, target=g, reward=r,
                              duration=d, phi=phi, traj=traj)
 
+    def _terminal_mask(self, nodes):
+        """ Terminal flags of a list of nodes (cached per node) """
+        terminal = self._terminal
+        ndata = self._g.G.node
+        for n in nodes:
+            if n not in terminal:
+                terminal[n] = self._mdp.terminal(ndata[n]['data'])
+        return np.array([terminal[n] for n in nodes], dtype=bool)
+
     def _sample_new_state_from(self, state):
         """ Sample new node in the neighborhood of a given state (node)
 
@@ -400,7 +823,15 @@ class ControllerGraph(MDPRepresentation, Logger):
         Returns
         ------------
         state_dict : dict
-            dict with the attributes of the new sampled state
+            dict with the attributes of the new sampled state, None if no
+            action of the sampled duration succeeds
+
+        Note
+        -----
+        Actions are drawn by the action sampler (see :mod:`samplers`) from
+        the feasible action intervals of the local controller (see
+        :meth:`LocalController.feasible_actions`), or from all headings if
+        the intervals are unknown, for at most ``_max_attempts`` attempts.
         """
         gna = self._g.gna
         iteration = len(self._g.nodes)
@@ -410,16 +841,23 @@ class ControllerGraph(MDPRepresentation, Logger):
         cs = gna(state, 'data')
         vmax = self._params.speed
 
-        succeeded = False
-        while not succeeded:
-            action = uniform(0.0, 2.0*np.pi)
-            ns, f_traj = self._controller(cs, action, duration, vmax)
-            if f_traj is not None:
-                succeeded = True
-                break
+        # - draw the actions from those with an end state in the world
+        intervals = self._controller.feasible_actions(cs, duration)
+        f_traj = None
+        if intervals != []:
+            for _ in range(self._max_attempts):
+                action = self._sampler(cs, duration, intervals)
+                ns, f_traj = self._controller(cs, action, duration, vmax)
+                self._profiler.count('controller')
+                if f_traj is not None:
+                    break
+        if f_traj is None:
+            self._profiler.count('infeasible')
+            return None
 
         # - can be costly, only compute the forward case here
         reward, phi = self._mdp.reward(state=gna(state, 'data'), action=f_traj)
+        self._profiler.count('reward')
 
         state_dict = dict()
         state_dict['data'] = ns
@@ -436,28 +874,127 @@ class ControllerGraph(MDPRepresentation, Logger):
         state_dict['b_data'] = cs
         return state_dict
 
+    def _load_checkpoint(self, path):
+        """ Restore the state saved by :meth:`save_checkpoint` """
+        with open(os.path.join(path, 'state.json'), 'r') as f:
+            state = json.load(f)
+        self._params.load(os.path.join(path, 'params.json'))
+
+        self._g.load_graph(os.path.join(path, 'graph'))
+        self._terminal.clear()
+
+        # - trajectories are read in, as the checkpoint files are replaced by
+        # the later checkpoints of the resumed run
+        if not self._load_trajectory_handles(path, state.get('traj_buffer')):
+            trajectories = self._g.trajectories
+            if trajectories is not None:
+                trajectories.clear()
+            for u, v, data in self._g.G.edges_iter(data=True):
+                if trajectories is not None:
+                    data['traj'] = trajectories.append(data['traj'])
+                else:
+                    data['traj'] = np.array(data['traj'])
+
+        self._node_id = state['node_id']
+        self._max_conc = state['max_conc']
+        self._max_es = state['max_es']
+        self._min_es = state['min_es']
+        self._best_trajs = state['best_trajs']
+        self._lazy = set((u, v) for u, v in state.get('lazy_edges', []))
+        self._start_states = state.get('start_states', [])
+        self._profiler.restore(state.get('profiler', dict()))
+
+        demo_file = os.path.join(path, 'demo_points.npy')
+        self._demo_points = np.load(demo_file) \
+            if os.path.exists(demo_file) else np.zeros((0, 2))
+        self._sampler.fit([self._demo_points])
+
+        for sampler, nodes in zip((self._s_best, self._s_other),
+                                  state['state_sets']):
+            sampler.clear()
+            for n in nodes:
+                sampler.update(n, self._g.gna(n, 'priority'))
+
+        rng_name, rng_pos, has_gauss, gauss = state['rng']
+        rng_keys = np.load(os.path.join(path, 'rng_keys.npy'))
+        np.random.set_state((str(rng_name), rng_keys, rng_pos, has_gauss,
+                             gauss))
+        return state['checkpoint_every']
+
+    def _save_trajectory_handles(self, path):
+        """ Save the buffer handles of the edge trajectories, if the buffer
+        is a memory mapped file that outlives the run """
+        trajectories = self._g.trajectories
+        if trajectories is None or trajectories.mode != 'mmap' or \
+                self._params.traj_file is None or trajectories.width is None:
+            return None
+        trajectories.flush()
+        # - edges not yet evaluated hold their straight segment
+        handles = [(u, v) + data['traj']
+                   for u, v, data in self._g.G.edges_iter(data=True)
+                   if isinstance(data['traj'], tuple)]
+        np.save(os.path.join(path, 'traj_handles.npy'),
+                np.reshape(np.array(handles, dtype=np.int64), (-1, 4)))
+        return [self._params.traj_file, int(trajectories.size),
+                int(trajectories.width)]
+
+    def _load_trajectory_handles(self, path, traj_buffer):
+        """ Point the edges back to their trajectories in the buffer file,
+        returns False if the buffer cannot be reused """
+        trajectories = self._g.trajectories
+        if traj_buffer is None or trajectories is None or \
+                trajectories.mode != 'mmap' or \
+                traj_buffer[0] != self._params.traj_file:
+            return False
+        try:
+            trajectories.attach(traj_buffer[1], traj_buffer[2])
+        except ValueError:
+            return False
+        edata = self._g.G.edge
+        for u, v, offset, n in np.load(os.path.join(path, 'traj_handles.npy')):
+            edata[int(u)][int(v)]['traj'] = (int(offset), int(n))
+        return True
+
+    def _edge_trajectory(self, source, target):
+        """ Recompute the local trajectory of an edge """
+        return self._controller.trajectory(self._g.gna(source, 'data'),
+                                           self._g.gna(target, 'data'),
+                                           self._params.speed)
+
     def _update_state_costs(self):
         """ Update the costs of all states in the graph
 
         Estimate the costs of all vertices in the graph in an optimistic way
 
+        Label correcting relaxation on the edge arrays: every sweep relaxes,
+        at once, the out edges of the nodes whose cost changed in the
+        previous sweep, until no cost changes.
+
         """
         # TODO - create a node visitor from starts to goal??
         # - What about multiple goal start cases?
         cmax = self._params.max_cost
         G = self._g
-        converged = False
-        while not converged:
-            cost_changed = False
-            for node in G.nodes:
-                for e in G.out_edges(node):
-                    nn = e[1]
-                    cost = G.gna(node, 'cost') + G.gea(e[0], e[1], 'reward')
-                    if G.gna(nn, 'cost') < cost and abs(cost) < cmax:
-                        G.sna(nn, 'cost', cost)
-                        cost_changed = True
-            if not cost_changed:
-                converged = True
+        ea = G.edge_arrays()
+        nodes = ea.nodes.tolist()
+
+        costs = G.get_node_attr_array('cost', nodes)
+        new_costs = costs.copy()
+        changed = np.ones(ea.n_nodes, dtype=bool)
+        while changed.any():
+            active = changed[ea.source]
+            source, target = ea.source[active], ea.target[active]
+            cost = new_costs[source] + ea.reward[active]
+            relax = (new_costs[target] < cost) & (np.abs(cost) < cmax)
+            if not relax.any():
+                break
+            previous = new_costs.copy()
+            np.maximum.at(new_costs, target[relax], cost[relax])
+            changed = new_costs > previous
+
+        changed = np.flatnonzero(new_costs != costs)
+        G.set_node_attr_array('cost', new_costs[changed],
+                              [nodes[i] for i in changed])
 
     def _update_state_priorities(self):
         """ Update priority values for all states
@@ -470,41 +1007,98 @@ class ControllerGraph(MDPRepresentation, Logger):
         self._max_conc = max(cc)
         cc = [c / float(self._max_conc) for c in cc]
 
-        ess = [G.gna(n, 'cost') + G.gna(n, 'V') for n in states]
-        self._max_es = max(ess)
-        self._min_es = min(ess)
-        ess = [(s - self._min_es) / float((self._max_es - self._min_es))
-               for s in ess]
-
-        cscale = self._params.conc_scale
-        for i, state in enumerate(states):
-            G.sna(state, 'priority', ess[i] + cscale*cc[i])
+        ess = G.get_node_attr_array('cost', states) + \
+            G.get_node_attr_array('V', states)
+        self._max_es = ess.max()
+        self._min_es = ess.min()
+        if self._max_es > self._min_es:
+            ess = (ess - self._min_es) / float(self._max_es - self._min_es)
+        else:
+            # - all states score alike, e.g. a single state
+            ess = np.zeros(len(ess))
+
+        priorities = (ess + self._params.conc_scale * np.array(cc)).tolist()
+        G.set_node_attr_array('priority', priorities, states)
+        for state, priority in zip(states, priorities):
+            if state in self._s_best:
+                self._s_best.update(state, priority)
+            else:
+                self._s_other.update(state, priority)
 
     def _improve_state(self, s):
         """ Improve a state's utility by adding connections """
         neighbors = self._g.find_neighbors_range(s, self._params.radius)
-        vmax = self._params.speed
         for n in neighbors:
             if n != s:
-                xs = self._g.gna(s, 'data')
-                xn = self._g.gna(n, 'data')
                 if len(self._g.out_edges(s)) < self._params.max_edges:
                     if not self._g.edge_exists(s, n) and\
                             not self._mdp.terminal(self._g.gna(s, 'data')):
-                        traj = self._controller.trajectory(xs, xn, vmax)
-                        d = trajectory_length(traj)
-                        reward, phi = self._mdp.reward(xs, traj)
-
-                        self._g.add_edge(source=s, target=n, phi=phi,
-                                         duration=d, reward=reward, traj=traj)
+                        self._connect_states(s, n)
                 if len(self._g.out_edges(n)) < self._params.max_edges:
                     if not self._g.edge_exists(n, s) and\
                             not self._mdp.terminal(self._g.gna(n, 'data')):
-                        traj = self._controller.trajectory(xn, xs, vmax)
-                        d = trajectory_length(traj)
-                        rb, phi = self._mdp.reward(xn, traj)
-                        self._g.add_edge(source=n, target=s, phi=phi,
-                                         duration=d, reward=rb, traj=traj)
+                        self._connect_states(n, s)
+
+    def _connect_states(self, source, target):
+        """ Add an edge from ``source`` to ``target``
+
+        The edge trajectory is the local controller trajectory between the
+        states. With lazy edges (``edge_eval='lazy'``) the edge holds the
+        straight segment between the states instead, i.e. a lower bound of
+        the duration and an optimistic reward for rewards that penalize the
+        waypoints, until a best policy takes it, see
+        :meth:`_policy_iteration`. The straight segment is held by the edge,
+        out of the trajectory buffer.
+
+        """
+        xs, xt = self._g.gna(source, 'data'), self._g.gna(target, 'data')
+        lazy = self._params.edge_eval == 'lazy'
+        if lazy:
+            traj = np.array([xs, xt], dtype=float)
+            self._lazy.add((source, target))
+            self._profiler.count('lazy_edge')
+        else:
+            traj = self._controller.trajectory(xs, xt, self._params.speed)
+            self._profiler.count('controller')
+        d = trajectory_length(traj)
+        reward, phi = self._mdp.reward(xs, traj)
+        self._profiler.count('reward')
+        self._g.add_edge(source=source, target=target, reward=reward,
+                         duration=d, phi=phi, traj=traj, buffered=not lazy)
+
+    def _policy_iteration(self):
+        """ Policy iteration, evaluating the lazy edges of the best policies
+
+        Lazy edges taken by the best trajectories from the starts get their
+        local controller trajectory, duration and reward, and the policies are
+        iterated again, until the best trajectories only take evaluated
+        edges.
+
+        """
+        graph_policy_iteration(self._g, self._mdp.gamma)
+        while self._lazy:
+            starts = self._g.filter_nodes_by_type(ntype='start')
+            edges = [e for traj in self.policy_rollouts(starts)
+                     for e in zip(traj[:-1], traj[1:]) if e in self._lazy]
+            if not edges:
+                break
+            for source, target in edges:
+                self._evaluate_edge(source, target)
+            graph_policy_iteration(self._g, self._mdp.gamma)
+
+    def _evaluate_edge(self, source, target):
+        """ Replace the optimistic bounds of a lazy edge by its values """
+        if (source, target) not in self._lazy:
+            return
+        self._lazy.discard((source, target))
+        traj = self._edge_trajectory(source, target)
+        reward, phi = self._mdp.reward(self._g.gna(source, 'data'), traj)
+        self._profiler.count('controller')
+        self._profiler.count('reward')
+        self._g.sea(source, target, 'traj', traj)
+        self._g.sea(source, target, 'duration', trajectory_length(traj))
+        self._g.sea(source, target, 'reward', reward)
+        self._g.sea(source, target, 'phi', np.asarray(phi))
 
     def _exploration_score(self, state_dict):
         """ Exploration score :math:`p(s)`
@@ -540,6 +1134,7 @@ class ControllerGraph(MDPRepresentation, Logger):
 
         gram = gp_covariance(train_data, train_data)
         y, v = gp_predict(state_dict['data'], train_data, gram, train_values)
+        self._profiler.count('gp')
 
         state_dict['V'] = y
         return concentration, (node_cost + y), v
@@ -563,25 +1158,23 @@ class ControllerGraph(MDPRepresentation, Logger):
         concentration = 1.0 / float(1 + len(neighbors))
         return concentration
 
-    def _generate_state_sets(self):
-        """ Generate state sets, S_best and S_other
+    def _update_state_sets(self):
+        """ Move states between the samplers of S_best and S_other
 
         Separate states into two sets, :math:`S_{best}, S_{other}` based on
         whether or not the states are part of the best trajectories so far.
+        Only the states entering or leaving the best trajectories are moved.
 
         """
-        gna = self._g.gna
-        all_nodes = set(self._g.nodes)
         best_set = set(n for traj in self._best_trajs for n in traj)
-        other_set = all_nodes.difference(best_set)
-
-        sum_p_best = sum(gna(n, 'priority') for n in best_set)
-        sum_p_other = sum(gna(n, 'priority') for n in other_set)
-
-        S_best = {n: gna(n, 'priority')/sum_p_best for n in best_set}
-        S_other = {n: gna(n, 'priority')/sum_p_other for n in other_set}
-
-        return S_best, S_other
+        for n in [n for n in self._s_best if n not in best_set]:
+            self._s_other.update(n, self._s_best.priority(n))
+            self._s_best.remove(n)
+        for n in best_set:
+            if n not in self._s_best:
+                if n in self._s_other:
+                    self._s_other.remove(n)
+                self._s_best.update(n, self._g.gna(n, 'priority'))
 
     def _sample_control_time(self, i, imax):
         """ Sample a time interval for running a local controller
@@ -602,65 +1195,210 @@ class ControllerGraph(MDPRepresentation, Logger):
 class CGParameters(object):
     """ ControllerGraph parameters for representation learning
 
-    Uses json encoding for persistence.
+    Parameters are typed fields, validated whenever they are set (from
+    keyword arguments, a json file or by attribute assignment). Unknown
+    names, values of the wrong type and numeric values out of range (e.g. a
+    probability outside [0, 1]) raise a ``ValueError``.
+
+    Uses json encoding for persistence, and the sha1 of the sorted json
+    encoding as a stable content hash, see :meth:`content_hash`.
 
     """
 
-    _PARAMS = [
-        'n_expand',
-        'n_new',
-        'n_add',
-        'radius',
-        'exp_thresh',
-        'max_traj_len',
-        'p_best',
-        'max_samples',
-        'max_edges',
-        'init_type',
-        'max_cost',
-        'conc_scale',
-        'speed',
-        'tmin',
-        'tmax',
-        'goal_reward',
-    ]
+    # - (name, type, default), with type one of 'int', 'float', 'pair',
+    # 'str' or a tuple of allowed choices
+    _FIELDS = (
+        ('n_expand', 'int', 1),
+        ('n_new', 'int', 20),
+        ('n_add', 'int', 1),
+        ('radius', 'float', 1.8),
+        ('exp_thresh', 'float', 1.2),
+        ('max_traj_len', 'float', 500),
+        ('goal_reward', 'float', 1),
+        ('p_best', 'float', 0.4),
+        ('max_samples', 'int', 100),
+        ('max_edges', 'int', 360),
+        # - all pairs of seed states are connected with 'random', the
+        # nearest ones with 'knn' (n_neighbors) and 'radius'
+        ('init_type', ('random', 'trajectory', 'knn', 'radius'), 'random'),
+        ('n_neighbors', 'int', 8),
+        ('max_cost', 'float', 1000),
+        ('conc_scale', 'float', 1),
+        ('speed', 'float', 1.0),
+        ('tmin', 'pair', (0.45, 2.4)),
+        ('tmax', 'pair', (3.6, 7.2)),
+        # - see TrajectoryBuffer
+        ('traj_store', ('edges', 'memory', 'mmap', 'features'), 'edges'),
+        ('traj_file', 'str', None),
+        # - evaluate the local controller of an edge when it is added, or
+        # only once a best policy takes it
+        ('edge_eval', ('eager', 'lazy'), 'eager'),
+        # - action sampling strategy, see sirl.algorithms.samplers
+        ('sampler', ('uniform', 'goal', 'informed', 'coverage', 'demo'),
+         'uniform'),
+        ('goal_bias', 'float', 0.3),
+        ('n_candidates', 'int', 8),
+    )
+
+    _PARAMS = [f[0] for f in _FIELDS]
+    _TYPES = dict((f[0], f[1]) for f in _FIELDS)
+
+    # - admissible ranges of the numeric fields, as (description, check)
+    _RANGES = {
+        'n_expand': ('>= 1', lambda v: v >= 1),
+        'n_new': ('>= 1', lambda v: v >= 1),
+        'n_add': ('>= 1', lambda v: v >= 1),
+        'n_neighbors': ('>= 1', lambda v: v >= 1),
+        'n_candidates': ('>= 1', lambda v: v >= 1),
+        'max_samples': ('>= 1', lambda v: v >= 1),
+        'max_edges': ('>= 1', lambda v: v >= 1),
+        'radius': ('> 0', lambda v: v > 0),
+        'speed': ('> 0', lambda v: v > 0),
+        'p_best': ('in [0, 1]', lambda v: 0 <= v <= 1),
+        'goal_bias': ('in [0, 1]', lambda v: 0 <= v <= 1),
+        # - state priorities must not be negative, see PrioritySampler
+        'conc_scale': ('>= 0', lambda v: v >= 0),
+    }
+
+    __slots__ = tuple(_PARAMS)
 
     def __init__(self, **kwargs):
-        self.n_expand = kwargs.pop('n_expand', 1)
-        self.n_new = kwargs.pop('n_new', 20)
-        self.n_add = kwargs.pop('n_add', 1)
-        self.radius = kwargs.pop('radius', 1.8)
-        self.exp_thresh = kwargs.pop('exp_thresh', 1.2)
-        self.max_traj_len = kwargs.pop('max_traj_len', 500)
-        self.goal_reward = kwargs.pop('goal_reward', 1)
-        self.p_best = kwargs.pop('p_best', 0.4)
-        self.max_samples = kwargs.pop('max_samples', 100)
-        self.max_edges = kwargs.pop('max_edges', 360)
-        self.init_type = kwargs.pop('init_type', 'random')
-        self.max_cost = kwargs.pop('max_cost', 1000)
-        self.conc_scale = kwargs.pop('conc_scale', 1)
-        self.speed = kwargs.pop('speed', 1.0)
-        self.tmin = kwargs.pop('tmin', (0.45, 2.4))
-        self.tmax = kwargs.pop('tmax', (3.6, 7.2))
+        for name, _, default in self._FIELDS:
+            setattr(self, name, default)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, self._validate(name, value))
 
     def load(self, json_file):
         """ Load parameters from a json file """
         with open(json_file, 'r') as f:
             jdata = json.load(f)
-            for k, v in jdata.items():
-                self.__dict__[k] = v
+        values = dict((k, self._validate(k, v)) for k, v in jdata.items())
+        for k, v in values.items():
+            setattr(self, k, v)
 
     def save(self, filename):
         """ Save the parameters to file """
         with open(filename, 'w') as f:
             json.dump(self._to_dict(), f, indent=4, sort_keys=True)
 
-    def __repr__(self):
+    def derive(self, **changes):
+        """ New parameters with the given fields changed """
+        params = CGParameters.__new__(CGParameters)
+        for name in self._PARAMS:
+            object.__setattr__(params, name, getattr(self, name))
+        for name, value in changes.items():
+            setattr(params, name, value)
+        return params
+
+    def content_hash(self):
+        """ Stable sha1 hex digest of the parameter values """
+        jdata = json.dumps(self._to_dict(), sort_keys=True)
+        return hashlib.sha1(jdata.encode('utf-8')).hexdigest()
+
+    def __getstate__(self):
         return self._to_dict()
 
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    def __eq__(self, other):
+        return isinstance(other, CGParameters) and \
+            self._to_dict() == other._to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'CGParameters({})'.format(', '.join(
+            '{}={!r}'.format(k, getattr(self, k)) for k in self._PARAMS))
+
     def __str__(self):
         d = self._to_dict()
-        return ''.join('{}: {}\n'.format(k, v) for k, v in d.items())
+        return ''.join('{}: {}\n'.format(k, d[k]) for k in self._PARAMS)
 
     def _to_dict(self):
-        return self.__dict__
+        return dict((k, getattr(self, k)) for k in self._PARAMS)
+
+    @classmethod
+    def _validate(cls, name, value):
+        """ Check (and normalize) the value of a parameter """
+        if name not in cls._TYPES:
+            raise ValueError('Unknown parameter [{}] | Expected: {}'
+                             .format(name, cls._PARAMS))
+        kind = cls._TYPES[name]
+
+        def number(v):
+            return isinstance(v, numbers.Real) and not isinstance(v, bool)
+
+        if kind == 'int' and number(value) and int(value) == value:
+            return cls._check_range(name, int(value))
+        elif kind == 'float' and number(value):
+            return cls._check_range(name, float(value))
+        elif kind == 'pair' and isinstance(value, (tuple, list)) and \
+                len(value) == 2 and all(number(v) for v in value):
+            return tuple(float(v) for v in value)
+        elif kind == 'str' and (value is None or
+                                isinstance(value, six.string_types)):
+            return value
+        elif isinstance(kind, tuple) and value in kind:
+            return str(value)
+        raise ValueError('Invalid value for parameter [{}]: {!r} | '
+                         'Expected: {}'.format(name, value, kind))
+
+    @classmethod
+    def _check_range(cls, name, value):
+        """ Check that a numeric value is within the range of its field """
+        if name in cls._RANGES:
+            expected, check = cls._RANGES[name]
+            if not check(value):
+                raise ValueError('Invalid value for parameter [{}]: {!r} | '
+                                 'Expected: {}'.format(name, value, expected))
+        return value
+
+
+# -------------------------------------------------------------
+# internals
+# -------------------------------------------------------------
+
+
+def _components(pairs, n):
+    """ Connected components of ``n`` states joined by undirected pairs """
+    rows, cols = list(zip(*pairs)) if pairs else ((), ())
+    adjacency = sp.coo_matrix((np.ones(len(pairs)), (rows, cols)),
+                              shape=(n, n))
+    return csgraph.connected_components(adjacency, directed=False)
+
+
+def _component_tree(labels, n_components, i, j, d):
+    """ Pairs of states of the minimum spanning tree of the components
+
+    The components are joined by the pairs of states ``(i[k], j[k])`` at
+    distances ``d[k]``, keeping the shortest pair between two components.
+
+    """
+    a, b = labels[i], labels[j]
+    cross = a != b
+    if not np.any(cross):
+        return []
+    i, j, d = i[cross], j[cross], d[cross]
+    lo, hi = np.minimum(a, b)[cross], np.maximum(a, b)[cross]
+
+    order = np.lexsort((d, hi, lo))
+    keys = lo[order] * n_components + hi[order]
+    shortest = order[np.r_[True, keys[1:] != keys[:-1]]]
+    # - coincident states are still adjacent in the tree
+    weights = sp.coo_matrix((np.maximum(d[shortest], 1e-12),
+                             (lo[shortest], hi[shortest])),
+                            shape=(n_components, n_components))
+    tree = csgraph.minimum_spanning_tree(weights.tocsr()).tocoo()
+
+    lookup = dict(zip(zip(lo[shortest], hi[shortest]), shortest))
+    edges = [lookup[(min(r, c), max(r, c))]
+             for r, c in zip(tree.row, tree.col)]
+    return [(int(min(i[e], j[e])), int(max(i[e], j[e]))) for e in edges]
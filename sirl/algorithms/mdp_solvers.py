@@ -4,9 +4,23 @@ Markov Decision Process (MDP) Solvers
 
 A set of MDP solvers, including
     * Policy iteration
+    * Batched policy iteration over several reward functions
+    * Policy iteration towards several goals
     * Prioritized Sweeping (pending)
 """
 
+from __future__ import division
+
+import numpy as np
+
+
+__all__ = [
+    'graph_policy_iteration',
+    'batch_policy_iteration',
+    'multi_goal_policy_iteration',
+    'GoalPolicyTable',
+]
+
 
 def graph_policy_iteration(G, gamma=0.9, epsilon=1e-07, iter_max=20):
     """ Graph policy iteration for use with adaptive state graphs
@@ -81,3 +95,263 @@ def graph_policy_iteration(G, gamma=0.9, epsilon=1e-07, iter_max=20):
 
         if changed is False or it == iter_max:
             policy_stable = True
+
+
+def batch_policy_iteration(G, rewards, gamma=0.9, epsilon=1e-07,
+                           iter_max=20):
+    """ Policy iteration for a batch of linear reward functions
+
+    Solve the MDPs of the graph ``G`` for ``K`` reward weight vectors at
+    once, over the flat edge arrays of the graph (see
+    :meth:`StateGraph.edge_arrays`). The edge rewards of reward ``k`` are
+    ``phi.dot(rewards[k])``. Each of the ``K`` problems is iterated until its
+    own policy is stable (or ``iter_max`` is reached), as in
+    :func:`graph_policy_iteration`, which is started from the values and
+    policies stored in the graph.
+
+    Unlike :func:`graph_policy_iteration`, the policy evaluation sweeps
+    update all the values synchronously, and the graph is not modified.
+
+    Parameters
+    ----------
+    G : ``StateGraph`` object
+        The state graph representing the MDP, with edge features of a fixed
+        dimension
+    rewards : array-like, shape (K, reward-dim)
+        Reward weight vectors
+    gamma : float, optional (default: 0.9)
+        Discount factor
+    epsilon : float, optional (default: 1e-07)
+        Value change threshold for Bellman backup
+    iter_max : int
+        Maximum number of iterations of the policy iteration sweeps
+
+    Returns
+    --------
+    V : array-like, shape (N, K)
+        Values of the nodes, in the order of ``G.edge_arrays().nodes``
+    pi : array-like, shape (N, K)
+        Policies of the nodes, as indices into their out edges
+
+    """
+    ea = G.edge_arrays()
+    rewards = np.atleast_2d(np.asarray(rewards, dtype=float))
+    if ea.phi is None or (ea.n_edges > 0 and
+                          ea.phi.shape[1] != rewards.shape[1]):
+        raise ValueError('Edge features do not match the reward dimension')
+
+    V, pi = _initial_tables(G, rewards.shape[0])
+    if ea.n_edges == 0:
+        return V, pi
+
+    R = ea.phi.dot(rewards.T)
+    return _solve_tables(ea, R, V, pi, gamma, epsilon, iter_max)
+
+
+def multi_goal_policy_iteration(G, goals, gamma=0.9, goal_value=None,
+                                dead_end_value=None, epsilon=1e-07,
+                                iter_max=20):
+    """ Policy iteration towards each of a set of goal nodes
+
+    Solve the graph ``G`` once per goal, all goals at once over the flat
+    edge arrays of the graph (see :meth:`StateGraph.edge_arrays`), with the
+    edge rewards stored in the graph. In the problem of goal ``g``, the node
+    ``g`` is absorbing: its out edges are ignored and its value is fixed.
+    Other goal nodes are ordinary nodes, and the other nodes without out
+    edges (e.g. the goal states of the MDP) are dead ends, so that the
+    policies do not settle for the nearest terminal node. The graph is not
+    modified.
+
+    Parameters
+    ----------
+    G : ``StateGraph`` object
+        The state graph representing the MDP
+    goals : list
+        Ids of the goal nodes
+    gamma : float, optional (default: 0.9)
+        Discount factor
+    goal_value : float, optional (default: None)
+        Value of the goal nodes, defaults to their value in the graph
+    dead_end_value : float, optional (default: None)
+        Value of the nodes without out edges other than the goal, defaults to
+        a value below that of any route to the goal
+    epsilon : float, optional (default: 1e-07)
+        Value change threshold for Bellman backup
+    iter_max : int
+        Maximum number of iterations of the policy iteration sweeps
+
+    Returns
+    --------
+    table : :class:`GoalPolicyTable`
+        Values and policies of all the nodes for each goal
+
+    """
+    ea = G.edge_arrays()
+    goals = list(goals)
+    K = len(goals)
+    V, pi = _initial_tables(G, K)
+
+    cols = np.arange(K)
+    rows = np.array([ea.index[g] for g in goals], dtype=int)
+    if goal_value is not None:
+        V[rows, cols] = goal_value
+    fixed = np.zeros(V.shape, dtype=bool)
+    fixed[rows, cols] = True
+
+    # - dead ends: nodes without out edges, except the goal of the column
+    if dead_end_value is None:
+        # - below the discounted sum of the worst edge reward, plus the goal
+        worst = min(ea.reward.min(), 0.0) if ea.n_edges > 0 else 0.0
+        goal = min(V[rows, cols].min(), 0.0) if K > 0 else 0.0
+        dead_end_value = worst / (1.0 - gamma) + goal - 1.0
+    dead_ends = (ea.out_degree == 0)[:, None] & ~fixed
+    V[dead_ends] = dead_end_value
+
+    if ea.n_edges > 0 and K > 0:
+        R = np.tile(ea.reward[:, None], (1, K))
+        V, pi = _solve_tables(ea, R, V, pi, gamma, epsilon, iter_max, fixed)
+    return GoalPolicyTable(ea, goals, V, pi)
+
+
+class GoalPolicyTable(object):
+    """ Stacked values and policies of a state graph for a set of goals
+
+    Parameters
+    -----------
+    ea : :class:`EdgeArrays`
+        Edge arrays of the solved graph
+    goals : list
+        Ids of the goal nodes
+    V, pi : array-like, shape (N, n_goals)
+        Values and policies (indices into the out edges) of the nodes, one
+        column per goal
+
+    Attributes
+    -----------
+    nodes : array-like, shape (N,)
+        Node ids, the rows of ``V`` and ``pi``
+    goals : list
+        Ids of the goal nodes, the columns of ``V`` and ``pi``
+
+    """
+
+    def __init__(self, ea, goals, V, pi):
+        self.nodes = ea.nodes
+        self.goals = list(goals)
+        self.V = V
+        self.pi = pi
+
+        self._ea = ea
+        self._ids = ea.nodes.tolist()
+        self._columns = dict((g, k) for k, g in enumerate(self.goals))
+
+    def values_for(self, goal):
+        """ Values of the nodes towards a goal, as a dict """
+        k = self._column(goal)
+        return dict(zip(self._ids, self.V[:, k].tolist()))
+
+    def policy_for(self, goal):
+        """ Policy towards a goal
+
+        Returns
+        --------
+        policy : dict
+            Index of the policy action in the out edges, for every node with
+            out edges, except the goal
+
+        """
+        k = self._column(goal)
+        has_out = self._ea.out_degree > 0
+        has_out[self._ea.index[goal]] = False
+        nodes = self.nodes[has_out].tolist()
+        return dict(zip(nodes, self.pi[has_out, k].tolist()))
+
+    def route(self, start, goal, max_len=None):
+        """ Nodes visited by following the policy from ``start`` to ``goal``
+
+        Returns
+        --------
+        route : list or None
+            Node ids from ``start`` to ``goal``, None if the policy does not
+            reach the goal, i.e. it leads to a node without out edges,
+            revisits a node or takes more than ``max_len`` actions
+
+        """
+        k = self._column(goal)
+        ea = self._ea
+        current = ea.index[start]
+        target = ea.index[goal]
+        route = [start]
+        visited = set([current])
+        while current != target and ea.out_degree[current] > 0:
+            if max_len is not None and len(route) > max_len:
+                break
+            current = ea.target[ea.indptr[current] + self.pi[current, k]]
+            if current in visited:
+                break
+            visited.add(current)
+            route.append(self._ids[current])
+        if current != target:
+            return None
+        return route
+
+    def _column(self, goal):
+        if goal not in self._columns:
+            raise KeyError('Unknown goal [{}]'.format(goal))
+        return self._columns[goal]
+
+
+def _initial_tables(G, K):
+    """ Values and policies of the graph nodes, repeated in K columns """
+    nodes = G.edge_arrays().nodes.tolist()
+    V = G.get_node_attr_array('V', nodes)
+    pi = G.get_node_attr_array('pi', nodes)
+    return np.tile(V[:, None], (1, K)), np.tile(pi[:, None], (1, K))
+
+
+def _solve_tables(ea, R, V, pi, gamma, epsilon, iter_max, fixed=None):
+    """ Policy iteration in place on (N, K) value and policy tables
+
+    Column ``k`` is the MDP with edge rewards ``R[:, k]``, nodes flagged in
+    ``fixed[:, k]`` keep their values and policies.
+
+    """
+    discount = gamma ** np.maximum(ea.duration, 1)
+
+    # - only nodes with out edges are updated, edges are grouped by node
+    has_out = np.where(ea.out_degree > 0)[0]
+    first = ea.indptr[:-1][has_out]
+    segment = np.repeat(np.arange(len(has_out)), ea.out_degree[has_out])
+    local = np.arange(ea.n_edges) - first[segment]
+
+    it = 0
+    active = np.arange(V.shape[1])
+    while len(active) > 0:
+        rows, cols = has_out[:, None], active[None, :]
+        free = True if fixed is None else ~fixed[rows, cols]
+
+        # - policy evaluation
+        action = first[:, None] + pi[rows, cols]
+        r = R[action, cols]
+        d = discount[action]
+        nxt = ea.target[action]
+        change = np.inf
+        while change >= epsilon:
+            nV = np.where(free, r + d * V[nxt, cols], V[rows, cols])
+            change = np.abs(nV - V[rows, cols]).max()
+            V[rows, cols] = nV
+
+        # - policy improvement, ties go to the first out edge
+        Q = R[:, active] + discount[:, None] * V[ea.target[:, None], cols]
+        best = np.maximum.reduceat(Q, first, axis=0)
+        choice = np.where(Q >= best[segment], local[:, None], ea.n_edges)
+        new_pi = np.where(free, np.minimum.reduceat(choice, first, axis=0),
+                          pi[rows, cols])
+
+        changed = np.any(new_pi != pi[rows, cols], axis=0)
+        pi[rows, cols] = new_pi
+        it += 1
+
+        active = active[changed] if it < iter_max else active[:0]
+
+    return V, pi
@@ -0,0 +1,402 @@
+"""
+Action sampling strategies of the ControllerGraph.
+
+New states are sampled by running the local controller from an expanded state
+with a random action, i.e. a heading, for a random duration. The samplers
+below decide how the heading is drawn, among the feasible headings of the
+local controller (see :meth:`LocalController.feasible_actions`):
+
+    - ``uniform``: uniformly
+    - ``goal``: biased towards the nearest goal
+    - ``informed``: restricted to the ellipses bounded by the lengths of the
+      current best policies, as in informed RRT*
+    - ``coverage``: favoring sparsely covered regions, by the concentration of
+      the states around the new state
+    - ``demo``: favoring the regions of high density of the expert
+      demonstrations, which also bias the states to expand
+
+"""
+
+from __future__ import division
+
+from abc import abstractmethod
+from abc import ABCMeta
+
+import six
+
+import numpy as np
+from numpy.random import uniform, normal, choice
+from scipy.spatial import cKDTree
+
+from ..models.base import ModelMixin
+
+
+__all__ = [
+    'ActionSampler',
+    'UniformSampler',
+    'GoalBiasedSampler',
+    'InformedSampler',
+    'CoverageSampler',
+    'DemoDensitySampler',
+    'make_sampler',
+    'uniform_heading',
+]
+
+
+def uniform_heading(intervals):
+    """ Uniform heading within a list of intervals
+
+    Parameters
+    -----------
+    intervals : list of tuples or None
+        Disjoint ``(start, end)`` heading intervals, all headings if None
+
+    """
+    if intervals is None:
+        return uniform(0.0, 2.0*np.pi)
+    lengths = [end - start for start, end in intervals]
+    u = uniform(0.0, sum(lengths))
+    for (start, end), length in zip(intervals, lengths):
+        if u < length:
+            return start + u
+        u -= length
+    return intervals[-1][1]
+
+
+def make_sampler(params):
+    """ Built-in action sampler selected by :class:`CGParameters` """
+    if params.sampler == 'goal':
+        return GoalBiasedSampler(bias=params.goal_bias)
+    elif params.sampler == 'informed':
+        return InformedSampler(n_tries=params.n_candidates)
+    elif params.sampler == 'coverage':
+        return CoverageSampler(n_candidates=params.n_candidates,
+                               radius=params.radius)
+    elif params.sampler == 'demo':
+        return DemoDensitySampler(n_candidates=params.n_candidates,
+                                  bandwidth=params.radius)
+    return UniformSampler()
+
+
+class ActionSampler(six.with_metaclass(ABCMeta, ModelMixin)):
+    """ Strategy for the actions of the states sampled by a ControllerGraph
+
+    Samplers draw from the global numpy random number generator, so that the
+    runs and their checkpoints stay reproducible.
+
+    """
+
+    def update(self, cg):
+        """ Refresh the sampler from the state of a controller graph
+
+        Called by :meth:`ControllerGraph.run` before every expansion step.
+
+        """
+        pass
+
+    def fit(self, demos):
+        """ Fit the sampler to the expert demonstrations
+
+        Called when the state graph is initialized, with the demonstrations
+        (list of arrays of waypoints) when initialized from trajectories, and
+        an empty list otherwise.
+
+        """
+        pass
+
+    def accept(self, state):
+        """ Whether to expand a state drawn from the expansion sets
+
+        Rejecting the states with probability :math:`1 - w(s)` reweights the
+        expansion distribution by :math:`w(s)`.
+
+        """
+        return True
+
+    @abstractmethod
+    def __call__(self, state, duration, intervals):
+        """ Action for running the local controller from ``state``
+
+        Parameters
+        -----------
+        state : array-like
+            State to run the local controller from
+        duration : float
+            Duration of the local controller run
+        intervals : list of tuples or None
+            Feasible heading intervals, all headings if None
+
+        """
+        raise NotImplementedError('Abstract method')
+
+
+class UniformSampler(ActionSampler):
+    """ Uniform headings within the feasible intervals """
+
+    def __call__(self, state, duration, intervals):
+        return uniform_heading(intervals)
+
+
+class GoalBiasedSampler(ActionSampler):
+    """ Headings biased towards the nearest goal state
+
+    Parameters
+    -----------
+    bias : float, optional (default=0.3)
+        Probability of heading towards the goal, otherwise the heading is
+        uniform
+    spread : float, optional (default=pi/8)
+        Standard deviation of the goal heading perturbation
+
+    """
+
+    def __init__(self, bias=0.3, spread=np.pi/8):
+        if not 0 <= bias <= 1:
+            raise ValueError('Invalid bias [{}] | Expected: in [0, 1]'
+                             .format(bias))
+        self.bias = bias
+        self.spread = spread
+        self._goals = np.zeros((0, 2))
+
+    def update(self, cg):
+        G = cg.graph
+        goals = G.filter_nodes_by_type('goal')
+        self._goals = G.get_node_attr_array('data', goals)[:, :2]
+
+    def __call__(self, state, duration, intervals):
+        if len(self._goals) == 0 or uniform(0, 1) >= self.bias:
+            return uniform_heading(intervals)
+
+        d = self._goals - np.asarray(state[:2], dtype=float)
+        goal = d[np.argmin(np.hypot(d[:, 0], d[:, 1]))]
+        heading = (np.arctan2(goal[1], goal[0]) +
+                   normal(0, self.spread)) % (2*np.pi)
+        if _feasible(heading, intervals):
+            return heading
+        return uniform_heading(intervals)
+
+
+class InformedSampler(ActionSampler):
+    r""" Headings of states within the informed sets of the best policies
+
+    The informed set of a best policy from start :math:`a` to goal :math:`b`,
+    of length :math:`c` through the positions of its states, is the ellipse
+    :math:`\{x : |x - a| + |x - b| \leq c\}`, which holds all the states of
+    the shorter paths. Headings are drawn uniformly until the new state lies
+    in an informed set, and uniformly without restriction while no best
+    policy reaches a goal.
+
+    Parameters
+    -----------
+    n_tries : int, optional (default=8)
+        Maximum number of draws for a state in an informed set, the last draw
+        is kept if none succeeds
+
+    """
+
+    def __init__(self, n_tries=8):
+        self.n_tries = n_tries
+        self._foci = np.zeros((0, 2, 2))
+        self._lengths = np.zeros(0)
+
+    def update(self, cg):
+        G = cg.graph
+        foci, lengths = [], []
+        for traj in cg.policies:
+            if len(traj) < 2 or not cg.mdp.terminal(G.gna(traj[-1], 'data')):
+                continue
+            path = G.get_node_attr_array('data', traj)[:, :2]
+            d = np.diff(path, axis=0)
+            foci.append([path[0], path[-1]])
+            lengths.append(np.sum(np.hypot(d[:, 0], d[:, 1])))
+        self._foci = np.reshape(np.array(foci, dtype=float), (-1, 2, 2))
+        self._lengths = np.array(lengths, dtype=float)
+
+    def __call__(self, state, duration, intervals):
+        heading = uniform_heading(intervals)
+        if len(self._lengths) == 0:
+            return heading
+
+        position = np.asarray(state[:2], dtype=float)
+        for _ in range(self.n_tries - 1):
+            x = position + duration * np.array([np.cos(heading),
+                                                np.sin(heading)])
+            d = np.sum(np.hypot(*(x - self._foci).T), axis=0)
+            if np.any(d <= self._lengths):
+                break
+            heading = uniform_heading(intervals)
+        return heading
+
+
+class CoverageSampler(ActionSampler):
+    """ Headings favoring new states in sparsely covered regions
+
+    A few candidate headings are drawn uniformly, and one is picked with
+    probability proportional to the concentration :math:`1 / (1 + n)` of
+    its new state, with :math:`n` the number of states within ``radius``,
+    as in the exploration score of the controller graph.
+
+    States are only added to the graph, so the KD-tree of their positions is
+    kept across updates: the states added since it was built are counted
+    directly, and the tree is rebuilt once they exceed ``rebuild`` times its
+    size.
+
+    Parameters
+    -----------
+    n_candidates : int, optional (default=8)
+        Number of candidate headings
+    radius : float, optional (default=1.8)
+        Neighborhood radius of the concentration
+    rebuild : float, optional (default=0.1)
+        Fraction of states added since the last build that triggers a rebuild
+        of the KD-tree
+
+    """
+
+    def __init__(self, n_candidates=8, radius=1.8, rebuild=0.1):
+        self.n_candidates = n_candidates
+        self.radius = radius
+        self.rebuild = rebuild
+        self.fit([])
+
+    def fit(self, demos):
+        # - a new graph, the states are collected again at the next update
+        self._tree = None
+        self._pending = np.zeros((0, 2))
+        self._count = 0
+
+    def update(self, cg):
+        G = cg.graph
+        nodes = G.nodes
+        if len(nodes) < self._count:
+            self.fit([])
+        if len(nodes) == self._count:
+            return
+
+        new = G.get_node_attr_array('data', nodes[self._count:])[:, :2]
+        self._count = len(nodes)
+        self._pending = np.vstack((self._pending, new))
+        size = 0 if self._tree is None else self._tree.n
+        if len(self._pending) > self.rebuild * size:
+            positions = self._pending if self._tree is None else \
+                np.vstack((self._tree.data, self._pending))
+            self._tree = cKDTree(positions)
+            self._pending = np.zeros((0, 2))
+
+    def __call__(self, state, duration, intervals):
+        headings = np.array([uniform_heading(intervals)
+                             for _ in range(self.n_candidates)])
+        if self._tree is None:
+            return headings[0]
+
+        ends = np.asarray(state[:2], dtype=float) + duration * \
+            np.column_stack((np.cos(headings), np.sin(headings)))
+        concentration = 1.0 / (1.0 + self._counts(ends))
+        return headings[choice(len(headings),
+                               p=concentration / concentration.sum())]
+
+    def _counts(self, positions):
+        """ Number of states within ``radius`` of each position """
+        counts = np.array([len(nn) for nn in
+                           self._tree.query_ball_point(positions,
+                                                       self.radius)])
+        if len(self._pending):
+            d = positions[:, None] - self._pending[None, :]
+            counts += np.sum(np.hypot(d[..., 0], d[..., 1]) <= self.radius,
+                             axis=1)
+        return counts
+
+
+class DemoDensitySampler(ActionSampler):
+    r""" Headings and expanded states favoring the expert demonstrations
+
+    A Gaussian kernel density of the demonstration waypoints, normalized to
+    a maximum of 1 at the waypoints, weights the states by
+
+    .. math::
+        w(x) = floor + (1 - floor) \hat{p}(x)
+
+    A few candidate headings are drawn uniformly and one is picked with
+    probability proportional to the weight of its new state, and states are
+    expanded with probability their weight (see :meth:`accept`). Without
+    demonstrations, headings are uniform and all states are expanded.
+
+    Parameters
+    -----------
+    n_candidates : int, optional (default=8)
+        Number of candidate headings
+    bandwidth : float, optional (default=1.8)
+        Standard deviation of the Gaussian kernel
+    floor : float, optional (default=0.1)
+        Weight of the states far from the demonstrations, in (0, 1]
+    demos : list of array-like, optional (default=None)
+        Expert demonstrations to fit the density to, see :meth:`fit`
+
+    """
+
+    def __init__(self, n_candidates=8, bandwidth=1.8, floor=0.1, demos=None):
+        if not 0 < floor <= 1:
+            raise ValueError('Invalid floor [{}] | Expected: in (0, 1]'
+                             .format(floor))
+        self.n_candidates = n_candidates
+        self.bandwidth = bandwidth
+        self.floor = floor
+        self._tree = None
+        self._scale = 1.0
+        if demos is not None:
+            self.fit(demos)
+
+    def fit(self, demos):
+        points = [np.asarray(d, dtype=float)[:, :2] for d in demos]
+        if sum(len(p) for p in points) == 0:
+            self._tree = None
+            return
+        self._tree = cKDTree(np.vstack(points))
+        self._scale = 1.0
+        self._scale = 1.0 / self.density(self._tree.data).max()
+
+    def density(self, positions):
+        """ Normalized kernel density of the demonstrations at positions """
+        positions = np.reshape(np.asarray(positions, dtype=float)[..., :2],
+                               (-1, 2))
+        if self._tree is None:
+            return np.zeros(len(positions))
+        h = self.bandwidth
+        neighbors = self._tree.query_ball_point(positions, 3 * h)
+        density = np.zeros(len(positions))
+        for k, near in enumerate(neighbors):
+            if near:
+                d2 = np.sum((self._tree.data[near] - positions[k])**2, axis=1)
+                density[k] = np.sum(np.exp(-0.5 * d2 / h**2))
+        return density * self._scale
+
+    def accept(self, state):
+        if self._tree is None:
+            return True
+        return uniform(0, 1) < self._weights(state[:2])[0]
+
+    def __call__(self, state, duration, intervals):
+        if self._tree is None:
+            return uniform_heading(intervals)
+
+        headings = np.array([uniform_heading(intervals)
+                             for _ in range(self.n_candidates)])
+        ends = np.asarray(state[:2], dtype=float) + duration * \
+            np.column_stack((np.cos(headings), np.sin(headings)))
+        weights = self._weights(ends)
+        return headings[choice(len(headings), p=weights / weights.sum())]
+
+    def _weights(self, positions):
+        return self.floor + (1 - self.floor) * self.density(positions)
+
+
+# -------------------------------------------------------------
+# internals
+# -------------------------------------------------------------
+
+
+def _feasible(heading, intervals):
+    """ Whether a heading in [0, 2 pi) lies in one of the intervals """
+    if intervals is None:
+        return True
+    return any(start <= heading <= end for start, end in intervals)
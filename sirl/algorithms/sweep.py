@@ -0,0 +1,268 @@
+"""
+Parameter sweeps for ControllerGraph representation learning.
+
+Every run builds a controller graph for one setting of the parameters and one
+random seed, in a separate worker process, and records a row of metrics in a
+columnar results file (``.npz``). Runs are keyed by the content hash of their
+parameters and their seed, and runs whose key is already recorded in the
+results file are skipped, so an interrupted sweep can be restarted as is.
+
+Rows are appended to a journal (``<results>.rows.jsonl``) as the runs
+finish, and merged into the results file at the end of a sweep. The journal
+of an interrupted sweep is merged by the next one.
+
+"""
+
+from __future__ import division
+
+import os
+import sys
+import json
+import numbers
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from ..utils.profiling import perf_counter
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+__all__ = [
+    'ParameterSweep',
+    'sweep_grid',
+    'load_results',
+    'run_key',
+]
+
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def sweep_grid(base, **grid):
+    """ Parameters of the cartesian product of a grid of field values
+
+    Parameters
+    -----------
+    base : :class:`CGParameters`
+        Parameters of the fields that are not swept
+    grid : dict
+        Lists of values for each swept field, e.g. ``radius=[0.1, 0.2]``
+
+    Returns
+    --------
+    params : list of :class:`CGParameters`
+
+    """
+    names = sorted(grid)
+    return [base.derive(**dict(zip(names, values)))
+            for values in itertools.product(*[grid[n] for n in names])]
+
+
+def load_results(filename):
+    """ Load the columns of a results file as a dict of arrays
+
+    Rows of the journal of an unfinished sweep are included. Missing
+    numeric cells are NaN and missing string cells empty.
+
+    """
+    return _to_columns(_load_rows(filename))
+
+
+class ParameterSweep(object):
+    """ Run ControllerGraph builds over parameters and seeds
+
+    Parameters
+    -----------
+    builder : callable
+        Called as ``builder(params)`` in the worker process, after seeding the
+        numpy random number generator, to return a :class:`ControllerGraph`
+        with an initialized state graph. Must be picklable, i.e. a module
+        level function.
+    results : str
+        Path of the columnar (``.npz``) results file
+    n_jobs : int, optional (default=None)
+        Number of worker processes, defaults to the number of CPUs. With
+        ``n_jobs=1`` runs are done in the calling process, in which case the
+        peak memory is that of the calling process.
+
+    Notes
+    ------
+    Workers are recycled after every run (``maxtasksperchild=1``), so that the
+    recorded peak memory (``ru_maxrss``) is that of a single build.
+
+    Besides the size of the graph, the run times, the best policy values and
+    the peak memory, the phase times and call counts of
+    :attr:`ControllerGraph.stats` are recorded, as ``time_<phase>`` and
+    ``count_<name>`` columns.
+
+    """
+
+    def __init__(self, builder, results, n_jobs=None):
+        self.builder = builder
+        self.results = results
+        self.n_jobs = n_jobs
+
+    def run(self, params, seeds):
+        """ Run all pending (parameters, seed) combinations
+
+        Parameters
+        -----------
+        params : list of :class:`CGParameters`
+            Parameter settings, see :func:`sweep_grid`
+        seeds : list of int
+            Random seeds, every setting is run once per seed
+
+        Returns
+        --------
+        results : dict
+            Columns of the results file, including earlier runs
+
+        """
+        done = set(load_results(self.results).get('key', []))
+        tasks = []
+        for p, seed in itertools.product(params, seeds):
+            key = run_key(p, seed)
+            if key not in done:
+                done.add(key)
+                tasks.append((self.builder, p, seed))
+
+        try:
+            if self.n_jobs == 1:
+                for task in tasks:
+                    self._record(_build(task))
+            elif tasks:
+                pool = multiprocessing.Pool(processes=self.n_jobs,
+                                            maxtasksperchild=1)
+                try:
+                    for row in pool.imap_unordered(_build, tasks):
+                        self._record(row)
+                finally:
+                    pool.close()
+                    pool.join()
+        finally:
+            self._merge()
+
+        return load_results(self.results)
+
+    def _record(self, row):
+        """ Append a row to the journal of the results file """
+        with open(_journal(self.results), 'a') as f:
+            f.write(json.dumps(row, sort_keys=True) + '\n')
+
+    def _merge(self):
+        """ Merge the journal into the results file """
+        journal = _journal(self.results)
+        if not os.path.exists(journal):
+            return
+        columns = load_results(self.results)
+
+        # - write to a temporary file first, the file is never left truncated
+        tmp = self.results + '.tmp.npz'
+        np.savez(tmp, **columns)
+        _replace(tmp, self.results)
+        os.remove(journal)
+
+
+def run_key(params, seed):
+    """ Key of a run, ``<parameters hash>-<seed>`` """
+    return '{}-{}'.format(params.content_hash(), seed)
+
+
+def _build(task):
+    """ Build a controller graph and collect the metrics of the run """
+    builder, params, seed = task
+    np.random.seed(seed)
+
+    start = perf_counter()
+    cg = builder(params)
+    init_time = perf_counter() - start
+
+    start = perf_counter()
+    cg.run()
+    run_time = perf_counter() - start
+
+    G = cg.graph
+    starts = G.filter_nodes_by_type('start')
+    values = [G.gna(s, 'V') for s in starts]
+    lengths = [len(t) for t in cg.policies]
+
+    row = dict()
+    row['key'] = run_key(params, seed)
+    row['params'] = json.dumps(params._to_dict(), sort_keys=True)
+    row['seed'] = float(seed)
+    row['n_nodes'] = float(len(G.nodes))
+    row['n_edges'] = float(len(G.all_edges))
+    row['init_time'] = init_time
+    row['run_time'] = run_time
+    row['policy_value'] = float(np.mean(values)) if values else np.nan
+    row['policy_length'] = float(np.mean(lengths)) if lengths else np.nan
+    row['peak_memory'] = _peak_memory()
+
+    stats = cg.stats
+    for name, phase in stats['phases'].items():
+        row['time_' + name] = float(phase['time'])
+    for name, count in stats['counters'].items():
+        row['count_' + name] = float(count)
+    return row
+
+
+def _journal(filename):
+    """ Journal of the rows not yet merged into a results file """
+    return filename + '.rows.jsonl'
+
+
+def _load_rows(filename):
+    """ Rows of a results file and its journal, each key once """
+    rows = []
+    if os.path.exists(filename):
+        with np.load(filename, allow_pickle=False) as data:
+            columns = dict((k, data[k].tolist()) for k in data.files)
+        n = len(columns.get('key', []))
+        rows = [dict((k, v[i]) for k, v in columns.items())
+                for i in range(n)]
+
+    journal = _journal(filename)
+    if os.path.exists(journal):
+        keys = set(row['key'] for row in rows)
+        with open(journal, 'r') as f:
+            for line in f:
+                # - the last line of an interrupted sweep may be partial
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row['key'] not in keys:
+                    keys.add(row['key'])
+                    rows.append(row)
+    return rows
+
+
+def _to_columns(rows):
+    """ Columns of a list of rows, missing cells are NaN or empty """
+    names = set(name for row in rows for name in row)
+    columns = dict()
+    for name in names:
+        values = [row.get(name) for row in rows]
+        if all(v is None or isinstance(v, numbers.Real) for v in values):
+            columns[name] = np.array([np.nan if v is None else v
+                                      for v in values], dtype=float)
+        else:
+            columns[name] = np.array(['' if v is None else str(v)
+                                      for v in values])
+    return columns
+
+
+def _peak_memory():
+    """ Peak resident memory of the process in MB """
+    if resource is None:
+        return np.nan
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # - bytes on OSX, kilobytes on Linux
+    if sys.platform == 'darwin':
+        return rss / 1024.0 ** 2
+    return rss / 1024.0
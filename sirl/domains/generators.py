@@ -0,0 +1,306 @@
+"""
+Synthetic scene generators for scaling experiments.
+
+The bundled scenes are small (a dozen persons in ``metropolis.json`` and two
+puddles in the default puddle world). The generators below build worlds of
+arbitrary size and density, with a fixed seed, and matching synthetic expert
+demonstrations, i.e. smooth paths from every start to the goal that keep
+clear of the persons, their relations and the puddles.
+
+"""
+
+from __future__ import division
+
+import itertools
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .navigation.social_navigation import SocialNavEnvironment
+from .puddle_world.puddle_world import PuddleWorldEnvironment, Puddle
+
+
+__all__ = [
+    'make_social_world',
+    'make_puddle_world',
+    'make_demonstrations',
+]
+
+
+def make_social_world(n_persons, n_relations=None, width=10.0, height=10.0,
+                      n_starts=7, goal=None, max_group=4, speed=(0.2, 1.5),
+                      clearance=None, seed=None):
+    """ Generate a social navigation world
+
+    Persons are placed in groups of 1 to ``max_group`` members, that walk
+    together with a common velocity. All pairs of members of a group are
+    related, as in ``metropolis.json``.
+
+    Parameters
+    -----------
+    n_persons : int
+        Number of persons
+    n_relations : int, optional (default=None)
+        Maximum number of relations, a random subset of the group relations
+        is kept. All group relations are kept if None.
+    width, height : float, optional (default=10.0)
+        Extent of the world
+    n_starts : int, optional (default=7)
+        Number of start states
+    goal : tuple, optional (default=None)
+        Goal position, sampled at random if None
+    max_group : int, optional (default=4)
+        Maximum number of persons in a group
+    speed : tuple, optional (default=(0.2, 1.5))
+        Range of the walking speeds of the groups
+    clearance : float, optional (default=None)
+        Minimum distance of the persons to the goal and the starts, defaults
+        to 5% of the largest world dimension
+    seed : int, optional (default=None)
+        Seed of the random number generator
+
+    Returns
+    --------
+    world : :class:`SocialNavEnvironment`
+        World with persons keyed by int ids from 1, as ``[x, y, vx, vy]``
+
+    """
+    rng = np.random.RandomState(seed)
+    low, high = np.zeros(2), np.array([width, height], dtype=float)
+    if clearance is None:
+        clearance = 0.05 * high.max()
+
+    goal, starts = _goal_and_starts(rng, low, high, goal, n_starts)
+    avoid = cKDTree(np.vstack([goal] + starts))
+
+    persons = dict()
+    relations = []
+    while len(persons) < n_persons:
+        size = min(rng.randint(1, max_group + 1), n_persons - len(persons))
+        center = rng.uniform(low, high)
+        heading = rng.uniform(-np.pi, np.pi)
+        v = rng.uniform(*speed)
+        velocity = [v * np.cos(heading), v * np.sin(heading)]
+
+        members = center + rng.uniform(-0.06, 0.06, size=(size, 2)) * \
+            high.max()
+        members = np.clip(members, low, high)
+        distances, _ = avoid.query(members)
+        if np.any(distances < clearance):
+            continue
+
+        ids = list(range(len(persons) + 1, len(persons) + size + 1))
+        for pid, pos in zip(ids, members):
+            persons[pid] = [float(pos[0]), float(pos[1])] + velocity
+        relations.extend([i, j] for i, j in itertools.combinations(ids, 2))
+
+    if n_relations is not None and n_relations < len(relations):
+        keep = np.sort(rng.choice(len(relations), n_relations, replace=False))
+        relations = [relations[i] for i in keep]
+
+    return SocialNavEnvironment(0, 0, width, height, persons, relations,
+                                _point(goal), [_point(s) for s in starts])
+
+
+def make_puddle_world(n_puddles, n_starts=1, goal=(0.97, 0.97),
+                      radius=(0.02, 0.08), length=(0.05, 0.3),
+                      clearance=0.05, seed=None):
+    """ Generate a puddle world
+
+    Parameters
+    -----------
+    n_puddles : int
+        Number of puddles
+    n_starts : int, optional (default=1)
+        Number of start states
+    goal : tuple, optional (default=(0.97, 0.97))
+        Goal position, sampled at random if None
+    radius : tuple, optional (default=(0.02, 0.08))
+        Range of the puddle radii
+    length : tuple, optional (default=(0.05, 0.3))
+        Range of the puddle midline lengths
+    clearance : float, optional (default=0.05)
+        Minimum distance of the puddle borders to the goal and the starts
+    seed : int, optional (default=None)
+        Seed of the random number generator
+
+    Returns
+    --------
+    world : :class:`PuddleWorldEnvironment`
+
+    """
+    rng = np.random.RandomState(seed)
+    low, high = np.zeros(2), np.ones(2)
+
+    goal, starts = _goal_and_starts(rng, low, high, goal, n_starts)
+    avoid = np.vstack([goal] + starts)
+
+    puddles = []
+    while len(puddles) < n_puddles:
+        r = rng.uniform(*radius)
+        start = rng.uniform(low, high)
+        heading = rng.uniform(-np.pi, np.pi)
+        end = np.clip(start + rng.uniform(*length) *
+                      np.array([np.cos(heading), np.sin(heading)]), low, high)
+        if np.any(_segment_distances(avoid, start, end) < r + clearance):
+            continue
+        puddles.append(Puddle(start[0], start[1], end[0], end[1], r))
+
+    return PuddleWorldEnvironment(start=[_point(s) for s in starts],
+                                  goal=_point(goal), puddles=puddles)
+
+
+def make_demonstrations(world, n_demos=None, spacing=None, clearance=None,
+                        noise=0.0, n_iter=50, seed=None):
+    """ Generate synthetic expert demonstrations in a world
+
+    Every demonstration starts as a straight line of waypoints from a start
+    state to the goal. The interior waypoints are then repeatedly pushed out
+    of the clearance zones of the obstacles (persons and relations, or
+    puddles) and smoothed.
+
+    Parameters
+    -----------
+    world : :class:`SocialNavEnvironment` or :class:`PuddleWorldEnvironment`
+        World to demonstrate in
+    n_demos : int, optional (default=None)
+        Number of demonstrations, cycling through the start states, defaults
+        to one per start state
+    spacing : float, optional (default=None)
+        Distance between consecutive waypoints, defaults to 10% of the
+        largest world dimension
+    clearance : float, optional (default=None)
+        Distance to keep from persons and relations, or from the puddle
+        borders, defaults to 5% of the largest world dimension
+    noise : float, optional (default=0.0)
+        Standard deviation of a Gaussian perturbation of the initial
+        waypoints, relative to ``spacing``
+    n_iter : int, optional (default=50)
+        Number of push and smooth iterations
+    seed : int, optional (default=None)
+        Seed of the random number generator
+
+    Returns
+    --------
+    demos : list of array-like, each of shape (T, 2)
+        Waypoints of the demonstrations, in the format of
+        ``expert_demos.npy``
+
+    """
+    rng = np.random.RandomState(seed)
+    low, high = _extent(world)
+    size = (high - low).max()
+    spacing = 0.1 * size if spacing is None else spacing
+    clearance = 0.05 * size if clearance is None else clearance
+
+    points, radii = _obstacles(world, clearance)
+    tree = cKDTree(points) if len(points) else None
+    reach = radii.max() if len(radii) else 0.0
+
+    starts = list(world.start)
+    n_demos = len(starts) if n_demos is None else n_demos
+    goal = np.asarray(world.goal, dtype=float)[:2]
+
+    demos = []
+    for i in range(n_demos):
+        start = np.asarray(starts[i % len(starts)], dtype=float)[:2]
+        n = max(int(np.ceil(np.linalg.norm(goal - start) / spacing)), 1)
+        t = np.linspace(0, 1, n + 1)[:, np.newaxis]
+        path = start * (1 - t) + goal * t
+        path[1:-1] += rng.normal(0, noise * spacing, size=(n - 1, 2))
+
+        for _ in range(n_iter):
+            if tree is not None:
+                path[1:-1] += _push(path[1:-1], tree, points, radii, reach)
+            path[1:-1] = 0.5 * path[1:-1] + 0.25 * (path[:-2] + path[2:])
+            path = np.clip(path, low, high)
+        demos.append(path)
+
+    return demos
+
+
+# -------------------------------------------------------------
+# internals
+# -------------------------------------------------------------
+
+
+def _goal_and_starts(rng, low, high, goal, n_starts):
+    """ Sample a goal (if not given) and starts at least half the smallest
+    world dimension away from it """
+    if goal is None:
+        goal = rng.uniform(low, high)
+    goal = np.asarray(goal, dtype=float)
+    min_dist = 0.5 * (high - low).min()
+
+    starts = []
+    while len(starts) < n_starts:
+        s = rng.uniform(low, high)
+        if np.linalg.norm(s - goal) >= min_dist:
+            starts.append(s)
+    return goal, starts
+
+
+def _point(p):
+    return tuple(float(v) for v in p)
+
+
+def _extent(world):
+    """ Lower and upper corners of a world """
+    if isinstance(world, SocialNavEnvironment):
+        return (np.array([world.x, world.y], dtype=float),
+                np.array([world.w, world.h], dtype=float))
+    return np.zeros(2), np.ones(2)
+
+
+def _obstacles(world, clearance):
+    """ Obstacles of a world as points with the distance to keep from them
+
+    Persons are single points, while relations and puddles are sampled
+    along their segments, densely enough for the clearance zones of the
+    samples to cover the segments.
+
+    """
+    segments = []
+    if isinstance(world, SocialNavEnvironment):
+        persons = world.persons
+        points = [np.asarray(p[:2], dtype=float) for p in persons.values()]
+        radii = [clearance] * len(points)
+        for i, j in world.relations:
+            segments.append((persons[i][:2], persons[j][:2], clearance))
+    else:
+        points, radii = [], []
+        for p in world.puddles:
+            segments.append((p.start, p.end, p.radius + clearance))
+
+    for a, b, r in segments:
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        n = int(np.ceil(np.linalg.norm(b - a) / (0.5 * r))) + 1
+        t = np.linspace(0, 1, n)[:, np.newaxis]
+        points.extend(a * (1 - t) + b * t)
+        radii.extend([r] * n)
+
+    return np.reshape(points, (-1, 2)), np.asarray(radii, dtype=float)
+
+
+def _push(waypoints, tree, points, radii, reach):
+    """ Mean displacement of waypoints out of the obstacle clearance zones """
+    push = np.zeros_like(waypoints)
+    for k, near in enumerate(tree.query_ball_point(waypoints, reach)):
+        if not near:
+            continue
+        d = waypoints[k] - points[near]
+        dist = np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-9)
+        depth = radii[near] - dist
+        inside = depth > 0
+        if np.any(inside):
+            push[k] = np.mean(d[inside] / dist[inside, np.newaxis] *
+                              depth[inside, np.newaxis], axis=0)
+    return push
+
+
+def _segment_distances(points, a, b):
+    """ Distances of points to the segment [a, b] """
+    ab = b - a
+    t = np.clip(np.dot(points - a, ab) / max(np.dot(ab, ab), 1e-12), 0, 1)
+    closest = a + t[:, np.newaxis] * ab
+    return np.hypot(*(points - closest).T)
@@ -94,18 +94,18 @@ class SimpleBehaviors(MDPReward):
         into a specified personal space of a person
 
         """
-        people = [v for k, v in self._world.persons.items()]
+        world = self._world
+        people = world.person_data
         f = 0.0
 
         for t, waypoint in enumerate(action):
-            closest_person = people[0]
-            cdist = edist(closest_person, waypoint)
-
-            for p in people[1:]:
-                dist = edist(p, waypoint)
-                if dist < cdist:
-                    cdist = dist
-                    closest_person = p
+            # - without scaling, persons beyond the threshold never count, but
+            # with scaling the closest person always sets the sociable zone
+            reach = np.inf if self._scaled else self._thresh_p
+            closest, cdist = world.nearest_person(waypoint, reach)
+            if closest is None:
+                continue
+            closest_person = people[closest]
 
             boundary = self._thresh_p
             if self._scaled:
@@ -113,28 +113,30 @@ class SimpleBehaviors(MDPReward):
                 boundary *= speed
                 self._szone *= speed
 
+            if cdist >= boundary:
+                continue
+
             if self._behavior == 'sociable':
                 if self._anisotropic:
                     ad = anisotropic_distance(closest_person, waypoint, ak=3.0)
-                    if cdist < ad and cdist < self._szone and cdist < boundary:
+                    if cdist < ad and cdist < self._szone:
                         f += (boundary - cdist) * self._gamma**t
 
-                    if cdist < ad and cdist > self._szone and cdist < boundary:
+                    if cdist < ad and cdist > self._szone:
                         f += (cdist - boundary) * self._gamma**t
                 else:
-                    if cdist < self._szone and cdist < boundary:
+                    if cdist < self._szone:
                         f += (boundary - cdist) * self._gamma**t
 
-                    if cdist > self._szone and cdist < boundary:
+                    if cdist > self._szone:
                         f += (cdist - boundary) * self._gamma**t
             else:
                 if self._anisotropic:
                     ad = anisotropic_distance(closest_person, waypoint, ak=3.0)
-                    if cdist < ad and cdist < boundary:
+                    if cdist < ad:
                         f += (boundary - cdist) * self._gamma**t
                 else:
-                    if cdist < boundary:
-                        f += (boundary - cdist) * self._gamma**t
+                    f += (boundary - cdist) * self._gamma**t
         return f
 
     def _feature_relation_disturbance(self, action):
@@ -145,12 +147,11 @@ class SimpleBehaviors(MDPReward):
         by a rectangle
 
         """
+        segments = self._world.relation_segments
         f = 0.0
         for t, waypoint in enumerate(action):
-            for [i, j] in self._world.relations:
-                la = (self._world.persons[i][0], self._world.persons[i][1])
-                le = (self._world.persons[j][0], self._world.persons[j][1])
-
+            for k in self._world.relations_in_range(waypoint, self._thresh_r):
+                la, le = segments[k]
                 dist, inside = distance_to_segment(waypoint, la, le)
                 if inside and dist < self._thresh_r:
                     f += (self._thresh_r - dist) * self._gamma**t
@@ -228,24 +229,21 @@ class FlowBehaviors(MDPReward):
         phi_d = []
         for t, wp in enumerate(action):
             density = 0
-            for _, p in self._world.persons.items():
-                dist = edist(wp, p[0:2])
-                if dist < self._radius:
-                    density += 1 * self._gamma**t
+            for _ in self._world.persons_in_range(wp, self._radius):
+                density += 1 * self._gamma**t
             phi_d.append(density)
 
         return sum(phi_d)
 
     def _feature_relative_bearing(self, action):
+        people = self._world.person_data
         phi_f = []
         for t, wp in enumerate(action):
             density = 0
             flow = 0
-            for _, p in self._world.persons.items():
-                dist = edist(wp, p[0:2])
-                if dist < self._radius:
-                    density += 1
-                    flow += self._goal_orientation(p) * self._gamma**t
+            for i in self._world.persons_in_range(wp, self._radius):
+                density += 1
+                flow += self._goal_orientation(people[i]) * self._gamma**t
 
             if density > 0:
                 flow = flow / density
@@ -260,6 +258,6 @@ class FlowBehaviors(MDPReward):
         """
         v = np.hypot(person[3], person[2])
         pnext = (person[0] + v * person[2], person[1] + v * person[3])
-        dnow = edist(self._goal, person)
-        dnext = edist(self._goal, pnext)
+        dnow = edist(self._world.goal, person)
+        dnext = edist(self._world.goal, pnext)
         return dnext - dnow
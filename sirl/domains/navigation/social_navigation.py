@@ -2,6 +2,7 @@
 from __future__ import division
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 from matplotlib.patches import Circle, Ellipse
 import matplotlib.pyplot as plt
@@ -10,7 +11,7 @@ import matplotlib as mpl
 
 from ...models.base import MDP
 from ...models.base import Environment
-from ...utils.geometry import edist
+from ...utils.geometry import edist, heading_intervals
 
 
 __all__ = ['SocialNavEnvironment', 'SocialNavMDP']
@@ -19,7 +20,35 @@ __all__ = ['SocialNavEnvironment', 'SocialNavMDP']
 ########################################################################
 
 class SocialNavEnvironment(Environment):
-    """ Social Navigation World """
+    """ Social Navigation World
+
+    Parameters
+    -----------
+    x, y, w, h : float
+        Extent of the world
+    persons : dict
+        Persons as ``{id: [x, y, vx, vy]}``
+    relations : list
+        Pairs ``[i, j]`` of ids of related persons
+    goal : tuple
+        Goal position
+    starts : list
+        Start positions
+
+    Attributes
+    -----------
+    person_data : array-like, shape (n_persons, 4)
+        Persons in the iteration order of ``persons``
+    relation_segments : array-like, shape (n_relations, 2, 2)
+        End points of the relations, in the order of ``relations``
+
+    Notes
+    ------
+    The scene is compiled into arrays and KD-trees over the persons and the
+    relation midpoints at construction, for the range queries of the reward
+    functions. It must not be modified afterwards.
+
+    """
     def __init__(self, x, y, w, h, persons, relations,
                  goal, starts, **kwargs):
         super(SocialNavEnvironment, self).__init__(starts, goal)
@@ -29,11 +58,119 @@ class SocialNavEnvironment(Environment):
         self.h = h
         self.persons = persons
         self.relations = relations
+        self._compile_scene()
 
     def in_world(self, state):
         return self.x < state[0] < self.w and\
                 self.y < state[1] < self.h
 
+    def feasible_headings(self, point, distance):
+        """ Headings of the straight moves from ``point`` that end in the world
+        """
+        return heading_intervals(point, distance, (self.x, self.y),
+                                 (self.w, self.h))
+
+    def persons_in_range(self, point, radius):
+        """ Persons closer than ``radius`` to a point
+
+        Returns
+        --------
+        indices : array-like
+            Rows of :attr:`person_data`, in increasing order
+
+        """
+        if self._person_tree is None:
+            return _EMPTY
+        near = self._person_tree.query_ball_point(point[0:2],
+                                                  _widen(radius))
+        if not near:
+            return _EMPTY
+        near = np.sort(near)
+        return near[self._distances(point, near) < radius]
+
+    def nearest_person(self, point, max_distance=np.inf):
+        """ Person closest to a point
+
+        Ties are resolved in favor of the first person in the order of
+        ``persons``.
+
+        Returns
+        --------
+        index : int or None
+            Row of :attr:`person_data`, None if no person is closer than
+            ``max_distance``
+        distance : float
+            Distance to the person
+
+        """
+        if self._person_tree is None:
+            return None, np.inf
+        d, _ = self._person_tree.query(point[0:2], distance_upper_bound=_widen(
+            max_distance))
+        if np.isinf(d):
+            return None, np.inf
+        near = np.sort(self._person_tree.query_ball_point(point[0:2],
+                                                          _widen(d)))
+        distances = self._distances(point, near)
+        k = np.argmin(distances)
+        if not distances[k] < max_distance:
+            return None, np.inf
+        return near[k], distances[k]
+
+    def relations_in_range(self, point, radius):
+        """ Relations whose segment may come closer than ``radius`` to a point
+
+        The test is conservative: it keeps every relation whose bounding
+        circle (centered at the midpoint, through the end points) comes
+        within ``radius`` of the point.
+
+        Returns
+        --------
+        indices : array-like
+            Rows of :attr:`relation_segments`, in increasing order
+
+        """
+        if self._relation_tree is None:
+            return _EMPTY
+        reach = _widen(radius + self._relation_halves)
+        near = self._relation_tree.query_ball_point(point[0:2], reach.max())
+        if not near:
+            return _EMPTY
+        near = np.sort(near)
+        mid = self._relation_mids[near]
+        d = np.hypot(mid[:, 0] - point[0], mid[:, 1] - point[1])
+        return near[d <= reach[near]]
+
+    def _compile_scene(self):
+        self.person_data = np.array([p[0:4] for p in self.persons.values()],
+                                    dtype=float).reshape(-1, 4)
+        self._person_tree = None
+        if len(self.person_data):
+            self._person_tree = cKDTree(self.person_data[:, 0:2])
+
+        self.relation_segments = np.array(
+            [[self.persons[i][0:2], self.persons[j][0:2]]
+             for i, j in self.relations], dtype=float).reshape(-1, 2, 2)
+        self._relation_tree = None
+        if len(self.relation_segments):
+            a, b = self.relation_segments[:, 0], self.relation_segments[:, 1]
+            self._relation_mids = 0.5 * (a + b)
+            self._relation_halves = 0.5 * np.hypot(*(b - a).T)
+            self._relation_tree = cKDTree(self._relation_mids)
+
+    def _distances(self, point, indices):
+        # - same arithmetic as ``edist``, for identical comparisons
+        p = self.person_data[indices]
+        return np.hypot(p[:, 0] - point[0], p[:, 1] - point[1])
+
+
+_EMPTY = np.zeros(0, dtype=int)
+
+
+def _widen(radius):
+    """ Radius enlarged to absorb the rounding errors of the KD-tree """
+    return radius * (1 + 1e-9) + 1e-12
+
 
 ########################################################################
 
@@ -16,6 +16,7 @@ from ...models.base import MDPReward
 from ...models.base import Environment
 
 from ...utils.geometry import edist, distance_to_segment
+from ...utils.geometry import heading_intervals
 
 
 __all__ = [
@@ -142,6 +143,11 @@ class PuddleWorldEnvironment(Environment):
     def in_world(self, state):
         return 0.0 < state[0] < 1.0 and 0.0 < state[1] < 1.0
 
+    def feasible_headings(self, point, distance):
+        """ Headings of the straight moves from ``point`` that end in the world
+        """
+        return heading_intervals(point, distance, (0.0, 0.0), (1.0, 1.0))
+
     def _setup_default_puddles(self):
         self.puddles = list()
         self.puddles.append(Puddle(0.1, 0.75, 0.45, 0.75, 0.1))
@@ -249,6 +249,17 @@ class LocalController(six.with_metaclass(ABCMeta, ModelMixin)):
         """
         raise NotImplementedError('Abstract method')
 
+    def feasible_actions(self, state, duration):
+        """ Intervals of the actions of admissible outcomes from ``state``
+
+        The actions are headings and the controller moves straight by
+        ``duration``, as for the controllers of the navigation and puddle
+        world tasks, so the intervals are those of
+        :meth:`Environment.feasible_headings`, or None if unknown.
+
+        """
+        return self._world.feasible_headings(state, duration)
+
     @abstractmethod
     def trajectory(self, source, target):
         """ Generate a trajectory by executing the local controller
@@ -343,3 +354,14 @@ class Environment(six.with_metaclass(ABCMeta, ModelMixin)):
     @abstractmethod
     def in_world(self, state):
         raise NotImplementedError('Abstract')
+
+    def feasible_headings(self, point, distance):
+        r""" Headings of the straight moves from ``point`` ending in the world
+
+        Returns
+        --------
+        intervals : list of tuples or None
+            Disjoint ``(start, end)`` heading intervals in :math:`[0, 2\pi]`,
+            or None if the world does not tell
+        """
+        return None
@@ -1,9 +1,14 @@
 from __future__ import division
 
+import os
+import json
 import warnings
 import pickle
 
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
 
 from numpy import asarray, sqrt
 
@@ -15,19 +20,43 @@ class StateGraph(object):
     affords use of task specific constraints as well as temporally extended
     actions (in the sense of hierarchical reinforcement learning, options)
 
+    Parameters
+    -----------
+    state_dim : int, optional (default=4)
+        Dimension of the node state vectors
+    trajectories : :class:`TrajectoryBuffer`, optional (default=None)
+        Store for the edge trajectories. If given, edges only hold a handle
+        into the buffer, otherwise each edge holds its trajectory array.
+
     """
 
     _node_attrs = ('data', 'cost', 'priority', 'Q', 'V', 'pi', 'type')
     _edge_attrs = ('source', 'target', 'duration', 'reward', 'phi', 'traj')
 
-    def __init__(self, state_dim=4):
+    # dtypes of the node attribute arrays, ``Q`` is ragged and kept a list
+    _node_dtypes = {'data': float, 'cost': float, 'priority': float,
+                    'V': float, 'pi': int, 'type': str}
+
+    def __init__(self, state_dim=4, trajectories=None):
         self._graph = nx.DiGraph()
+        self._trajectories = trajectories
 
         assert state_dim > 0, 'State dimension must be greater than 0'
         self._state_dim = state_dim
 
+        # structural version, for invalidating cached array views
+        self._version = 0
+        self._arrays = None
+
+        # node ids per node type, in the order of addition
+        self._types = dict()
+
     def clear(self):
         self.G.clear()
+        if self._trajectories is not None:
+            self._trajectories.clear()
+        self._types.clear()
+        self._version += 1
 
     def add_node(self, nid, data, cost, priority, Q, V, pi, ntype):
         """
@@ -40,12 +69,19 @@ class StateGraph(object):
         if nid not in self.G:
             self.G.add_node(nid, data=data, cost=cost, priority=priority,
                             Q=Q, V=V, pi=pi, type=ntype)
+            self._types.setdefault(ntype, dict())[nid] = None
+            self._version += 1
         else:
             warnings.warn('Node already exits in the graph, not added')
 
-    def add_edge(self, source, target, duration, reward, phi, traj):
+    def add_edge(self, source, target, duration, reward, phi, traj,
+                 buffered=True):
         """
         Add a new edge into the graph
+
+        With ``buffered=False`` the edge holds the trajectory array itself
+        instead of storing it in the trajectory buffer, e.g. for placeholder
+        trajectories that are replaced later with :meth:`sea`.
         """
         assert duration >= 0.0, 'Duration must be positive'
         phi = asarray(phi)
@@ -57,8 +93,11 @@ class StateGraph(object):
                           format(source, target))
 
         elif not self.G.has_edge(source, target):
+            if self._trajectories is not None and buffered:
+                traj = self._trajectories.append(traj)
             self.G.add_edge(source, target, duration=duration,
                             reward=reward, phi=phi, traj=traj)
+            self._version += 1
         else:
             warnings.warn('Edge ({}--{}) already exists in the graph'
                           .format(source, target))
@@ -70,10 +109,14 @@ class StateGraph(object):
                           format(source, target))
 
         self.G.remove_edge(source, target)
+        self._version += 1
 
     def remove_node(self, node):
         """ Remove a node from the graph """
+        ntype = self.G.node[node]['type'] if node in self.G else None
         self.G.remove_node(node)
+        self._types[ntype].pop(node)
+        self._version += 1
 
     def edge_exists(self, source, target):
         """ Check if an edge already exists in the graph """
@@ -100,6 +143,8 @@ class StateGraph(object):
         value : any
         """
         self._check_node_attributes(node_id, attribute)
+        if attribute == 'type':
+            self._retype(node_id, value)
         self.G.node[node_id][attribute] = value
 
     def gea(self, source, target, attribute):
@@ -107,14 +152,142 @@ class StateGraph(object):
         Get a single attribute of a single edge
         """
         self._check_edge_attributes(source, target, attribute)
-        return self.G.edge[source][target][attribute]
+        value = self.G.edge[source][target][attribute]
+        if attribute == 'traj' and isinstance(value, tuple):
+            return self._trajectories.get(value, source, target)
+        return value
 
     def sea(self, source, target, attribute, value):
         """
         Set a single attribute of a edge between source and target
         """
         self._check_edge_attributes(source, target, attribute)
+        if attribute == 'traj' and self._trajectories is not None:
+            value = self._trajectories.append(value)
         self.G.edge[source][target][attribute] = value
+        if self._arrays is not None and self._arrays.version == self._version:
+            self._arrays.update(source, target, attribute, value)
+
+    def get_node_attr_array(self, name, ids=None):
+        """ Get an attribute of many nodes at once
+
+        Parameters
+        -----------
+        name : str
+            Node attribute
+        ids : list, optional (default=None)
+            Node ids, all the nodes (in the graph node order) if None
+
+        Returns
+        --------
+        values : array-like, shape (n,) or (n, state-dim) for ``data``
+            Attribute values, a list of lists for ``Q``
+
+        """
+        assert name in self._node_attrs,\
+            'Attribute [{}] is invalid | Expected:{}'\
+            .format(name, self._node_attrs)
+        ndata = self.G.node
+        ids = self.nodes if ids is None else ids
+        values = [ndata[n][name] for n in ids]
+        if name == 'Q':
+            return values
+        if name == 'data':
+            return np.reshape(np.array(values, dtype=float),
+                              (-1, self._state_dim))
+        return np.array(values, dtype=self._node_dtypes[name])
+
+    def set_node_attr_array(self, name, values, ids=None):
+        """ Set an attribute of many nodes at once
+
+        Parameters
+        -----------
+        name : str
+            Node attribute
+        values : array-like
+            Attribute values, one per node (rows for ``data``)
+        ids : list, optional (default=None)
+            Node ids, all the nodes (in the graph node order) if None
+
+        """
+        assert name in self._node_attrs,\
+            'Attribute [{}] is invalid | Expected:{}'\
+            .format(name, self._node_attrs)
+        ids = self.nodes if ids is None else ids
+        if name == 'data':
+            values = [asarray(v) for v in values]
+        elif isinstance(values, np.ndarray):
+            values = values.tolist()
+        assert len(values) == len(ids),\
+            'Expecting {} values, got {}'.format(len(ids), len(values))
+
+        ndata = self.G.node
+        for n, value in zip(ids, values):
+            if name == 'type':
+                self._retype(n, value)
+            ndata[n][name] = value
+
+    def get_edge_attr_array(self, name, edges=None):
+        """ Get an attribute of many edges at once
+
+        Parameters
+        -----------
+        name : str
+            Edge attribute
+        edges : list, optional (default=None)
+            Edges as (source, target) pairs, all the edges if None
+
+        Returns
+        --------
+        values : array-like, shape (n,) or (n, reward-dim) for ``phi``
+            Attribute values, a list of arrays for ``traj``
+
+        """
+        assert name in self._edge_attrs, \
+            'Attribute [{}] is invalid | Expected:{}'\
+            .format(name, self._edge_attrs)
+        edges = self.all_edges if edges is None else edges
+        if name in ('source', 'target'):
+            k = 0 if name == 'source' else 1
+            return np.array([e[k] for e in edges])
+        if name == 'traj':
+            return [self.gea(u, v, 'traj') for u, v in edges]
+        edata = self.G.edge
+        return np.array([edata[u][v][name] for u, v in edges], dtype=float)
+
+    def set_edge_attr_array(self, name, values, edges=None):
+        """ Set an attribute of many edges at once
+
+        Parameters
+        -----------
+        name : str
+            Edge attribute, one of ``duration``, ``reward``, ``phi`` and
+            ``traj``
+        values : array-like
+            Attribute values, one per edge (rows for ``phi``)
+        edges : list, optional (default=None)
+            Edges as (source, target) pairs, all the edges if None
+
+        """
+        assert name in self._edge_attrs[2:], \
+            'Attribute [{}] is invalid | Expected:{}'\
+            .format(name, self._edge_attrs[2:])
+        edges = self.all_edges if edges is None else edges
+        assert len(values) == len(edges),\
+            'Expecting {} values, got {}'.format(len(edges), len(values))
+
+        edata = self.G.edge
+        if name == 'traj' and self._trajectories is not None:
+            values = [self._trajectories.append(v) for v in values]
+        elif name == 'phi':
+            values = [asarray(v) for v in values]
+        elif isinstance(values, np.ndarray):
+            values = values.tolist()
+        for (u, v), value in zip(edges, values):
+            edata[u][v][name] = value
+
+        if self._arrays is not None and self._arrays.version == self._version:
+            self._arrays.update_edges(edges, name, values)
 
     def find_neighbors_from_pose(self, loc, distance):
         """ Find node neighbors within distance range
@@ -160,18 +333,162 @@ class StateGraph(object):
         return self.G.out_edges(nid)
 
     def filter_nodes_by_type(self, ntype):
-        """ Filter nodes by node type """
-        sns = filter(lambda n: self.gna(n, 'type') == ntype, self.nodes)
-        return list(sns)
-
-    def search_path(self, source, target):
-        """ Search for a path from ``source`` to ``target`` using A*"""
-        def metric(a, b):
-            if self.edge_exists(source, target):
-                return -1*self.gea(source, target, 'reward')
-            return 1000
-        path = nx.astar_path(self.G, source, target, heuristic=metric)
-        return path
+        """ Filter nodes by node type, in the order they were added """
+        return list(self._types.get(ntype, ()))
+
+    def search_path(self, source, target, weight=None):
+        """ Search for a shortest path from ``source`` to ``target``
+
+        Parameters
+        -----------
+        source, target : int
+            Node ids
+        weight : str, optional (default=None)
+            Edge cost, ``None`` for the number of edges, ``'duration'`` or
+            ``'reward'`` (the cost of an edge is then its negated reward,
+            which must not be negative)
+
+        Returns
+        --------
+        path : list
+            Node ids from ``source`` to ``target``
+
+        """
+        ea = self.edge_arrays()
+        s, t = ea.index[source], ea.index[target]
+        _, pred = csgraph.dijkstra(self._cost_matrix(weight), indices=s,
+                                   unweighted=weight is None,
+                                   return_predecessors=True)
+        if s != t and pred[t] < 0:
+            raise nx.NetworkXNoPath('Node {} not reachable from {}'
+                                    .format(target, source))
+        path = [t]
+        while path[-1] != s:
+            path.append(pred[path[-1]])
+        return [ea.nodes[i].item() for i in reversed(path)]
+
+    def cost_to_go(self, targets, weight='duration'):
+        """ Smallest cost of reaching any of ``targets`` from every node
+
+        Parameters
+        -----------
+        targets : list
+            Node ids
+        weight : str, optional (default='duration')
+            Edge cost, see :meth:`search_path`
+
+        Returns
+        --------
+        costs : array-like, shape (N,)
+            Costs in the order of ``edge_arrays().nodes``, ``inf`` for the
+            nodes from which no target is reachable
+
+        """
+        ea = self.edge_arrays()
+        indices = [ea.index[n] for n in targets]
+        if not indices:
+            return np.full(ea.n_nodes, np.inf)
+        # - distances to the targets are distances from them, edges reversed
+        reverse = self._cost_matrix(weight).T.tocsr()
+        return csgraph.dijkstra(reverse, indices=indices, min_only=True,
+                                unweighted=weight is None)
+
+    def reachable(self, sources, reverse=False):
+        """ Nodes reachable from any of ``sources``
+
+        Parameters
+        -----------
+        sources : list
+            Node ids
+        reverse : bool, optional (default=False)
+            Find the nodes from which any of ``sources`` is reachable instead
+
+        Returns
+        --------
+        mask : array-like, shape (N,)
+            Boolean flags in the order of ``edge_arrays().nodes``, sources
+            included
+
+        """
+        ea = self.edge_arrays()
+        A = self.sparse_matrix()
+        if reverse:
+            A = A.T.tocsr()
+        mask = np.zeros(ea.n_nodes, dtype=bool)
+        for n in sources:
+            i = ea.index[n]
+            if not mask[i]:
+                order = csgraph.breadth_first_order(
+                    A, i, return_predecessors=False)
+                mask[order] = True
+        return mask
+
+    def strongly_connected_components(self):
+        """ Strongly connected components of the graph
+
+        Returns
+        --------
+        n_components : int
+            Number of components
+        labels : array-like, shape (N,)
+            Component of each node, in the order of ``edge_arrays().nodes``
+
+        """
+        return csgraph.connected_components(self.sparse_matrix(),
+                                            directed=True,
+                                            connection='strong')
+
+    def sparse_matrix(self, attribute=None, feature=None):
+        """ Sparse (CSR) matrix of an edge attribute
+
+        Entry ``(i, j)`` holds the attribute of the edge from node ``i`` to
+        node ``j``, with nodes in the order of ``edge_arrays().nodes``.
+
+        Parameters
+        -----------
+        attribute : str, optional (default=None)
+            ``'duration'``, ``'reward'`` or ``'phi'``, or ``None`` for the
+            adjacency matrix
+        feature : int, optional (default=None)
+            Index of the reward feature, with ``attribute='phi'``
+
+        Returns
+        --------
+        matrix : :class:`scipy.sparse.csr_matrix`, shape (N, N)
+
+        """
+        ea = self.edge_arrays()
+        if attribute is None:
+            values = np.ones(ea.n_edges)
+        elif attribute in ('duration', 'reward'):
+            values = getattr(ea, attribute)
+        elif attribute == 'phi':
+            if ea.phi is None or feature is None:
+                raise ValueError('A feature index of fixed dimension edge '
+                                 'features is required')
+            values = ea.phi[:, feature] if ea.n_edges else np.zeros(0)
+        else:
+            raise ValueError('Invalid attribute [{}] | Expected: {}'
+                             .format(attribute, ('duration', 'reward',
+                                                 'phi')))
+        return ea.matrix(values)
+
+    def edge_arrays(self):
+        """ Flat array view of the graph edges
+
+        The view is cached and rebuilt only when nodes or edges are added or
+        removed; edge attribute changes made through :meth:`sea` are written
+        through to the cached arrays.
+
+        Returns
+        --------
+        arrays : :class:`EdgeArrays`
+            Edges grouped by source node, in the order of :meth:`out_edges`
+
+        """
+        if self._arrays is None or self._arrays.version != self._version:
+            self._arrays = EdgeArrays(self.G, self._version)
+        return self._arrays
 
     def get_signal(self, name):
         """ Retrieve a graph signal from the nodes
@@ -192,17 +509,45 @@ class StateGraph(object):
 
         """
         assert name in ('cost', 'policy', 'priority', 'V', 'Q')
-        return [self.gna(n, name) for n in self.nodes]
+        return self.get_node_attr_array('pi' if name == 'policy' else name)
 
     def save_graph(self, filename):
-        """ Save the graph to file """
-        with open(filename, 'wb') as f:
-            pickle.dump(self._graph, f)
+        """ Save the graph to a directory of column arrays
+
+        Node attributes, edges and edge attributes are stored as flat
+        ``.npy`` columns (variable length ``Q`` lists and edge trajectories
+        concatenated, with offsets), see :func:`save_columns`. Trajectories
+        discarded by a ``'features'`` trajectory buffer are saved as empty.
+
+        """
+        trajectories = self._trajectories
+
+        def traj(source, target):
+            if trajectories is not None and trajectories.mode == 'features':
+                return None
+            return self.gea(source, target, 'traj')
+
+        save_columns(self.G, filename, self._state_dim, traj=traj)
 
     def load_graph(self, filename):
-        """ Load a graph from file """
-        with open(filename, 'rb') as f:
-            self._graph = pickle.load(f)
+        """ Load a graph from file
+
+        ``filename`` is either a directory written by :meth:`save_graph`, or
+        a pickled networkx graph (older format). Column arrays are memory
+        mapped, and edge trajectories are only read from disk when accessed.
+        Loaded edges hold their trajectory views directly, even if the graph
+        has a trajectory buffer.
+
+        """
+        if os.path.isdir(filename):
+            self._graph, self._state_dim = load_columns(filename)
+        else:
+            with open(filename, 'rb') as f:
+                self._graph = pickle.load(f)
+        self._types = dict()
+        for n, ndata in self.G.nodes(data=True):
+            self._types.setdefault(ndata['type'], dict())[n] = None
+        self._version += 1
 
     def plot_graph(self, ax=None, path=[]):
         """
@@ -239,11 +584,16 @@ class StateGraph(object):
                          fontsize=8,
                          ax=ax)
 
+    def _retype(self, node_id, ntype):
+        """ Move a node to another type in the type index """
+        self._types[self.G.node[node_id]['type']].pop(node_id)
+        self._types.setdefault(ntype, dict())[node_id] = None
+
     def _check_node_attributes(self, node_id, attribute):
         assert attribute in self._node_attrs,\
             'Attribute [{}] is invalid | Expected:{}'\
             .format(attribute, self._node_attrs)
-        assert node_id in self.nodes, \
+        assert node_id in self.G, \
             'Node ({}) not in the graph'.format(node_id)
 
     def _check_edge_attributes(self, source, target, attribute):
@@ -257,6 +607,11 @@ class StateGraph(object):
     def G(self):
         return self._graph
 
+    @property
+    def trajectories(self):
+        """ Edge trajectory store, ``None`` if kept on the edges """
+        return self._trajectories
+
     @property
     def nodes(self):
         return self.G.nodes()
@@ -273,10 +628,263 @@ class StateGraph(object):
     def transition_matrix(self):
         """ Get the transition matrix T(s, a, s')
 
-        Obtained from the adjacency matrix of the underlying graph
+        Sparse (CSR) adjacency matrix of the graph, see :meth:`sparse_matrix`
 
         """
-        return nx.adjacency_matrix(self.G).todense()
+        return self.sparse_matrix()
+
+    def _cost_matrix(self, weight):
+        """ Edge costs for the shortest path queries """
+        if weight is None:
+            return self.sparse_matrix()
+        if weight == 'duration':
+            return self.sparse_matrix('duration')
+        if weight == 'reward':
+            costs = -self.sparse_matrix('reward')
+            if np.any(costs.data < 0):
+                raise ValueError('Positive rewards cannot be path costs')
+            return costs
+        raise ValueError('Invalid weight [{}] | Expected: {}'
+                         .format(weight, (None, 'duration', 'reward')))
+
+
+class EdgeArrays(object):
+    """ Flat (CSR-like) array view of the edges of a state graph
+
+    Nodes are indexed by their position in the graph node order, and the
+    edges are grouped by source node in the order of the out edges of each
+    node, so that the policy ``pi`` of node ``i`` (an index into its out
+    edges) is the edge ``indptr[i] + pi``.
+
+    Attributes
+    -----------
+    nodes : array-like, shape (N,)
+        Node ids, in the graph node order
+    index : dict
+        Mapping from node id to node position
+    indptr : array-like, shape (N + 1,)
+        Out edges of node ``i`` are the edges ``indptr[i]:indptr[i+1]``
+    source, target : array-like, shape (E,)
+        Source and target node positions of each edge
+    duration, reward : array-like, shape (E,)
+        Edge durations and rewards
+    phi : array-like, shape (E, reward-dim)
+        Edge reward features, ``None`` if the features are not of a fixed
+        dimension
+    version : int
+        Structural version of the graph the view was built from
+
+    """
+
+    def __init__(self, G, version):
+        self.version = version
+        self.nodes = np.array(G.nodes())
+        self.index = dict((n, i) for i, n in enumerate(self.nodes))
+
+        edges = [e for n in self.nodes for e in G.out_edges(n)]
+        degrees = [len(G.succ[n]) for n in self.nodes]
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=int)
+        self.indptr[1:] = np.cumsum(degrees)
+
+        index = self.index
+        self.source = np.array([index[u] for u, _ in edges], dtype=int)
+        self.target = np.array([index[v] for _, v in edges], dtype=int)
+        self.edge_index = dict((e, k) for k, e in enumerate(edges))
+
+        edata = G.edge
+        self.duration = np.array([edata[u][v]['duration'] for u, v in edges],
+                                 dtype=float)
+        self.reward = np.array([edata[u][v]['reward'] for u, v in edges],
+                               dtype=float)
+        try:
+            self.phi = np.array([edata[u][v]['phi'] for u, v in edges],
+                                dtype=float)
+        except ValueError:
+            self.phi = None
+        if self.phi is not None and self.phi.ndim != 2:
+            self.phi = None if edges else np.zeros((0, 0))
+
+    def update_edges(self, edges, attribute, values):
+        """ Write changed attributes of many edges through to the arrays """
+        column = {'duration': self.duration, 'reward': self.reward,
+                  'phi': self.phi}.get(attribute)
+        if column is not None and len(edges):
+            column[[self.edge_index[e] for e in edges]] = values
+
+    def update(self, source, target, attribute, value):
+        """ Write a changed edge attribute through to the arrays """
+        k = self.edge_index[(source, target)]
+        if attribute == 'duration':
+            self.duration[k] = value
+        elif attribute == 'reward':
+            self.reward[k] = value
+        elif attribute == 'phi' and self.phi is not None:
+            self.phi[k] = value
+
+    def matrix(self, values):
+        """ Sparse (CSR) node by node matrix of per edge values """
+        n = self.n_nodes
+        return sp.csr_matrix((np.array(values, dtype=float), self.target,
+                              self.indptr), shape=(n, n))
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def n_edges(self):
+        return len(self.source)
+
+    @property
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+
+########################################################################
+# Columnar persistence
+# ######################################################################
+
+_COLUMNS_VERSION = 1
+
+
+def save_columns(G, dirname, state_dim, traj=None):
+    """ Write a state graph as a directory of ``.npy`` column arrays
+
+    Nodes are written in the graph node order and edges grouped by source in
+    the order of the out edges of each node, so that the node policies
+    ``pi`` remain valid after loading. Variable length data (``Q`` and the
+    edge trajectories) are concatenated into a single array per attribute,
+    with an ``(n + 1,)`` array of offsets.
+
+    Parameters
+    -----------
+    G : networkx.DiGraph
+        Underlying graph of a :class:`StateGraph`
+    dirname : str
+        Output directory, created if missing
+    state_dim : int
+        Dimension of the node state vectors
+    traj : callable, optional (default=None)
+        Called as ``traj(source, target)`` to get the trajectory of an edge,
+        defaults to the ``traj`` edge attribute. Missing (``None``)
+        trajectories are saved as empty.
+
+    """
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    nodes = G.nodes()
+    ndata = G.node
+    edges = [e for n in nodes for e in G.out_edges(n)]
+    edata = G.edge
+
+    columns = dict()
+    columns['node_id'] = np.array(nodes, dtype=int)
+    columns['node_data'] = np.array([ndata[n]['data'] for n in nodes],
+                                    dtype=float).reshape(-1, state_dim)
+    for key in ('cost', 'priority', 'V'):
+        columns['node_' + key] = np.array([ndata[n][key] for n in nodes],
+                                          dtype=float)
+    columns['node_pi'] = np.array([ndata[n]['pi'] for n in nodes], dtype=int)
+    columns['node_type'] = np.array([ndata[n]['type'] for n in nodes],
+                                    dtype=str)
+    columns['node_Q'], columns['node_Q_offsets'] = _flatten(
+        [np.asarray(ndata[n]['Q'], dtype=float).ravel() for n in nodes])
+
+    columns['edge_source'] = np.array([u for u, _ in edges], dtype=int)
+    columns['edge_target'] = np.array([v for _, v in edges], dtype=int)
+    for key in ('duration', 'reward'):
+        columns['edge_' + key] = np.array([edata[u][v][key]
+                                           for u, v in edges], dtype=float)
+    columns['edge_phi'], columns['edge_phi_offsets'] = _flatten(
+        [np.asarray(edata[u][v]['phi'], dtype=float).ravel()
+         for u, v in edges])
+    if traj is None:
+        def traj(u, v):
+            return edata[u][v]['traj']
+    trajs = [traj(u, v) for u, v in edges]
+    width = max([np.shape(t)[1] for t in trajs if t is not None] + [0])
+    columns['edge_traj'], columns['edge_traj_offsets'] = _flatten(
+        [np.zeros((0, width)) if t is None else np.asarray(t, dtype=float)
+         for t in trajs])
+
+    for key, value in columns.items():
+        np.save(os.path.join(dirname, key + '.npy'), value,
+                allow_pickle=False)
+
+    meta = {'version': _COLUMNS_VERSION, 'state_dim': state_dim,
+            'n_nodes': len(nodes), 'n_edges': len(edges)}
+    with open(os.path.join(dirname, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=4, sort_keys=True)
+
+
+def load_columns(dirname):
+    """ Read a state graph written by :func:`save_columns`
+
+    The columns are opened with ``mmap_mode='r'``. Edge trajectories are
+    read-only views into the memory mapped trajectory array, so they are only
+    paged in when accessed. Building the networkx graph itself remains linear
+    in the number of nodes and edges.
+
+    Returns
+    --------
+    G : networkx.DiGraph
+        The graph, with the node order and out edge order of the saved graph
+    state_dim : int
+        Dimension of the node state vectors
+
+    """
+    with open(os.path.join(dirname, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta['version'] != _COLUMNS_VERSION:
+        raise ValueError('Unsupported graph format version: {}'
+                         .format(meta['version']))
+
+    def column(key):
+        return np.load(os.path.join(dirname, key + '.npy'), mmap_mode='r',
+                       allow_pickle=False)
+
+    G = nx.DiGraph()
+
+    node_ids = column('node_id').tolist()
+    data = np.array(column('node_data'))
+    cost = column('node_cost').tolist()
+    priority = column('node_priority').tolist()
+    V = column('node_V').tolist()
+    pi = column('node_pi').tolist()
+    ntype = column('node_type').tolist()
+    Q = column('node_Q').tolist()
+    q_off = column('node_Q_offsets').tolist()
+    G.add_nodes_from((n, dict(data=data[i], cost=cost[i],
+                              priority=priority[i],
+                              Q=Q[q_off[i]:q_off[i + 1]], V=V[i], pi=pi[i],
+                              type=ntype[i]))
+                     for i, n in enumerate(node_ids))
+
+    source = column('edge_source').tolist()
+    target = column('edge_target').tolist()
+    duration = column('edge_duration').tolist()
+    reward = column('edge_reward').tolist()
+    phi = np.array(column('edge_phi'))
+    phi_off = column('edge_phi_offsets').tolist()
+    # - plain ndarray view of the memory map, slicing np.memmap is slow
+    traj = column('edge_traj').view(np.ndarray)
+    traj_off = column('edge_traj_offsets').tolist()
+    G.add_edges_from((u, v, dict(duration=duration[k], reward=reward[k],
+                                 phi=phi[phi_off[k]:phi_off[k + 1]],
+                                 traj=traj[traj_off[k]:traj_off[k + 1]]))
+                     for k, (u, v) in enumerate(zip(source, target)))
+
+    return G, meta['state_dim']
+
+
+def _flatten(arrays):
+    """ Concatenate arrays along the first axis, with (n + 1,) offsets """
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(a) for a in arrays])
+    if not arrays:
+        return np.zeros(0), offsets
+    return np.concatenate(arrays), offsets
 
 
 def eud(data1, data2):
@@ -0,0 +1,212 @@
+"""
+Storage of the local trajectories of state graph edges.
+
+After an edge is created, its trajectory is only needed for visualization
+(the reward features are already summarized in ``phi``), yet trajectories
+make up most of the memory of a large graph. A :class:`TrajectoryBuffer`
+keeps all trajectories in a single append-only array, optionally spilled to a
+memory mapped file, and the edges only hold ``(offset, length)`` handles into
+it.
+
+"""
+
+from __future__ import division
+
+import os
+import tempfile
+
+import numpy as np
+
+
+__all__ = [
+    'TrajectoryBuffer',
+]
+
+
+class TrajectoryBuffer(object):
+    """ Append-only store of edge trajectories
+
+    Parameters
+    -----------
+    mode : str, optional (default='memory')
+        Storage mode, one of
+
+        * ``'memory'``, trajectories are kept in a growing in-memory array
+        * ``'mmap'``, trajectories are kept in a growing memory mapped file
+        * ``'features'``, trajectories are discarded, and regenerated on
+          demand with :attr:`regenerate` if set
+    filename : str, optional (default=None)
+        File backing the buffer in ``'mmap'`` mode, a temporary file is
+        created (and removed with the buffer) if not given
+    capacity : int, optional (default=4096)
+        Initial number of waypoints the buffer can hold
+
+    Attributes
+    -----------
+    regenerate : callable, optional (default=None)
+        Called as ``regenerate(source, target)`` with the edge end nodes to
+        recompute a discarded trajectory in ``'features'`` mode
+
+    """
+
+    _MODES = ('memory', 'mmap', 'features')
+
+    def __init__(self, mode='memory', filename=None, capacity=4096):
+        if mode not in self._MODES:
+            raise ValueError('Invalid mode [{}] | Expected: {}'
+                             .format(mode, self._MODES))
+        self.mode = mode
+        self.regenerate = None
+
+        self._filename = filename
+        self._owns_file = False
+        if mode == 'mmap' and filename is None:
+            fd, self._filename = tempfile.mkstemp(suffix='.traj')
+            os.close(fd)
+            self._owns_file = True
+
+        self._capacity = max(int(capacity), 1)
+        self._data = None
+        self._size = 0
+
+    def append(self, traj):
+        """ Store a trajectory
+
+        Parameters
+        -----------
+        traj : array-like, shape (T, width)
+            Waypoints of the trajectory
+
+        Returns
+        --------
+        handle : tuple
+            ``(offset, length)`` of the trajectory in the buffer
+
+        """
+        traj = np.asarray(traj, dtype=float)
+        assert traj.ndim == 2, 'Expecting a 2-dim dim trajectory'
+        if self.mode == 'features':
+            return (0, 0)
+
+        n = traj.shape[0]
+        if self._data is None:
+            self._allocate(max(self._capacity, n), traj.shape[1])
+        assert traj.shape[1] == self.width,\
+            'Expecting trajectories of width {}'.format(self.width)
+        if self._size + n > self._data.shape[0]:
+            self._grow(max(2 * self._data.shape[0], self._size + n))
+
+        offset = self._size
+        self._data[offset:offset + n] = traj
+        self._size += n
+        return (offset, n)
+
+    def get(self, handle, source=None, target=None):
+        """ Retrieve a stored trajectory
+
+        Parameters
+        -----------
+        handle : tuple
+            ``(offset, length)`` as returned by :meth:`append`
+        source, target : int, optional
+            End nodes of the edge, used for regeneration in ``'features'``
+            mode
+
+        Returns
+        --------
+        traj : array-like or None
+            Read-only view of the trajectory, or ``None`` in ``'features'``
+            mode without a :attr:`regenerate` callback
+
+        """
+        if self.mode == 'features':
+            if self.regenerate is None:
+                return None
+            return self.regenerate(source, target)
+
+        offset, n = handle
+        view = self._data[offset:offset + n].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def attach(self, size, width):
+        """ Reuse the trajectories already in the backing file
+
+        In ``'mmap'`` mode, reopens an existing backing file holding at least
+        ``size`` waypoints of ``width`` values, e.g. those written before a
+        run was checkpointed, so that their handles stay valid. Later
+        trajectories are appended after them.
+
+        """
+        if self.mode != 'mmap':
+            raise ValueError('Cannot attach a buffer in [{}] mode'
+                             .format(self.mode))
+        itemsize = np.dtype(float).itemsize
+        nbytes = os.path.getsize(self._filename) \
+            if os.path.exists(self._filename) else 0
+        capacity = nbytes // (int(width) * itemsize)
+        if capacity < size:
+            raise ValueError('Backing file [{}] holds {} waypoints | '
+                             'Expected: >= {}'
+                             .format(self._filename, capacity, size))
+        self._data = np.memmap(self._filename, dtype=float, mode='r+',
+                               shape=(capacity, int(width)))
+        self._size = int(size)
+
+    def flush(self):
+        """ Write the stored waypoints to the backing file (if any) """
+        if isinstance(self._data, np.memmap):
+            self._data.flush()
+
+    def clear(self):
+        """ Drop all stored trajectories, keeping the allocated storage """
+        self._size = 0
+
+    def close(self):
+        """ Release the storage (and the temporary backing file if any) """
+        self._data = None
+        self._size = 0
+        if self._owns_file and os.path.exists(self._filename):
+            os.remove(self._filename)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    @property
+    def width(self):
+        """ Number of values per waypoint """
+        return None if self._data is None else self._data.shape[1]
+
+    @property
+    def size(self):
+        """ Number of stored waypoints """
+        return self._size
+
+    @property
+    def nbytes(self):
+        """ Memory (or file) size of the stored waypoints """
+        return 0 if self._data is None else self._data[:self._size].nbytes
+
+    def _allocate(self, capacity, width):
+        if self.mode == 'mmap':
+            self._data = np.memmap(self._filename, dtype=float, mode='w+',
+                                   shape=(capacity, width))
+        else:
+            self._data = np.zeros((capacity, width))
+
+    def _grow(self, capacity):
+        width = self._data.shape[1]
+        if self.mode == 'mmap':
+            self._data.flush()
+            self._data = None
+            with open(self._filename, 'r+b') as f:
+                f.truncate(capacity * width * np.dtype(float).itemsize)
+            self._data = np.memmap(self._filename, dtype=float, mode='r+',
+                                   shape=(capacity, width))
+        else:
+            data = np.zeros((capacity, width))
+            data[:self._size] = self._data[:self._size]
+            self._data = data
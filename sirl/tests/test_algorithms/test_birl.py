@@ -0,0 +1,151 @@
+
+from nose.tools import assert_equal
+from numpy.testing import assert_array_almost_equal
+
+import numpy as np
+
+from sirl.domains.puddle_world.puddle_world import PuddleWorldMDP
+from sirl.domains.puddle_world.puddle_world import PuddleWorldEnvironment
+from sirl.domains.puddle_world.puddle_world import PuddleWorldControler
+from sirl.domains.puddle_world.puddle_world import PuddleRewardOriented
+from sirl.algorithms.controller_graph import ControllerGraph, CGParameters
+from sirl.algorithms.birl import STBIRLLinearProg, GaussianRewardPrior
+from sirl.algorithms.birl import MaxEntIRL, GTBIRLOptim
+from sirl.algorithms.birl.base import TrajectoryFeatureStore
+from sirl.models.base import TrajQualityLoss
+
+
+def make_test_rep(edge_eval='eager'):
+    world = PuddleWorldEnvironment(start=[(0.3, 0.65)], goal=(0.97, 0.97))
+    controller = PuddleWorldControler(world)
+    reward = PuddleRewardOriented(world, weights=(1.0, -0.0002, -0.001))
+    mdp = PuddleWorldMDP(discount=0.95, reward=reward, world=world)
+    params = CGParameters(radius=0.15, max_samples=10, edge_eval=edge_eval)
+    cg = ControllerGraph(mdp=mdp, local_controller=controller, params=params)
+    cg.initialize_state_graph(samples=[(0.5, 0.07), (0.8, 0.5)])
+    return cg
+
+
+def test_trajectory_feature_store():
+    cg = make_test_rep()
+    trajs = [[0, 2, 1], [0, 3, 1], [0, 2, 1]]
+    store = TrajectoryFeatureStore(cg)
+    assert_equal(store.add(trajs), 0)
+    assert_equal(store.add(trajs[:1]), 1)
+
+    assert_equal(len(store), 2)
+    assert_equal(store.features.shape, (2, cg.mdp.reward.dim))
+    assert_array_almost_equal(store.counts, [3, 1])
+
+    reward = np.array([0.5, -0.2, -0.1])
+    assert_array_almost_equal(store.set_quality(reward, 0),
+                              cg.trajectory_quality(reward, trajs))
+    assert_array_almost_equal(store.quality(reward),
+                              cg.trajectory_quality(reward, trajs[:2]))
+
+
+def test_expert_features():
+    cg = make_test_rep()
+    demos = [list(t) for t in cg.find_best_policies()]
+    store = TrajectoryFeatureStore(cg, follow_policy=False)
+    store.add(demos)
+
+    # - discounted features along the edges of the demonstrations
+    G, gamma = cg.graph, cg.mdp.gamma
+    for demo, mu in zip(demos, store.features):
+        expected, duration = 0, 0
+        for u, v in zip(demo[:-1], demo[1:]):
+            expected += gamma ** duration * G.gea(u, v, 'phi')
+            duration += G.gea(u, v, 'duration')
+        assert_array_almost_equal(mu, expected)
+
+    # - the expert qualities do not change with the policy
+    reward = np.array([0.5, -0.2, -0.1])
+    pi = G.get_node_attr_array('pi')
+    algo = STBIRLLinearProg(demos, cg, GaussianRewardPrior(dim=3),
+                            TrajQualityLoss(p=2))
+    algo._compute_policy(np.array([-1.0, 1.0, 1.0]))
+    assert np.any(G.get_node_attr_array('pi') != pi)
+
+    changed = TrajectoryFeatureStore(cg, follow_policy=False)
+    changed.add(demos)
+    assert_array_almost_equal(changed.set_quality(reward, 0),
+                              store.set_quality(reward, 0))
+
+
+def test_stbirl_linear_prog():
+    cg = make_test_rep()
+    demos = [list(t) for t in cg.find_best_policies()]
+    algo = STBIRLLinearProg(demos, cg, GaussianRewardPrior(dim=3),
+                            TrajQualityLoss(p=2), reward_max=1.0, max_iter=3)
+    reward = algo.solve()
+    assert_equal(reward.shape, (3,))
+    assert np.all(np.abs(reward) <= 1.0 + 1e-09)
+    assert_equal(len(algo._policies), len(algo.data['loss']))
+
+    # - the policies are followed from the starts of the demonstrations
+    for policy in algo._policies:
+        assert_equal([traj[0] for traj in policy], [d[0] for d in demos])
+
+
+def test_repeated_solve():
+    cg = make_test_rep()
+    demos = [list(t) for t in cg.find_best_policies()]
+    prior, loss = GaussianRewardPrior(dim=3), TrajQualityLoss(p=2)
+    for algo, generated in (
+            (STBIRLLinearProg(demos, cg, prior, loss, max_iter=3),
+             '_policies'),
+            (GTBIRLOptim(demos, cg, prior, loss, max_iter=2), '_g_trajs')):
+        np.random.seed(0)
+        reward = algo.solve()
+        counts = algo._e_store.counts.copy()
+        n_generated = len(getattr(algo, generated))
+
+        # - the expert counts and policies of the first solve are dropped
+        np.random.seed(0)
+        assert_array_almost_equal(algo.solve(), reward)
+        assert_array_almost_equal(algo._e_store.counts, counts)
+        assert_equal(len(getattr(algo, generated)), n_generated)
+
+
+def test_maxent_gradient():
+    cg = make_test_rep()
+    demos = [list(t) for t in cg.find_best_policies()]
+    algo = MaxEntIRL(demos, cg, GaussianRewardPrior(dim=3),
+                     TrajQualityLoss(p=2), l2=0.1, eps=1e-12,
+                     sweeps_max=5000)
+    algo._prepare()
+
+    w = np.array([0.3, -0.2, -0.001])
+    _, grad = algo._objective(w)
+    num_grad = np.zeros(3)
+    for i in range(3):
+        h = np.zeros(3)
+        h[i] = 1e-06
+        num_grad[i] = (algo._objective(w + h)[0] -
+                       algo._objective(w - h)[0]) / 2e-06
+    assert_array_almost_equal(grad / num_grad, np.ones(3), decimal=4)
+
+    _, pi = algo.soft_values(w)
+    ea = cg.graph.edge_arrays()
+    has_out = ea.out_degree > 0
+    assert_array_almost_equal(np.add.reduceat(pi, ea.indptr[:-1][has_out]),
+                              np.ones(has_out.sum()))
+
+
+def test_lazy_edges_irl():
+    eager = make_test_rep()
+    demos = [list(t) for t in eager.find_best_policies()]
+    lazy = make_test_rep(edge_eval='lazy')
+    assert lazy._lazy
+
+    # - the lazy edges are evaluated before learning from the graph
+    for algo in (STBIRLLinearProg, MaxEntIRL):
+        rewards = []
+        for cg in (eager, lazy):
+            irl = algo(demos, cg, GaussianRewardPrior(dim=3),
+                       TrajQualityLoss(p=2), max_iter=3)
+            rewards.append(irl.solve())
+        assert_array_almost_equal(rewards[0], rewards[1])
+        assert_equal(lazy._lazy, set())
+        assert_equal(lazy.policies, eager.policies)
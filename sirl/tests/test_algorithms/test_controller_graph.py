@@ -0,0 +1,369 @@
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy.sparse.csgraph import minimum_spanning_tree
+
+from nose.tools import assert_equal, assert_raises
+from numpy.testing import assert_array_almost_equal
+
+from sirl.domains.puddle_world.puddle_world import PuddleWorldMDP
+from sirl.domains.puddle_world.puddle_world import PuddleWorldEnvironment
+from sirl.domains.puddle_world.puddle_world import PuddleWorldControler
+from sirl.domains.puddle_world.puddle_world import PuddleRewardOriented
+from sirl.algorithms.controller_graph import ControllerGraph, CGParameters
+from sirl.utils.profiling import Profiler, tracemalloc
+
+
+def make_test_cg(**params):
+    world = PuddleWorldEnvironment(start=[(0.3, 0.65)], goal=(0.97, 0.97))
+    reward = PuddleRewardOriented(world, weights=(1.0, -0.0002, -0.001))
+    mdp = PuddleWorldMDP(discount=0.95, reward=reward, world=world)
+    controller = PuddleWorldControler(world)
+    return ControllerGraph(mdp=mdp, local_controller=controller,
+                           params=CGParameters(**params))
+
+
+def add_chain(G, positions, types):
+    for i, (pos, ntype) in enumerate(zip(positions, types)):
+        G.add_node(nid=i, data=pos, cost=0, priority=1, Q=[], V=0, pi=0,
+                   ntype=ntype)
+    traj = [(0, 0), (1, 1)]
+    for i in range(len(positions) - 1):
+        G.add_edge(i, i + 1, 1.0, 0.0, [0, 0, 0], traj)
+
+
+def test_policy_rollouts():
+    cg = make_test_cg(max_traj_len=100)
+    G = cg.graph
+    add_chain(G, [(0.1, 0.1), (0.2, 0.2), (0.3, 0.3), (0.97, 0.97)],
+              ['start', 'simple', 'start', 'goal'])
+    traj = [(0, 0), (1, 1)]
+    G.add_edge(2, 1, 1.0, 0.0, [0, 0, 0], traj)
+    assert_equal(cg.find_best_policies(), [[0, 1, 2, 3], [2, 3]])
+
+    # - cycle 1 -> 2 -> 1 is cut at the first revisit
+    G.sna(2, 'pi', 1)
+    assert_equal(cg.find_best_policies(), [[0, 1, 2], [2, 1]])
+
+    # - the duration budget ends the rollouts
+    cg.params.max_traj_len = 1
+    assert_equal(cg.policy_rollouts([0]), [[0, 1]])
+
+
+def _reference_state_costs(G, cmax):
+    """ Node by node relaxation, as originally done in the controller graph
+    """
+    converged = False
+    while not converged:
+        cost_changed = False
+        for node in G.nodes:
+            for e in G.out_edges(node):
+                nn = e[1]
+                cost = G.gna(node, 'cost') + G.gea(e[0], e[1], 'reward')
+                if G.gna(nn, 'cost') < cost and abs(cost) < cmax:
+                    G.sna(nn, 'cost', cost)
+                    cost_changed = True
+        if not cost_changed:
+            converged = True
+
+
+def test_update_state_costs():
+    n = 25
+    types = ['start'] + ['simple'] * (n - 2) + ['goal']
+    for seed in range(10):
+        graphs = []
+        for _ in range(2):
+            rng = np.random.RandomState(seed)
+            cg = make_test_cg(max_cost=20.0)
+            G = cg.graph
+            add_chain(G, rng.uniform(0, 1, size=(n, 2)), types)
+            for u, v in rng.randint(n, size=(3 * n, 2)):
+                if u != v and not G.edge_exists(u, v):
+                    G.add_edge(u, v, 1.0, 0.0, [0, 0, 0], [(0, 0)])
+            for u, v in G.all_edges:
+                G.sea(u, v, 'reward', rng.uniform(-3, -0.1))
+            for i in range(1, n):
+                G.sna(i, 'cost', -cg.params.max_cost)
+            graphs.append((cg, G))
+
+        (cg, G), (_, H) = graphs
+        cg._update_state_costs()
+        _reference_state_costs(H, cg.params.max_cost)
+        assert_array_almost_equal([G.gna(i, 'cost') for i in range(n)],
+                                  [H.gna(i, 'cost') for i in range(n)])
+
+
+def test_features_only_trajectories():
+    cg = make_test_cg(traj_store='features')
+    G = cg.graph
+    add_chain(G, [(0.1, 0.1), (0.3, 0.2)], ['start', 'goal'])
+    assert_equal(cg.graph.trajectories.nbytes, 0)
+    expected = cg._controller.trajectory((0.1, 0.1), (0.3, 0.2))
+    assert_array_almost_equal(G.gea(0, 1, 'traj'), expected)
+
+
+def test_state_sets():
+    cg = make_test_cg(radius=0.15, max_samples=20, n_new=10, speed=0.05,
+                      tmin=(0.03, 0.08), tmax=(0.1, 0.2), exp_thresh=0.0)
+    np.random.seed(0)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)])
+    cg.run()
+
+    G = cg.graph
+    best = set(n for traj in cg.policies for n in traj)
+    assert_equal(set(cg._s_best), best)
+    assert_equal(set(cg._s_other), set(G.nodes) - best)
+    for sampler in (cg._s_best, cg._s_other):
+        for n in sampler:
+            assert_equal(sampler.priority(n), G.gna(n, 'priority'))
+
+
+def test_solve_goals():
+    cg = make_test_cg(radius=0.15, speed=0.05, tmin=(0.03, 0.08),
+                      tmax=(0.1, 0.2))
+    samples = [tuple(p) for p in
+               np.random.RandomState(0).uniform(0, 1, size=(12, 2))]
+    np.random.seed(0)
+    cg.initialize_state_graph(samples=samples)
+
+    # - the goal state of the world (1) is a closer terminal for some goals
+    goals = list(range(2, 14))
+    table = cg.solve_goals(goals)
+    for goal in goals:
+        route = table.route(0, goal)
+        assert_equal(route[0], 0)
+        assert_equal(route[-1], goal)
+        assert 1 not in route
+    # - no route within a single action
+    assert_equal(table.route(0, 13, max_len=1), None)
+
+
+def test_uniform_state_priorities():
+    cg = make_test_cg(radius=0.15)
+    # - equal cost and value at all states
+    add_chain(cg.graph, [(0.1, 0.1), (0.3, 0.2), (0.5, 0.3)],
+              ['start', 'simple', 'goal'])
+    cg._update_state_priorities()
+    priorities = cg.graph.get_signal('priority')
+    assert np.all(np.isfinite(priorities))
+    assert_equal(sorted(cg._s_other), [0, 1, 2])
+
+
+def test_neighbor_init():
+    samples = [tuple(p) for p in
+               np.random.RandomState(0).uniform(0, 1, size=(30, 2))]
+    for params in (dict(init_type='knn', n_neighbors=3, max_edges=4),
+                   dict(init_type='radius', radius=0.001)):
+        cg = make_test_cg(**params)
+        np.random.seed(0)
+        cg.initialize_state_graph(samples=samples)
+
+        G = cg.graph
+        assert_equal(len(G.nodes), 32)
+        assert len(G.all_edges) < 32 * 31
+        if params['init_type'] == 'knn':
+            assert max(len(G.out_edges(n)) for n in G.nodes) <= 4
+        else:
+            # - the Euclidean minimum spanning tree only
+            assert_equal(cg.stats['counters']['init_pairs'], 31)
+            pos = G.get_node_attr_array('data', G.nodes)[:, :2]
+            d = np.linalg.norm(pos[:, None] - pos[None, :], axis=2)
+            mst = minimum_spanning_tree(d).tocoo()
+            assert_equal(set(tuple(sorted(e)) for e in G.all_edges),
+                         set((min(G.nodes[i], G.nodes[j]),
+                              max(G.nodes[i], G.nodes[j]))
+                             for i, j in zip(mst.row, mst.col)))
+
+        goal = G.filter_nodes_by_type('goal')[0]
+        ea = G.edge_arrays()
+        reachable = G.reachable(G.filter_nodes_by_type('start'))
+        assert reachable[ea.index[goal]]
+
+
+def test_feasible_sampling():
+    cg = make_test_cg(tmin=(0.05, 0.1), tmax=(0.2, 0.4))
+    np.random.seed(0)
+    cg.initialize_state_graph(samples=[(0.02, 0.02), (0.5, 0.5)])
+    G = cg.graph
+    calls = cg.stats['counters']['controller']
+
+    for n in G.nodes:
+        for _ in range(20):
+            state = cg._sample_new_state_from(n)
+            assert state is not None
+            assert cg._controller._world.in_world(state['data'])
+    # - the headings are drawn from the feasible ones, none is rejected
+    assert_equal(cg.stats['counters']['controller'] - calls,
+                 20 * len(G.nodes))
+
+    # - moves longer than the world is wide are never feasible
+    cg = make_test_cg()
+    cg.initialize_state_graph(samples=[(0.5, 0.5)])
+    assert cg._sample_new_state_from(cg.graph.nodes[0]) is None
+    assert_equal(cg.stats['counters']['infeasible'], 1)
+
+
+def test_lazy_edges():
+    params = dict(radius=0.15, max_samples=20, n_new=10, speed=0.05,
+                  tmin=(0.03, 0.08), tmax=(0.1, 0.2), exp_thresh=0.0)
+    eager = make_test_cg(**params)
+    cg = make_test_cg(edge_eval='lazy', **params)
+    np.random.seed(0)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)])
+    cg.run()
+
+    G = cg.graph
+    assert len(cg._lazy) > 0
+    for u, v in cg._lazy:
+        assert_equal(len(G.gea(u, v, 'traj')), 2)
+    for traj in cg.policies:
+        for e in zip(traj[:-1], traj[1:]):
+            assert e not in cg._lazy
+
+    # - evaluated edges hold the values of eagerly added edges
+    eager.graph.G.add_nodes_from(G.G.nodes(data=True))
+    u, v = sorted(cg._lazy)[0]
+    cg._evaluate_edge(u, v)
+    eager._connect_states(u, v)
+    for key in ('duration', 'reward', 'phi', 'traj'):
+        assert_array_almost_equal(G.gea(u, v, key),
+                                  eager.graph.gea(u, v, key))
+
+
+def test_lazy_edges_buffer():
+    cg = make_test_cg(edge_eval='lazy', traj_store='memory', radius=0.15,
+                      max_samples=20, n_new=10, speed=0.05, tmin=(0.03, 0.08),
+                      tmax=(0.1, 0.2), exp_thresh=0.0)
+    calls = []
+    reward = cg.mdp.reward
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return reward(*args, **kwargs)
+    cg.mdp.reward = counted
+    np.random.seed(0)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)])
+    cg.run()
+    assert_equal(cg.stats['counters']['reward'], len(calls))
+
+    # - only the trajectories of evaluated edges are buffered
+    G = cg.graph
+    evaluated = [e for e in G.all_edges if e not in cg._lazy]
+    assert_equal(G.trajectories.size,
+                 sum(len(G.gea(u, v, 'traj')) for u, v in evaluated))
+
+
+def test_checkpoint_resume():
+    def run(cg, stop_after=None):
+        np.random.seed(42)
+        cg.initialize_state_graph(samples=[(0.5, 0.07)])
+        if stop_after is not None:
+            # - interrupt the run after a few iterations
+            priorities = cg._update_state_priorities
+            calls = []
+
+            def interrupted():
+                calls.append(1)
+                if len(calls) > stop_after:
+                    raise KeyboardInterrupt
+                priorities()
+            cg._update_state_priorities = interrupted
+        try:
+            cg.run(checkpoint=path, checkpoint_every=3)
+        except KeyboardInterrupt:
+            pass
+        return cg
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'checkpoint')
+        traj_file = os.path.join(tmp, 'trajs.bin')
+        for extra in (dict(edge_eval='eager'), dict(edge_eval='lazy'),
+                      dict(traj_store='mmap', traj_file=traj_file),
+                      dict(edge_eval='lazy', traj_store='mmap',
+                           traj_file=traj_file)):
+            params = dict(radius=0.15, max_samples=25, n_new=10, n_add=2,
+                          speed=0.05, tmin=(0.03, 0.08), tmax=(0.1, 0.2),
+                          exp_thresh=0.0, **extra)
+            full = run(make_test_cg(**dict(params, traj_file=None)))
+            run(make_test_cg(**params), stop_after=6)
+            resumed = make_test_cg(**params)
+            resumed.resume(path)
+
+            assert_equal(resumed._node_id, full._node_id)
+            assert_equal(resumed.graph.nodes, full.graph.nodes)
+            assert_equal(sorted(resumed.graph.all_edges),
+                         sorted(full.graph.all_edges))
+            assert_equal(resumed._lazy, full._lazy)
+            assert_equal(resumed.policies, full.policies)
+            assert_array_almost_equal(resumed.graph.get_signal('V'),
+                                      full.graph.get_signal('V'))
+            assert_equal(resumed._start_states, full._start_states)
+            assert_equal(resumed.stats['counters'], full.stats['counters'])
+
+            # - the trajectories of the checkpoint are not appended again
+            if resumed.graph.trajectories is not None:
+                assert_equal(resumed.graph.trajectories.size,
+                             full.graph.trajectories.size)
+            for u, v in full.graph.all_edges:
+                assert_array_almost_equal(resumed.graph.gea(u, v, 'traj'),
+                                          full.graph.gea(u, v, 'traj'))
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_interrupted_run_profiler():
+    cg = make_test_cg(radius=0.15, max_samples=25, n_new=10,
+                      tmin=(0.03, 0.08), tmax=(0.1, 0.2), exp_thresh=0.0)
+    cg._profiler = Profiler(cprofile=True, trace_memory=True)
+    np.random.seed(0)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)])
+
+    def interrupted():
+        raise KeyboardInterrupt
+    cg._update_state_priorities = interrupted
+    assert_raises(KeyboardInterrupt, cg.run)
+
+    # - the capture is stopped with the run
+    assert not cg._profiler._traced
+    assert cg._profiler.memory_peak is not None
+    if tracemalloc is not None:
+        assert not tracemalloc.is_tracing()
+
+
+def test_cg_parameters():
+    params = CGParameters(radius=2, tmin=[0.1, 0.2])
+    assert_equal(params.radius, 2.0)
+    assert_equal(params.tmin, (0.1, 0.2))
+
+    derived = params.derive(n_new=5)
+    assert_equal(derived.n_new, 5)
+    assert_equal(params.n_new, 20)
+    assert params.content_hash() != derived.content_hash()
+    assert_equal(derived.derive(n_new=20).content_hash(),
+                 params.content_hash())
+
+    for bad in (dict(unknown=1), dict(n_new=2.5), dict(init_type='grid'),
+                dict(tmax=(1.0,)), dict(speed='fast'), dict(p_best=1.5),
+                dict(p_best=-0.1), dict(radius=0), dict(max_samples=0),
+                dict(n_expand=0), dict(n_new=0), dict(n_candidates=0),
+                dict(goal_bias=2.0), dict(conc_scale=-0.5)):
+        assert_raises(ValueError, CGParameters, **bad)
+    assert_raises(ValueError, setattr, params, 'max_samples', None)
+    assert_raises(ValueError, setattr, params, 'radius', -1.0)
+    assert_equal(CGParameters(p_best=1, goal_bias=0).p_best, 1.0)
+    assert_equal(CGParameters(conc_scale=0).conc_scale, 0.0)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp, 'params.json')
+        derived.save(filename)
+        loaded = CGParameters()
+        loaded.load(filename)
+        assert_equal(loaded, derived)
+        assert_equal(loaded.content_hash(), derived.content_hash())
+    finally:
+        shutil.rmtree(tmp)
@@ -0,0 +1,89 @@
+
+import numpy as np
+
+from nose.tools import assert_equal, assert_raises
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sirl.models.state_graph import StateGraph
+from sirl.algorithms.mdp_solvers import graph_policy_iteration
+from sirl.algorithms.mdp_solvers import batch_policy_iteration
+from sirl.algorithms.mdp_solvers import multi_goal_policy_iteration
+
+
+def make_graph(n_nodes=30, degree=4, reward_dim=3, seed=0):
+    rng = np.random.RandomState(seed)
+    g = StateGraph(state_dim=2)
+    for i in range(n_nodes):
+        g.add_node(nid=i, data=rng.uniform(0, 1, 2), cost=0.0, priority=1.0,
+                   Q=[], V=0.0, pi=0, ntype='simple')
+    traj = np.zeros((5, 2))
+    for i in range(1, n_nodes):
+        for j in rng.choice(n_nodes, size=degree, replace=False):
+            if i != j:
+                g.add_edge(i, int(j), duration=rng.uniform(0.5, 3.0),
+                           reward=0.0, phi=rng.uniform(0, 1, reward_dim),
+                           traj=traj)
+    return g
+
+
+def test_batch_policy_iteration():
+    g = make_graph()
+    rewards = np.random.RandomState(1).uniform(-1, 1, size=(4, 3))
+    V, pi = batch_policy_iteration(g, rewards, gamma=0.9)
+    assert_equal(V.shape, (30, 4))
+    assert_equal(pi.shape, (30, 4))
+
+    # - the graph is left untouched
+    nodes = g.edge_arrays().nodes.tolist()
+    assert_array_equal([g.gna(n, 'V') for n in nodes], np.zeros(30))
+
+    for k, w in enumerate(rewards):
+        h = make_graph()
+        for u, v in h.all_edges:
+            h.sea(u, v, 'reward', np.dot(h.gea(u, v, 'phi'), w))
+        graph_policy_iteration(h, gamma=0.9)
+        assert_array_equal(pi[:, k], [h.gna(n, 'pi') for n in nodes])
+        assert_allclose(V[:, k], [h.gna(n, 'V') for n in nodes], atol=1e-5)
+
+    assert_raises(ValueError, batch_policy_iteration, g, np.ones((2, 4)))
+
+
+def test_multi_goal_policy_iteration():
+    g = make_graph()
+    goals = [3, 7, 11]
+    table = multi_goal_policy_iteration(g, goals, gamma=0.9, goal_value=5.0,
+                                        dead_end_value=-1.0)
+    assert_equal(table.V.shape, (30, 3))
+
+    for goal in goals:
+        h = make_graph()
+        for v in list(h.G.successors(goal)):
+            h.remove_edge(goal, v)
+        h.sna(goal, 'V', 5.0)
+        # - node 0 has no out edges
+        h.sna(0, 'V', -1.0)
+        graph_policy_iteration(h, gamma=0.9)
+
+        values = table.values_for(goal)
+        policy = table.policy_for(goal)
+        assert goal not in policy
+        for n in h.nodes:
+            assert_allclose(values[n], h.gna(n, 'V'), atol=1e-5)
+            if n in policy:
+                assert_equal(policy[n], h.gna(n, 'pi'))
+
+        route = table.route(5, goal)
+        assert_equal(route[0], 5)
+        assert_equal(route[-1], goal)
+        for u, v in zip(route[:-1], route[1:]):
+            assert_equal(h.out_edges(u)[policy[u]][1], v)
+
+    assert_raises(KeyError, table.policy_for, 4)
+
+    # - by default, dead ends are worse than any route to the goal
+    g.sna(0, 'V', 10.0)
+    table = multi_goal_policy_iteration(g, goals, gamma=0.9, goal_value=5.0)
+    for goal in goals:
+        values = table.values_for(goal)
+        assert all(values[0] < values[n] for n in range(1, 30))
+        assert_equal(table.route(5, goal)[-1], goal)
@@ -0,0 +1,180 @@
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from nose.tools import assert_equal, assert_raises
+from numpy.testing import assert_allclose
+
+from sirl.algorithms.controller_graph import CGParameters
+from sirl.algorithms.samplers import uniform_heading, make_sampler
+from sirl.algorithms.samplers import UniformSampler, GoalBiasedSampler
+from sirl.algorithms.samplers import InformedSampler, CoverageSampler
+from sirl.algorithms.samplers import DemoDensitySampler
+
+from .test_controller_graph import make_test_cg
+
+
+def in_intervals(heading, intervals):
+    return any(a <= heading <= b for a, b in intervals)
+
+
+def test_uniform_heading():
+    np.random.seed(0)
+    intervals = [(0.0, 1.0), (2.0, 2.5)]
+    headings = [uniform_heading(intervals) for _ in range(200)]
+    assert all(in_intervals(h, intervals) for h in headings)
+    # - proportional to the interval lengths
+    assert 0.5 < np.mean([h <= 1.0 for h in headings]) < 0.8
+
+    headings = [uniform_heading(None) for _ in range(20)]
+    assert all(0 <= h < 2 * np.pi for h in headings)
+
+
+def test_make_sampler():
+    for name, kind in (('uniform', UniformSampler),
+                       ('goal', GoalBiasedSampler),
+                       ('informed', InformedSampler),
+                       ('coverage', CoverageSampler),
+                       ('demo', DemoDensitySampler)):
+        sampler = make_sampler(CGParameters(sampler=name, radius=0.2))
+        assert isinstance(sampler, kind)
+    assert_equal(make_sampler(CGParameters(sampler='coverage',
+                                           radius=0.2)).radius, 0.2)
+    assert_raises(ValueError, GoalBiasedSampler, bias=1.5)
+
+
+def test_goal_biased_sampler():
+    np.random.seed(0)
+    sampler = GoalBiasedSampler(bias=1.0, spread=0.0)
+    sampler._goals = np.array([[1.0, 1.0], [-5.0, 0.0]])
+    assert_equal(sampler((0.0, 0.0), 0.1, None), np.pi / 4)
+
+    # - the goal heading is infeasible, the heading is uniform
+    intervals = [(np.pi, 1.5 * np.pi)]
+    for _ in range(10):
+        assert in_intervals(sampler((0.0, 0.0), 0.1, intervals), intervals)
+
+
+def test_informed_sampler():
+    np.random.seed(0)
+    sampler = InformedSampler(n_tries=50)
+    # - informed set of the start (0, 0) and the goal (1, 0), of length 1.2
+    sampler._foci = np.array([[[0.0, 0.0], [1.0, 0.0]]])
+    sampler._lengths = np.array([1.2])
+    for _ in range(20):
+        heading = sampler((0.5, 0.2), 0.2, None)
+        x = np.array([0.5, 0.2]) + 0.2 * np.array([np.cos(heading),
+                                                   np.sin(heading)])
+        assert np.hypot(*x) + np.hypot(*(x - [1, 0])) <= 1.2
+
+
+def test_coverage_sampler():
+    np.random.seed(0)
+    sampler = CoverageSampler(n_candidates=16, radius=0.15)
+
+    # - states crowd the left of (0.5, 0.5), the right is sparse
+    sampler._tree = cKDTree(np.column_stack((
+        np.random.uniform(0.2, 0.45, 100), np.random.uniform(0.3, 0.7, 100))))
+    headings = np.array([sampler((0.5, 0.5), 0.1, None) for _ in range(50)])
+    assert np.mean(np.cos(headings) > 0) > 0.8
+
+
+def test_coverage_sampler_update():
+    rng = np.random.RandomState(0)
+    cg = make_test_cg(sampler='coverage', radius=0.15)
+    cg.initialize_state_graph(samples=[tuple(p) for p in
+                                       rng.uniform(0, 1, size=(18, 2))])
+    sampler = cg.sampler
+    sampler.update(cg)
+    assert_equal(sampler._tree.n, 20)
+
+    # - a few new states are counted without rebuilding the tree
+    G = cg.graph
+    for i, p in enumerate(rng.uniform(0, 1, size=(2, 2))):
+        G.add_node(nid=20 + i, data=p, cost=0, priority=1, Q=[], V=0, pi=0,
+                   ntype='simple')
+    sampler.update(cg)
+    assert_equal((sampler._tree.n, len(sampler._pending)), (20, 2))
+
+    ends = rng.uniform(0, 1, size=(50, 2))
+    positions = G.get_node_attr_array('data')[:, :2]
+    expected = [len(nn) for nn in
+                cKDTree(positions).query_ball_point(ends, 0.15)]
+    assert_equal(sampler._counts(ends).tolist(), expected)
+
+    # - and the tree is rebuilt once they are too many
+    G.add_node(nid=22, data=(0.5, 0.5), cost=0, priority=1, Q=[], V=0, pi=0,
+               ntype='simple')
+    sampler.update(cg)
+    assert_equal((sampler._tree.n, len(sampler._pending)), (23, 0))
+
+
+def test_sampler_runs():
+    for name in ('goal', 'informed', 'coverage'):
+        cg = make_test_cg(radius=0.15, max_samples=15, n_new=5,
+                          tmin=(0.03, 0.08), tmax=(0.1, 0.2), exp_thresh=0.0,
+                          sampler=name)
+        np.random.seed(0)
+        cg.initialize_state_graph(samples=[(0.5, 0.5)])
+        cg.run()
+        assert_equal(len(cg.graph.nodes), 15)
+        world = cg._controller._world
+        for n in cg.graph.nodes:
+            assert world.in_world(cg.graph.gna(n, 'data'))
+
+
+def test_demo_density_sampler():
+    np.random.seed(0)
+    assert_raises(ValueError, DemoDensitySampler, floor=0)
+    sampler = DemoDensitySampler(n_candidates=16, bandwidth=0.05)
+    assert sampler.accept((0.5, 0.5))
+    assert_equal(sampler.density([(0.5, 0.5)]).tolist(), [0.0])
+
+    demo = np.column_stack((np.linspace(0.1, 0.9, 9), np.full(9, 0.8)))
+    sampler.fit([demo])
+    assert_allclose(sampler.density(demo).max(), 1.0)
+    assert_allclose(sampler.density([(0.5, 0.1)]), 0.0)
+
+    # - headings towards the demonstration, above
+    headings = np.array([sampler((0.5, 0.7), 0.1, None) for _ in range(50)])
+    assert np.mean(np.sin(headings) > 0) > 0.8
+
+    # - states far from the demonstration are expanded with p = floor
+    accepted = [sampler.accept((0.5, 0.1)) for _ in range(500)]
+    assert 0.05 < np.mean(accepted) < 0.15
+    assert all(sampler.accept(p) for p in demo[2:-2])
+
+    sampler.fit([])
+    assert sampler.accept((0.5, 0.1))
+
+
+def test_demo_sampler_fit():
+    demo = np.column_stack((np.linspace(0.3, 0.9, 7), np.linspace(0.65, 0.9,
+                                                                  7)))
+    cg = make_test_cg(init_type='trajectory', sampler='demo', radius=0.1)
+    assert isinstance(cg.sampler, DemoDensitySampler)
+    cg.initialize_state_graph(samples=[demo])
+    assert cg.sampler.density(demo).max() > 0.9
+    assert_equal(cg._demo_points.shape, (7, 2))
+
+    # - the density is restored with the checkpoints
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'checkpoint')
+        cg.save_checkpoint(path)
+        resumed = make_test_cg(init_type='trajectory', sampler='demo',
+                               radius=0.1)
+        resumed._load_checkpoint(path)
+        assert_allclose(resumed.sampler.density(demo),
+                        cg.sampler.density(demo))
+    finally:
+        shutil.rmtree(tmp)
+
+    cg.params.init_type = 'random'
+    cg.initialize_state_graph(samples=[(0.5, 0.5)])
+    assert_equal(cg._demo_points.shape, (0, 2))
+    assert_equal(cg.sampler.density(demo).max(), 0.0)
@@ -0,0 +1,91 @@
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from nose.tools import assert_equal
+
+from sirl.domains.puddle_world.puddle_world import PuddleWorldMDP
+from sirl.domains.puddle_world.puddle_world import PuddleWorldEnvironment
+from sirl.domains.puddle_world.puddle_world import PuddleWorldControler
+from sirl.domains.puddle_world.puddle_world import PuddleRewardOriented
+from sirl.algorithms.controller_graph import ControllerGraph, CGParameters
+from sirl.algorithms.sweep import ParameterSweep, sweep_grid, run_key
+from sirl.algorithms.sweep import load_results
+
+
+def build_puddle_world(params):
+    world = PuddleWorldEnvironment(start=[(0.3, 0.65)], goal=(0.97, 0.97))
+    reward = PuddleRewardOriented(world, weights=(1.0, -0.0002, -0.001))
+    mdp = PuddleWorldMDP(discount=0.95, reward=reward, world=world)
+    controller = PuddleWorldControler(world)
+    cg = ControllerGraph(mdp=mdp, local_controller=controller, params=params)
+    cg.initialize_state_graph(samples=[(0.5, 0.07)])
+    return cg
+
+
+def test_parameter_sweep():
+    base = CGParameters(max_samples=8, n_new=5, speed=0.05,
+                        tmin=(0.03, 0.08), tmax=(0.1, 0.2), exp_thresh=0.0)
+    params = sweep_grid(base, radius=[0.1, 0.2], n_add=[1, 2])
+    assert_equal(len(params), 4)
+    assert_equal((params[1].n_add, params[1].radius), (1, 0.2))
+    assert_equal((params[2].n_add, params[2].radius), (2, 0.1))
+
+    tmp = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp, 'results.npz')
+        sweep = ParameterSweep(build_puddle_world, filename, n_jobs=1)
+        results = sweep.run(params[:2], seeds=[0, 1])
+        assert_equal(len(results['key']), 4)
+        assert np.all(results['n_nodes'] >= 8)
+        assert np.all(results['peak_memory'] > 0)
+        assert np.all(results['time_policy_iteration'] > 0)
+        assert np.all(results['count_controller'] > 0)
+
+        # - recorded runs are skipped, only the new ones are run
+        sweep.n_jobs = 2
+        results = sweep.run(params, seeds=[0, 1])
+        assert_equal(len(results['key']), 8)
+        assert_equal(sorted(results['key']),
+                     sorted(run_key(p, s) for p in params for s in (0, 1)))
+        assert_equal(sweep.run(params, seeds=[1])['key'].shape, (8,))
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_results_journal():
+    tmp = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp, 'results.npz')
+        journal = filename + '.rows.jsonl'
+        sweep = ParameterSweep(build_puddle_world, filename, n_jobs=1)
+
+        # - rows of an interrupted sweep are only in the journal
+        sweep._record({'key': 'a', 'x': 1.0, 'note': 'first'})
+        sweep._record({'key': 'b', 'x': 2.0})
+        with open(journal, 'a') as f:
+            f.write('{"key": "c", "x"')
+        assert not os.path.exists(filename)
+        results = load_results(filename)
+        assert_equal(results['key'].tolist(), ['a', 'b'])
+        assert_equal(results['note'].tolist(), ['first', ''])
+
+        # - and merged into the results file by the next sweep
+        results = sweep.run([], seeds=[0])
+        assert os.path.exists(filename)
+        assert not os.path.exists(journal)
+        assert_equal(results['key'].tolist(), ['a', 'b'])
+
+        sweep._record({'key': 'c', 'y': 3.0})
+        sweep._record({'key': 'a', 'x': 5.0})
+        results = load_results(filename)
+        assert_equal(results['key'].tolist(), ['a', 'b', 'c'])
+        assert_equal(results['note'].tolist(), ['first', '', ''])
+        assert np.isnan(results['x'][2])
+        assert np.isnan(results['y'][0])
+        assert_equal(results['x'][0], 1.0)
+    finally:
+        shutil.rmtree(tmp)
@@ -0,0 +1,61 @@
+
+import numpy as np
+
+from nose.tools import assert_equal
+from numpy.testing import assert_array_equal, assert_allclose
+
+from sirl.domains.generators import make_social_world, make_puddle_world
+from sirl.domains.generators import make_demonstrations
+from sirl.utils.geometry import edist
+
+
+def test_social_world():
+    world = make_social_world(500, width=20, height=15, n_starts=3, seed=1)
+    assert_equal(len(world.persons), 500)
+    assert_equal(sorted(world.persons), list(range(1, 501)))
+    assert_equal(len(world.start), 3)
+    assert world.relations
+    for i, j in world.relations:
+        # - related persons are members of the same group
+        assert_array_equal(world.persons[i][2:], world.persons[j][2:])
+    for p in world.persons.values():
+        assert 0 <= p[0] <= 20 and 0 <= p[1] <= 15
+        for s in world.start + [world.goal]:
+            assert edist(p, s) >= 1.0
+
+    same = make_social_world(500, width=20, height=15, n_starts=3, seed=1)
+    assert_equal(same.persons, world.persons)
+    assert_equal(same.relations, world.relations)
+
+    fewer = make_social_world(500, n_relations=10, seed=1)
+    assert_equal(len(fewer.relations), 10)
+
+
+def test_puddle_world():
+    world = make_puddle_world(50, n_starts=2, seed=0)
+    assert_equal(len(world.puddles), 50)
+    assert_equal(world.goal, (0.97, 0.97))
+    for s in world.start + [world.goal]:
+        assert_equal(sum(p.cost(s[0], s[1]) for p in world.puddles), 0.0)
+
+
+def test_demonstrations():
+    world = make_social_world(30, seed=2)
+    demos = make_demonstrations(world, n_demos=10, seed=2)
+    assert_equal(len(demos), 10)
+    for i, demo in enumerate(demos):
+        assert_equal(demo.shape[1], 2)
+        assert_allclose(demo[0], world.start[i % 7])
+        assert_allclose(demo[-1], world.goal)
+        steps = np.hypot(*np.diff(demo, axis=0).T)
+        assert steps.max() < 2.0
+
+    # - demonstrations keep clear of the puddles of a sparse world
+    world = make_puddle_world(5, n_starts=3, seed=3)
+    straight = make_demonstrations(world, spacing=0.02, n_iter=0)
+    demos = make_demonstrations(world, spacing=0.02)
+
+    def cost(demo):
+        return sum(p.cost(wp[0], wp[1]) for p in world.puddles for wp in demo)
+    assert sum(cost(d) for d in straight) < 0
+    assert_equal(sum(cost(d) for d in demos), 0.0)
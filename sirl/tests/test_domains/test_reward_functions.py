@@ -0,0 +1,130 @@
+
+import numpy as np
+
+from nose.tools import assert_equal
+
+from sirl.domains.generators import make_social_world
+from sirl.domains.navigation.local_controllers import LinearLocalController
+from sirl.domains.navigation.reward_functions import SimpleBehaviors
+from sirl.domains.navigation.reward_functions import FlowBehaviors
+from sirl.utils.geometry import edist, anisotropic_distance
+from sirl.utils.geometry import distance_to_segment
+
+
+def _reference_social_disturbance(reward, action):
+    """ Exhaustive search of the closest person at every waypoint """
+    people = [v for k, v in reward._world.persons.items()]
+    f = 0.0
+    for t, waypoint in enumerate(action):
+        closest_person = people[0]
+        cdist = edist(closest_person, waypoint)
+        for p in people[1:]:
+            dist = edist(p, waypoint)
+            if dist < cdist:
+                cdist = dist
+                closest_person = p
+
+        boundary = reward._thresh_p
+        if reward._scaled:
+            speed = np.hypot(closest_person[2], closest_person[3])
+            boundary *= speed
+            reward._szone *= speed
+
+        ad = np.inf
+        if reward._anisotropic:
+            ad = anisotropic_distance(closest_person, waypoint, ak=3.0)
+        if cdist < ad and cdist < boundary:
+            if reward._behavior == 'sociable' and cdist > reward._szone:
+                f += (cdist - boundary) * reward._gamma**t
+            elif reward._behavior != 'sociable' or cdist < reward._szone:
+                f += (boundary - cdist) * reward._gamma**t
+    return f
+
+
+def _reference_relation_disturbance(reward, action):
+    """ Test of every relation at every waypoint """
+    persons = reward._world.persons
+    f = 0.0
+    for t, waypoint in enumerate(action):
+        for [i, j] in reward._world.relations:
+            la = (persons[i][0], persons[i][1])
+            le = (persons[j][0], persons[j][1])
+            dist, inside = distance_to_segment(waypoint, la, le)
+            if inside and dist < reward._thresh_r:
+                f += (reward._thresh_r - dist) * reward._gamma**t
+    return f
+
+
+def _reference_flow(reward, action):
+    """ Density and relative bearing over all the persons """
+    phi_d, phi_f = [], []
+    for t, wp in enumerate(action):
+        density, count, flow = 0, 0, 0
+        for _, p in reward._world.persons.items():
+            if edist(wp, p[0:2]) < reward._radius:
+                density += 1 * reward._gamma**t
+                count += 1
+                flow += reward._goal_orientation(p) * reward._gamma**t
+        phi_d.append(density)
+        phi_f.append(flow / count if count > 0 else flow)
+    return sum(phi_d), sum(phi_f)
+
+
+def _trajectories(world, n):
+    rng = np.random.RandomState(0)
+    controller = LinearLocalController(world, resolution=0.1)
+    sources = rng.uniform(0, 10, size=(n, 2))
+    targets = sources + rng.uniform(-2, 2, size=(n, 2))
+    return [controller.trajectory(s, t, 1.0) for s, t in zip(sources, targets)]
+
+
+def test_simple_behaviors_range_queries():
+    world = make_social_world(100, seed=4)
+    trajs = _trajectories(world, 10)
+    for behavior in ('polite', 'sociable'):
+        for anisotropic in (False, True):
+            for scaled in (False, True):
+                reward = SimpleBehaviors(world, [-1.0, -0.7, -0.85],
+                                         behavior=behavior, scaled=scaled,
+                                         anisotropic=anisotropic,
+                                         thresh_p=0.45, thresh_r=0.2)
+                expected = SimpleBehaviors(world, [-1.0, -0.7, -0.85],
+                                           behavior=behavior, scaled=scaled,
+                                           anisotropic=anisotropic,
+                                           thresh_p=0.45, thresh_r=0.2)
+                for traj in trajs:
+                    assert_equal(reward._feature_social_disturbance(traj),
+                                 _reference_social_disturbance(expected,
+                                                               traj))
+                    # - the sociable zone is rescaled along the way
+                    assert_equal(reward._szone, expected._szone)
+                    assert_equal(reward._feature_relation_disturbance(traj),
+                                 _reference_relation_disturbance(expected,
+                                                                 traj))
+
+
+def test_flow_behaviors_range_queries():
+    world = make_social_world(100, seed=5)
+    reward = FlowBehaviors(world, np.array([-1.0, -0.5, -0.8, -0.1]),
+                           discount=0.95)
+    counted = 0
+    for traj in _trajectories(world, 20):
+        density, bearing = _reference_flow(reward, traj)
+        assert_equal(reward._feature_density(traj), density)
+        assert_equal(reward._feature_relative_bearing(traj), bearing)
+        counted += density > 0
+    assert counted > 0
+
+
+def test_persons_in_range():
+    world = make_social_world(200, seed=6)
+    rng = np.random.RandomState(6)
+    for point in rng.uniform(0, 10, size=(20, 2)):
+        d = [edist(p, point) for p in world.persons.values()]
+        assert_equal(list(world.persons_in_range(point, 0.8)),
+                     [k for k, dk in enumerate(d) if dk < 0.8])
+        index, dist = world.nearest_person(point)
+        assert_equal(index, int(np.argmin(d)))
+        assert_equal(dist, min(d))
+        if min(d) >= 0.1:
+            assert_equal(world.nearest_person(point, 0.1), (None, np.inf))
@@ -1,6 +1,13 @@
 
+import os
+import pickle
+import shutil
+import tempfile
 
-from nose.tools import assert_equal
+import networkx as nx
+import numpy as np
+
+from nose.tools import assert_equal, assert_raises
 from numpy.testing import assert_array_equal
 
 from sirl.models.state_graph import StateGraph
@@ -110,3 +117,155 @@ def test_find_neighbors_range():
     assert_equal(len(g.find_neighbors_range(0, 4)), 1)
     assert_equal(len(g.find_neighbors_range(0, 7)), 2)
     assert_equal(len(g.find_neighbors_range(0, 2)), 0)
+
+
+def test_edge_arrays():
+    g = make_test_graph()
+    for i, data in enumerate([(1, 1), (3, 3), (2, 6)]):
+        g.add_node(nid=i, data=data, cost=1,
+                   priority=1, Q=[], V=1, pi=0, ntype='simple')
+    traj = [(0, 0), (1, 1)]
+    g.add_edge(0, 2, 4, 50, [1, 2], traj)
+    g.add_edge(1, 0, 3, 40, [3, 4], traj)
+    g.add_edge(0, 1, 3, 20, [5, 6], traj)
+
+    ea = g.edge_arrays()
+    assert_array_equal(ea.indptr, [0, 2, 3, 3])
+    assert_array_equal(ea.target, [2, 1, 0])
+    assert_array_equal(ea.reward, [50, 20, 40])
+    assert_array_equal(ea.phi[1], [5, 6])
+    assert_equal(ea.target[ea.indptr[0] + 1], g.out_edges(0)[1][1])
+
+    g.sea(0, 1, 'reward', 7)
+    assert g.edge_arrays() is ea
+    assert_equal(ea.reward[1], 7)
+
+    g.add_edge(2, 1, 1, 1, [0, 0], traj)
+    assert_equal(g.edge_arrays().n_edges, 4)
+
+
+def test_save_load_graph():
+    g = make_test_graph()
+    for i, data in zip([4, 0, 7], [(1, 1), (3, 3), (2, 6)]):
+        g.add_node(nid=i, data=data, cost=i, priority=1, Q=[0.5] * i,
+                   V=2 * i, pi=0, ntype='start' if i == 4 else 'simple')
+    g.add_edge(4, 7, 4, 50, [1, 2], [(0, 0), (1, 1), (2, 2)])
+    g.add_edge(0, 4, 3, 40, [3, 4], [(5, 5)])
+    g.add_edge(4, 0, 3, 20, [5, 6], [(0, 1), (1, 0)])
+    g.sna(4, 'pi', 1)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'graph')
+        g.save_graph(path)
+        h = StateGraph(state_dim=2)
+        h.load_graph(path)
+
+        assert_equal(h.nodes, g.nodes)
+        assert_equal(h.filter_nodes_by_type('start'), [4])
+        for n in g.nodes:
+            assert_equal(h.out_edges(n), g.out_edges(n))
+            for key in ('cost', 'priority', 'Q', 'V', 'pi', 'type'):
+                assert_equal(h.gna(n, key), g.gna(n, key))
+            assert_array_equal(h.gna(n, 'data'), g.gna(n, 'data'))
+        for u, v in g.all_edges:
+            for key in ('duration', 'reward', 'phi', 'traj'):
+                assert_array_equal(h.gea(u, v, key), g.gea(u, v, key))
+        assert_array_equal(h.edge_arrays().target, g.edge_arrays().target)
+
+        # - pickled graphs of the older format still load
+        path = os.path.join(tmp, 'graph.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump(g.G, f)
+        h = StateGraph(state_dim=2)
+        h.load_graph(path)
+        assert_equal(h.nodes, g.nodes)
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_graph_queries():
+    g = make_test_graph()
+    for i in range(5):
+        g.add_node(nid=i, data=(i, 0), cost=1,
+                   priority=1, Q=[], V=1, pi=0, ntype='simple')
+    traj = [(0, 0), (1, 1)]
+    g.add_edge(0, 1, 1.0, -1.0, [1, 2], traj)
+    g.add_edge(1, 2, 1.0, -1.0, [3, 4], traj)
+    g.add_edge(2, 0, 1.0, -1.0, [5, 6], traj)
+    g.add_edge(0, 3, 5.0, -1.0, [7, 8], traj)
+    g.add_edge(2, 3, 1.0, -4.0, [9, 0], traj)
+
+    D = g.sparse_matrix('duration')
+    assert_equal(D.shape, (5, 5))
+    assert_equal(D.nnz, 5)
+    assert_equal(D[0, 3], 5.0)
+    phi = g.sparse_matrix('phi', feature=1).toarray()
+    assert_array_equal(phi[:, 3], [8, 0, 0, 0, 0])
+    assert_array_equal(g.transition_matrix.toarray().sum(axis=1),
+                       [2, 1, 2, 0, 0])
+    assert_raises(ValueError, g.sparse_matrix, 'traj')
+
+    assert_equal(g.search_path(0, 3), [0, 3])
+    assert_equal(g.search_path(0, 3, weight='duration'), [0, 1, 2, 3])
+    assert_equal(g.search_path(0, 3, weight='reward'), [0, 3])
+    assert_raises(nx.NetworkXNoPath, g.search_path, 3, 0)
+
+    assert_array_equal(g.cost_to_go([3]), [3, 2, 1, 0, np.inf])
+    assert_array_equal(g.reachable([1]), [1, 1, 1, 1, 0])
+    assert_array_equal(g.reachable([3], reverse=True), [1, 1, 1, 1, 0])
+
+    n_components, labels = g.strongly_connected_components()
+    assert_equal(n_components, 3)
+    assert_equal(len(set(labels[:3])), 1)
+    assert labels[3] != labels[0]
+
+
+def test_attribute_arrays():
+    g = make_test_graph()
+    for i, data in enumerate([(1, 1), (3, 3), (2, 6)]):
+        g.add_node(nid=i, data=data, cost=i, priority=1, Q=[i], V=2 * i,
+                   pi=0, ntype='simple')
+    traj = [(0, 0), (1, 1)]
+    g.add_edge(0, 2, 4, 50, [1, 2], traj)
+    g.add_edge(1, 0, 3, 40, [3, 4], traj)
+
+    assert_array_equal(g.get_node_attr_array('V'), [0, 2, 4])
+    assert_array_equal(g.get_node_attr_array('data', [2, 0]),
+                       [(2, 6), (1, 1)])
+    assert_equal(g.get_node_attr_array('Q'), [[0], [1], [2]])
+    assert_array_equal(g.get_signal('policy'), [0, 0, 0])
+
+    g.set_node_attr_array('priority', np.array([0.5, 0.25]), [2, 1])
+    assert_equal(g.gna(2, 'priority'), 0.5)
+    assert_equal(g.gna(1, 'priority'), 0.25)
+    g.set_node_attr_array('data', [(7, 7)], [0])
+    assert_array_equal(g.gna(0, 'data'), (7, 7))
+
+    ea = g.edge_arrays()
+    edges = [(1, 0), (0, 2)]
+    assert_array_equal(g.get_edge_attr_array('reward', edges), [40, 50])
+    assert_array_equal(g.get_edge_attr_array('target', edges), [0, 2])
+    g.set_edge_attr_array('reward', np.array([-1.0, -2.0]), edges)
+    g.set_edge_attr_array('phi', [[0, 0], [9, 9]], edges)
+    assert_equal(g.gea(1, 0, 'reward'), -1.0)
+    assert_array_equal(ea.reward, [-2, -1])
+    assert_array_equal(ea.phi, [[9, 9], [0, 0]])
+
+
+def test_type_index():
+    g = make_test_graph()
+    for i, ntype in enumerate(['start', 'simple', 'goal', 'start']):
+        g.add_node(nid=i, data=(i, i), cost=1, priority=1, Q=[], V=1, pi=0,
+                   ntype=ntype)
+    assert_equal(g.filter_nodes_by_type('start'), [0, 3])
+
+    g.sna(1, 'type', 'start')
+    g.remove_node(0)
+    g.set_node_attr_array('type', ['simple'], [2])
+    assert_equal(g.filter_nodes_by_type('start'), [3, 1])
+    assert_equal(g.filter_nodes_by_type('simple'), [2])
+    assert_equal(g.filter_nodes_by_type('goal'), [])
+
+    g.clear()
+    assert_equal(g.filter_nodes_by_type('start'), [])
@@ -0,0 +1,68 @@
+
+import os
+
+import numpy as np
+
+from nose.tools import assert_equal, assert_raises
+from numpy.testing import assert_array_equal
+
+from sirl.models.state_graph import StateGraph
+from sirl.models.trajectory_buffer import TrajectoryBuffer
+
+
+def test_append_get():
+    trajs = [np.random.rand(n, 3) for n in (5, 1, 12, 7)]
+    for mode in ('memory', 'mmap'):
+        buf = TrajectoryBuffer(mode=mode, capacity=4)
+        handles = [buf.append(t) for t in trajs]
+        assert_equal(handles[2], (6, 12))
+        assert_equal(buf.size, 25)
+        for h, t in zip(handles, trajs):
+            assert_array_equal(buf.get(h), t)
+
+        if mode == 'mmap':
+            filename = buf._filename
+            assert os.path.exists(filename)
+            buf.close()
+            assert not os.path.exists(filename)
+
+
+def test_attach():
+    trajs = [np.random.rand(n, 2) for n in (5, 3)]
+    buf = TrajectoryBuffer(mode='mmap', capacity=4)
+    handles = [buf.append(t) for t in trajs]
+    buf.flush()
+
+    # - a new buffer on the same file reuses the stored trajectories
+    reopened = TrajectoryBuffer(mode='mmap', filename=buf._filename)
+    reopened.attach(buf.size, 2)
+    for h, t in zip(handles, trajs):
+        assert_array_equal(reopened.get(h), t)
+    assert_equal(reopened.append(np.ones((2, 2))), (8, 2))
+    assert_raises(ValueError, reopened.attach, 10 ** 6, 2)
+    assert_raises(ValueError, TrajectoryBuffer().attach, 0, 2)
+    buf.close()
+
+
+def test_features_mode():
+    buf = TrajectoryBuffer(mode='features')
+    h = buf.append(np.ones((4, 2)))
+    assert_equal(buf.get(h, 0, 1), None)
+    assert_equal(buf.nbytes, 0)
+
+    buf.regenerate = lambda u, v: np.full((2, 2), u + v)
+    assert_array_equal(buf.get(h, 1, 2), np.full((2, 2), 3))
+
+
+def test_state_graph_buffer():
+    g = StateGraph(state_dim=2, trajectories=TrajectoryBuffer())
+    for i in range(2):
+        g.add_node(nid=i, data=(i, i), cost=1,
+                   priority=1, Q=[], V=1, pi=0, ntype='simple')
+    traj = [(0, 0), (0.5, 0.5), (1, 1)]
+    g.add_edge(0, 1, 3, 20, [1, 2], traj)
+    assert_equal(g.G.edge[0][1]['traj'], (0, 3))
+    assert_array_equal(g.gea(0, 1, 'traj'), traj)
+
+    g.sea(0, 1, 'traj', [(0, 0), (1, 1)])
+    assert_array_equal(g.gea(0, 1, 'traj'), [(0, 0), (1, 1)])
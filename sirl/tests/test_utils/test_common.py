@@ -0,0 +1,45 @@
+
+import logging
+
+from nose.tools import assert_equal
+
+from sirl.utils.common import Logger
+
+
+class _Recorder(logging.Handler):
+    def __init__(self):
+        super(_Recorder, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class _Unprintable(object):
+    def __str__(self):
+        raise AssertionError('formatted a disabled message')
+
+
+class _Solver(Logger):
+    def step(self, i):
+        self.debug('step %d %s', i, _Unprintable())
+        self.info('step %d', i)
+
+
+def test_logger():
+    solver = _Solver()
+    assert_equal(solver.logger.name, __name__ + '._Solver')
+
+    handler = _Recorder()
+    solver.logger.addHandler(handler)
+    solver.logger.setLevel(logging.INFO)
+    try:
+        solver.step(3)
+        assert_equal(handler.messages, ['_Solver >>> step 3'])
+
+        solver.show_source_location = True
+        solver.step(4)
+        assert handler.messages[-1].startswith('[test_common.py:')
+        assert handler.messages[-1].endswith('_Solver.step >>> step 4')
+    finally:
+        solver.logger.removeHandler(handler)
@@ -6,9 +6,11 @@ from sirl.utils.geometry import distance_to_segment
 from sirl.utils.geometry import normangle
 from sirl.utils.geometry import trajectory_length
 from sirl.utils.geometry import anisotropic_distance
+from sirl.utils.geometry import heading_intervals
 
 
 import numpy as np
+from numpy.testing import assert_array_almost_equal
 
 
 def test_distance_to_segment():
@@ -60,3 +62,29 @@ def test_trajectory_length():
 
 def test_anisotropic_distance():
     pass
+
+
+def test_heading_intervals():
+    low, high = (0, 0), (1, 1)
+    assert_equal(heading_intervals((0.5, 0.5), 0.1, low, high),
+                 [(0.0, 2 * np.pi)])
+    assert_equal(heading_intervals((0.5, 0.5), 2.0, low, high), [])
+
+    # - near the lower left corner, the interval wraps around heading 0
+    intervals = heading_intervals((0.05, 0.05), 0.1, low, high)
+    assert_equal(len(intervals), 2)
+    assert_array_almost_equal(intervals[0], (0, 2 * np.pi / 3))
+    assert_array_almost_equal(intervals[1], (11 * np.pi / 6, 2 * np.pi))
+
+    # - near the right side, only the headings to the left
+    intervals = heading_intervals((0.95, 0.5), 0.1, low, high)
+    assert_equal(len(intervals), 1)
+    assert_array_almost_equal(intervals[0], (np.pi / 3, 5 * np.pi / 3))
+
+    for point in np.random.RandomState(0).uniform(0, 1, size=(20, 2)):
+        intervals = heading_intervals(point, 0.3, low, high)
+        for theta in np.linspace(0, 2 * np.pi, 50):
+            end = point + 0.3 * np.array([np.cos(theta), np.sin(theta)])
+            inside = np.all((0 < end) & (end < 1))
+            feasible = any(a <= theta <= b for a, b in intervals)
+            assert inside <= feasible
@@ -0,0 +1,36 @@
+
+import os
+import json
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from sirl.utils.profiling import Profiler
+
+
+def test_profiler():
+    tmp = tempfile.mkdtemp()
+    try:
+        stream = os.path.join(tmp, 'stats.jsonl')
+        prof = Profiler(stream=stream, cprofile=True, trace_memory=True)
+        prof.start()
+        for i in range(3):
+            with prof.phase('work'):
+                data = [j ** 2 for j in range(10000)]
+            prof.count('items', len(data))
+            prof.record(iteration=i)
+        prof.stop()
+
+        stats = prof.stats
+        assert_equal(stats['phases']['work']['calls'], 3)
+        assert stats['phases']['work']['time'] > 0
+        assert_equal(stats['counters']['items'], 30000)
+        assert stats['memory_peak'] > 0
+
+        with open(stream, 'r') as f:
+            records = [json.loads(line) for line in f]
+        assert_equal([r['iteration'] for r in records], [0, 1, 2])
+        assert_equal(records[0]['counters']['items'], 10000)
+    finally:
+        shutil.rmtree(tmp)
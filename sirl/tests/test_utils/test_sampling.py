@@ -0,0 +1,52 @@
+
+import numpy as np
+
+from nose.tools import assert_equal, assert_raises
+from numpy.testing import assert_allclose
+
+from sirl.utils.sampling import PrioritySampler
+
+
+def test_updates():
+    sampler = PrioritySampler(capacity=2)
+    priorities = dict((k, float(k + 1)) for k in range(20))
+    for k, p in priorities.items():
+        sampler.update(k, p)
+    for k in range(0, 20, 3):
+        sampler.remove(k)
+        del priorities[k]
+    sampler.update(1, 10.0)
+    priorities[1] = 10.0
+
+    assert_equal(len(sampler), len(priorities))
+    assert_equal(set(sampler), set(priorities))
+    assert 3 not in sampler
+    assert_equal(sampler.priority(1), 10.0)
+    assert_allclose(sampler.total, sum(priorities.values()))
+
+    assert_raises(ValueError, sampler.update, 1, -1.0)
+    for priority in (np.nan, np.inf):
+        assert_raises(ValueError, sampler.update, 1, priority)
+    assert_equal(sampler.priority(1), 10.0)
+    assert_raises(KeyError, sampler.remove, 3)
+    assert_raises(ValueError, PrioritySampler().sample)
+
+
+def test_sample_distribution():
+    np.random.seed(0)
+    priorities = {'a': 0.0, 'b': 1.0, 'c': 3.0, 'd': 6.0}
+    n = 40000
+    for shift in (0.0, 0.5):
+        sampler = PrioritySampler(shift=shift)
+        for k, p in priorities.items():
+            sampler.update(k, p)
+        counts = dict((k, 0) for k in priorities)
+        for _ in range(n):
+            counts[sampler.sample()] += 1
+
+        # - as wchoice on the normalized priorities
+        total = sum(priorities.values())
+        w = np.array([priorities[k] / total + shift for k in sorted(counts)])
+        assert_allclose([counts[k] / n for k in sorted(counts)],
+                        w / w.sum(), atol=0.01)
+    assert_equal(counts['a'] > 0, True)
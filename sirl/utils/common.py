@@ -1,23 +1,24 @@
 
 from __future__ import division
 
-import time
 import os.path
+import sys
 import logging
-import traceback
 
 import numpy as np
 
 from numpy.random import choice
 from scipy.stats import norm
 
+from .profiling import perf_counter
+
 
 def wchoice(elements, weights):
     """ Choose a single element with probability proportional to its weight """
     # Hack - shift and re-scale to avoid issues with negative V(s)
-    w2 = np.array(weights) + 1000
+    w2 = np.array(list(weights)) + 1000
     w2 = w2 / np.sum(w2)
-    return choice(elements, 1, p=w2)[0]
+    return choice(list(elements), 1, p=w2)[0]
 
 
 def eval_gaussian(x, mu=0.0, sigma=0.2):
@@ -45,11 +46,11 @@ def softmax(x1, x2):
 
 class Timer:
     def __enter__(self):
-        self.start = time.clock()
+        self.start = perf_counter()
         return self
 
     def __exit__(self, *args):
-        self.end = time.clock()
+        self.end = perf_counter()
         self.interval = self.end - self.start
 
 
@@ -59,53 +60,69 @@ class Timer:
 class Logger(object):
     """
     Logger mixin class adding verbose logging to subclasses.
+
+    Messages go through a logger per class (``logging.getLogger`` named by
+    the module and class), and are formatted lazily, in the style of the
+    logging module, i.e. ``self.info('%d nodes', n)``. Disabled levels return
+    before any formatting, and the calling frame is only inspected when
+    ``show_source_location`` is set.
     """
 
     show_source_location = False
 
-    def _raw_log(self, logfn, message, exc_info):
-        cname = ''
-        loc = ''
-        fn = ''
-        tb = traceback.extract_stack()
-        if len(tb) > 2:
-            if self.show_source_location:
-                loc = '[%s:%d]:' % (os.path.basename(tb[-3][0]), tb[-3][1])
-            fn = tb[-3][2]
-            if fn != '<module>':
-                if self.__class__.__name__ != Logger.__name__:
-                    fn = self.__class__.__name__ + '.' + fn
-                fn += ' >>>'
-
-        logfn(loc + cname + fn + ' ' + message, exc_info=exc_info)
-
-    def info(self, message, exc_info=False):
+    @property
+    def logger(self):
+        """ Logger of the class (created on first use) """
+        cls = self.__class__
+        logger = cls.__dict__.get('_class_logger')
+        if logger is None:
+            logger = logging.getLogger(cls.__module__ + '.' + cls.__name__)
+            cls._class_logger = logger
+        return logger
+
+    def _raw_log(self, level, message, args, kwargs):
+        logger = self.logger
+        if not logger.isEnabledFor(level):
+            return
+
+        prefix = self.__class__.__name__
+        if self.show_source_location:
+            # - frame of the caller of info/debug/warning/error
+            frame = sys._getframe(2)
+            code = frame.f_code
+            prefix = '[%s:%d]:%s.%s' % (os.path.basename(code.co_filename),
+                                        frame.f_lineno, prefix, code.co_name)
+
+        logger.log(level, prefix + ' >>> ' + message, *args,
+                   exc_info=kwargs.get('exc_info', False))
+
+    def info(self, message, *args, **kwargs):
         """
         Log a info-level message. If exc_info is True, if an exception
         was caught, show the exception information (message and stack trace).
         """
-        self._raw_log(logging.info, message, exc_info)
+        self._raw_log(logging.INFO, message, args, kwargs)
 
-    def debug(self, message, exc_info=False):
+    def debug(self, message, *args, **kwargs):
         """
         Log a debug-level message. If exc_info is True, if an exception
         was caught, show the exception information (message and stack trace).
         """
-        self._raw_log(logging.debug, message, exc_info)
+        self._raw_log(logging.DEBUG, message, args, kwargs)
 
-    def warning(self, message, exc_info=False):
+    def warning(self, message, *args, **kwargs):
         """
         Log a warning-level message. If exc_info is True, if an exception
         was caught, show the exception information (message and stack trace).
         """
-        self._raw_log(logging.warning, message, exc_info)
+        self._raw_log(logging.WARNING, message, args, kwargs)
 
-    def error(self, message, exc_info=False):
+    def error(self, message, *args, **kwargs):
         """
         Log an error-level message. If exc_info is True, if an exception
         was caught, show the exception information (message and stack trace).
         """
-        self._raw_log(logging.error, message, exc_info)
+        self._raw_log(logging.ERROR, message, args, kwargs)
 
     def log_config(self, level=logging.DEBUG):
         """
@@ -10,6 +10,7 @@ __all__ = [
     'edist',
     'anisotropic_distance',
     'trajectory_length',
+    'heading_intervals',
 ]
 
 
@@ -145,6 +146,61 @@ def normangle(theta, start=0):
         return np.inf
 
 
+def heading_intervals(point, distance, low, high):
+    r"""
+    Headings of the straight moves of a given length that end inside a box
+
+    The end point of the move of heading :math:`\theta` from ``point`` is
+    ``point + distance * (cos(theta), sin(theta))``. The headings are split
+    at the crossings of the circle of radius ``distance`` with the box
+    sides, and the arcs whose middle ends inside the box are kept.
+
+    Parameters
+    -----------
+    point : array-like
+        Start of the moves (the first two entries are the position)
+    distance : float
+        Length of the moves
+    low, high : array-like
+        Lower and upper corners of the (open) box
+
+    Returns
+    --------
+    intervals : list of tuples
+        Disjoint ``(start, end)`` heading intervals in :math:`[0, 2\pi]`, in
+        increasing order, empty if no move ends inside the box
+
+    """
+    x, y = point[0], point[1]
+    two_pi = 2 * np.pi
+    breaks = [0.0, two_pi]
+    if distance > 0:
+        for c in ((low[0] - x) / distance, (high[0] - x) / distance):
+            if -1 < c < 1:
+                a = np.arccos(c)
+                breaks.extend([a, two_pi - a])
+        for c in ((low[1] - y) / distance, (high[1] - y) / distance):
+            if -1 < c < 1:
+                a = np.arcsin(c)
+                breaks.extend([a % two_pi, np.pi - a])
+    breaks = np.unique(breaks)
+
+    middle = (breaks[:-1] + breaks[1:]) / 2
+    ex = x + distance * np.cos(middle)
+    ey = y + distance * np.sin(middle)
+    inside = (low[0] < ex) & (ex < high[0]) & (low[1] < ey) & (ey < high[1])
+
+    intervals = []
+    for start, end, keep in zip(breaks[:-1], breaks[1:], inside):
+        if not keep:
+            continue
+        if intervals and intervals[-1][1] == start:
+            intervals[-1] = (intervals[-1][0], float(end))
+        else:
+            intervals.append((float(start), float(end)))
+    return intervals
+
+
 def _normalize_vector(vector):
     """ Returns the unit vector of the vector.  """
     norm = np.linalg.norm(vector)
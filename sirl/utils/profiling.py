@@ -0,0 +1,150 @@
+"""
+Lightweight instrumentation of the representation learning loop.
+
+A :class:`Profiler` accumulates the wall time spent in named phases and counts
+named events (e.g. local controller or reward invocations). Optionally it also
+captures a ``cProfile`` profile and the peak traced memory (``tracemalloc``)
+between :meth:`Profiler.start` and :meth:`Profiler.stop`, and streams
+snapshots of the statistics to a JSON lines file.
+
+"""
+
+from __future__ import division
+
+import json
+import time
+import cProfile
+import pstats
+from contextlib import contextmanager
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover - python 2
+    tracemalloc = None
+
+
+__all__ = [
+    'Profiler',
+    'perf_counter',
+]
+
+
+perf_counter = getattr(time, 'perf_counter', time.time)
+
+
+class Profiler(object):
+    """ Phase timers and event counters
+
+    Parameters
+    -----------
+    stream : str, optional (default=None)
+        JSON lines file, to which :meth:`record` appends snapshots of the
+        statistics
+    cprofile : bool, optional (default=False)
+        Capture a ``cProfile`` profile between :meth:`start` and :meth:`stop`
+    trace_memory : bool, optional (default=False)
+        Trace the peak memory allocated (with ``tracemalloc``) between
+        :meth:`start` and :meth:`stop`
+
+    Attributes
+    -----------
+    times : dict
+        Accumulated wall time (in seconds) per phase
+    calls : dict
+        Number of times each phase was entered
+    counters : dict
+        Event counts
+
+    """
+
+    def __init__(self, stream=None, cprofile=False, trace_memory=False):
+        self.stream = stream
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.reset()
+
+    def reset(self):
+        """ Clear all the statistics """
+        self.times = dict()
+        self.calls = dict()
+        self.counters = dict()
+        self.memory_peak = None
+        self._profile = None
+        self._traced = False
+
+    @contextmanager
+    def phase(self, name):
+        """ Time a block of code under the phase ``name`` """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + \
+                perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def restore(self, stats):
+        """ Continue from statistics of :attr:`stats`, e.g. when resuming a
+        run from a checkpoint """
+        phases = stats.get('phases', dict())
+        self.times = dict((k, p['time']) for k, p in phases.items())
+        self.calls = dict((k, p['calls']) for k, p in phases.items())
+        self.counters = dict(stats.get('counters', dict()))
+        self.memory_peak = stats.get('memory_peak')
+
+    def count(self, name, n=1):
+        """ Increment the event counter ``name`` """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def start(self):
+        """ Start the optional cProfile and memory capture """
+        if self.cprofile:
+            if self._profile is None:
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+        if self.trace_memory and tracemalloc is not None and \
+                not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._traced = True
+
+    def stop(self):
+        """ Stop the optional cProfile and memory capture """
+        if self._profile is not None:
+            self._profile.disable()
+        if self._traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.memory_peak = max(peak, self.memory_peak or 0)
+            tracemalloc.stop()
+            self._traced = False
+
+    def record(self, **extra):
+        """ Append a snapshot of the statistics to the stream (if any)
+
+        Keyword arguments are added to the snapshot, e.g. the current number
+        of nodes.
+
+        """
+        if self.stream is None:
+            return
+        snapshot = dict(extra)
+        snapshot.update(self.stats)
+        with open(self.stream, 'a') as f:
+            f.write(json.dumps(snapshot, sort_keys=True) + '\n')
+
+    def print_profile(self, sort='cumulative', limit=20, stream=None):
+        """ Print the captured cProfile statistics """
+        if self._profile is None:
+            raise ValueError('No cProfile profile captured')
+        ps = pstats.Stats(self._profile, stream=stream)
+        ps.sort_stats(sort).print_stats(limit)
+        return ps
+
+    @property
+    def stats(self):
+        """ Statistics as a (json serializable) dict """
+        phases = dict((name, {'time': t, 'calls': self.calls[name]})
+                      for name, t in self.times.items())
+        stats = {'phases': phases, 'counters': dict(self.counters)}
+        if self.memory_peak is not None:
+            stats['memory_peak'] = self.memory_peak
+        return stats
@@ -0,0 +1,162 @@
+"""
+Weighted sampling structures.
+
+"""
+
+from __future__ import division
+
+import numpy as np
+
+
+__all__ = [
+    'PrioritySampler',
+]
+
+
+class PrioritySampler(object):
+    r""" Weighted sampling of keys with O(log N) draws and updates
+
+    Keys are drawn with probability proportional to their normalized priority
+    shifted by ``shift``, i.e. :math:`p_k / \sum_j p_j + shift`, which is the
+    distribution of :func:`sirl.utils.common.wchoice` applied to normalized
+    priorities. The priorities are kept in a Fenwick (binary indexed) tree,
+    so that draws, insertions, priority updates and removals are all
+    :math:`O(\log N)`.
+
+    Parameters
+    -----------
+    shift : float, optional (default=0.0)
+        Shift of the normalized priorities, a large shift makes the draws
+        almost uniform
+    capacity : int, optional (default=64)
+        Initial number of keys the sampler can hold, it grows as needed
+
+    """
+
+    def __init__(self, shift=0.0, capacity=64):
+        if shift < 0:
+            raise ValueError('Invalid shift [{}] | Expected: >= 0'
+                             .format(shift))
+        self.shift = shift
+        self._capacity = max(int(capacity), 1)
+        self.clear()
+
+    def clear(self):
+        """ Remove all keys """
+        self._keys = []
+        self._slots = dict()
+        self._weights = [0.0] * self._capacity
+        self._tree = [0.0] * (self._capacity + 1)
+
+    def update(self, key, priority):
+        """ Set the priority of a key, inserting it if needed """
+        if not np.isfinite(priority) or priority < 0:
+            raise ValueError('Invalid priority [{}] | Expected: finite, >= 0'
+                             .format(priority))
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._keys)
+            if slot == len(self._weights):
+                self._grow()
+            self._slots[key] = slot
+            self._keys.append(key)
+        self._set(slot, priority)
+
+    def remove(self, key):
+        """ Remove a key, the last key takes over its slot """
+        slot = self._slots.pop(key)
+        last = len(self._keys) - 1
+        if slot != last:
+            moved = self._keys[last]
+            self._keys[slot] = moved
+            self._slots[moved] = slot
+            self._set(slot, self._weights[last])
+        self._set(last, 0.0)
+        self._keys.pop()
+
+    def priority(self, key):
+        """ Priority of a key """
+        return self._weights[self._slots[key]]
+
+    def sample(self):
+        """ Draw a key
+
+        Uses a single draw of the global numpy random number generator.
+
+        """
+        n = len(self._keys)
+        if n == 0:
+            raise ValueError('Cannot sample from an empty sampler')
+        total = self.total
+        if total <= 0:
+            # - normalized priorities are undefined, all keys are alike
+            return self._keys[min(int(np.random.uniform(0, n)), n - 1)]
+
+        u = np.random.uniform(0, 1 + self.shift * n)
+        if u < 1:
+            slot = self._find(u * total)
+        else:
+            slot = int((u - 1) / self.shift)
+        return self._keys[min(slot, n - 1)]
+
+    @property
+    def total(self):
+        """ Sum of the priorities """
+        return self._prefix(len(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    # -------------------------------------------------------------
+    # internals
+    # -------------------------------------------------------------
+
+    def _set(self, slot, priority):
+        priority = float(priority)
+        delta = priority - self._weights[slot]
+        self._weights[slot] = priority
+        i = slot + 1
+        n = len(self._tree)
+        while i < n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, n):
+        """ Sum of the priorities of the first ``n`` slots """
+        total = 0.0
+        i = n
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, target):
+        """ First slot at which the priority prefix sum exceeds ``target`` """
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return pos
+
+    def _grow(self):
+        """ Double the capacity, rebuilding the tree from the priorities """
+        weights = self._weights + [0.0] * len(self._weights)
+        self._weights = weights
+
+        # - linear time construction, which also drops accumulated rounding
+        tree = [0.0] + weights
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree